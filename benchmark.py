@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Сравнение сокетов AF_UNIX с TCP и UDP через loopback
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from src.tcp_client import TCPClient
+from src.tcp_server import TCPServer
+from src.udp_client import UDPClient
+from src.udp_server import UDPServer
+
+def start(server):
+    """Запускает сервер в фоновом потоке и ждет, пока он начнет принимать"""
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+    return thread
+
+def round_trips(client, message: str, count: int, expected: str) -> dict:
+    """Запросы по одному: задержка каждого ответа
+
+    Успешным считается только ответ, равный expected; исключение или
+    другой ответ (send_message вернул бы текст ошибки) - ошибка, и в
+    скорость и задержку она не попадает.
+    """
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        sent = time.perf_counter()
+        try:
+            reply = client.request(message)
+        except (ConnectionError, OSError):
+            errors += 1
+            continue
+        if reply != expected:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - started
+    result = {"rate": len(latencies) / elapsed, "errors": errors}
+    if latencies:
+        latencies.sort()
+        result["mean_us"] = statistics.mean(latencies) * 1e6
+        result["p99_us"] = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1e6
+    return result
+
+def pipelined(client: TCPClient, message: str, count: int, expected: str) -> dict:
+    """Запросы без ожидания ответа на предыдущий (send_many)"""
+    started = time.perf_counter()
+    try:
+        replies = client.send_many([message] * count)
+    except (ConnectionError, OSError):
+        replies = []
+    correct = sum(reply == expected for reply in replies)
+    return {"rate": correct / (time.perf_counter() - started), "errors": count - correct}
+
+def run(host: str, port: int, count: int, size: int):
+    message = "x" * size
+    results = []
+    directory = tempfile.mkdtemp()
+    endpoints = [
+        ("loopback", {"host": host, "port": port}),
+        ("AF_UNIX", {"unix_socket": os.path.join(directory, "benchmark.sock")}),
+    ]
+
+    for transport, address in endpoints:
+        server = TCPServer(**address)
+        thread = start(server)
+        client = TCPClient(**address)
+        expected = f"TCP эхо: {message}"
+        if client.connect():
+            round_trips(client, message, min(count, 1000), expected)  # Прогрев
+            results.append((f"TCP {transport}", "по одному", round_trips(client, message, count, expected)))
+            results.append((f"TCP {transport}", "конвейер", pipelined(client, message, count, expected)))
+            client.disconnect()
+        server.stop()
+        thread.join(timeout=2.0)
+
+    if size <= 4000:
+        for transport, address in endpoints:
+            address = {**address, "port": port + 1} if "port" in address else \
+                {"unix_socket": os.path.join(directory, "benchmark-udp.sock")}
+            server = UDPServer(**address)
+            thread = start(server)
+            client = UDPClient(timeout=2.0, **address)
+            expected = f"UDP эхо: {message}"
+            if client.connect():
+                round_trips(client, message, min(count, 1000), expected)
+                results.append((f"UDP {transport}", "по одному", round_trips(client, message, count, expected)))
+                client.disconnect()
+            server.stop()
+            thread.join(timeout=2.0)
+
+    os.rmdir(directory)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение AF_UNIX с TCP и UDP через loopback')
+    parser.add_argument('--host', default='127.0.0.1', help='Адрес loopback')
+    parser.add_argument('--port', type=int, default=9888, help='Порт TCP; UDP использует следующий')
+    parser.add_argument('--count', type=int, default=20000, help='Сколько сообщений в каждом замере')
+    parser.add_argument('--size', type=int, default=64, help='Размер сообщения в байтах')
+    args = parser.parse_args()
+
+    print(f"Сообщений: {args.count}, размер: {args.size} байт")
+    print(f"{'Транспорт':<16} {'Режим':<10} {'сообщ/с':>10} {'средн. мкс':>11} {'p99 мкс':>9} {'ошибок':>7}")
+    for transport, mode, result in run(args.host, args.port, args.count, args.size):
+        mean = f"{result['mean_us']:.1f}" if "mean_us" in result else "-"
+        p99 = f"{result['p99_us']:.1f}" if "p99_us" in result else "-"
+        print(f"{transport:<16} {mode:<10} {result['rate']:>10.0f} {mean:>11} {p99:>9} {result['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
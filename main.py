@@ -3,6 +3,7 @@ import argparse
 import sys
 import os
 import ssl
+from typing import Callable, Optional
 
 sys.path.insert(0, os.path.dirname(__file__))
 
@@ -12,6 +13,10 @@ from src.tls_tcp_server import TLSTCPServer
 from src.tls_tcp_client import TLSTCPClient
 from src.udp_server import UDPServer
 from src.udp_client import UDPClient
+from src.compression import FrameCompressor
+from src.logs import MESSAGE_RATE, setup_logging
+from src.tuning import PROFILES, SocketTuning
+from src.supervisor import Supervisor
 
 def generate_self_signed_cert():
     """Генерирует самоподписанный сертификат для тестирования"""
@@ -75,14 +80,77 @@ def generate_self_signed_cert():
         print("Для генерации сертификатов установите: pip install cryptography")
         return None, None
 
-def run_tcp_server(host: str, port: int):
+def build_compressor(args) -> Optional[FrameCompressor]:
+    """Создает настройки сжатия кадров из аргументов командной строки"""
+    if not args.compression:
+        return None
+    
+    dictionary = None
+    if args.compression_dict:
+        with open(args.compression_dict, 'rb') as f:
+            dictionary = f.read()
+    return FrameCompressor(args.compression, args.compression_threshold, dictionary=dictionary)
+
+def build_tuning(args) -> SocketTuning:
+    """Профиль сокетов с параметрами, заданными в командной строке поверх него"""
+    return SocketTuning.resolve(args.socket_profile).override(
+        nodelay=args.tcp_nodelay,
+        quickack=args.tcp_quickack,
+        rcvbuf=args.rcvbuf,
+        sndbuf=args.sndbuf,
+        fastopen=args.tcp_fastopen,
+        keepalive=args.keepalive,
+        keepidle=args.keepidle,
+    )
+
+def server_options(args) -> dict:
+    """Ограничения TCP и TLS серверов из аргументов командной строки"""
+    return {
+        "max_frame_size": args.max_frame_size,
+        "memory_budget": args.memory_budget or None,
+        "buffer_pool_size": args.buffer_pool_size,
+        "engine": args.engine,
+        "max_connections": args.max_connections,
+        "accept_queue": args.accept_queue,
+        "idle_timeout": args.idle_timeout or None,
+        "backlog": args.backlog,
+        "tuning": build_tuning(args),
+        "write_high_water": args.write_high_water,
+        "write_low_water": args.write_low_water,
+        "write_stall_timeout": args.write_stall_timeout or None,
+        "unix_socket": args.unix_socket,
+    }
+
+def serve(factory: Callable, processes: int = 1, cpu_affinity: bool = False, log_interval: Optional[float] = None):
+    """Запускает сервер в этом процессе или processes копий под супервизором"""
+    if processes > 1:
+        Supervisor(factory, processes, cpu_affinity=cpu_affinity, log_interval=log_interval).run()
+    else:
+        factory().start()
+
+def run_tcp_server(
+    host: str,
+    port: int,
+    compression: Optional[FrameCompressor] = None,
+    processes: int = 1,
+    cpu_affinity: bool = False,
+    **options
+):
     """Запускает обычный TCP сервер"""
-    server = TCPServer(host, port)
-    server.start()
+    serve(
+        lambda: TCPServer(host, port, compression=compression, reuse_port=processes > 1, **options),
+        processes, cpu_affinity
+    )
 
-def run_tcp_client(host: str, port: int):
+def run_tcp_client(
+    host: str,
+    port: int,
+    compression: Optional[FrameCompressor] = None,
+    tuning: Optional[SocketTuning] = None,
+    unix_socket: Optional[str] = None
+):
     """Запускает обычный TCP клиент"""
-    client = TCPClient(host, port)
+    client = TCPClient(host, port, compression=compression, tuning=tuning, unix_socket=unix_socket)
     
     if not client.connect():
         return
@@ -101,7 +169,17 @@ def run_tcp_client(host: str, port: int):
     finally:
         client.disconnect()
 
-def run_tls_tcp_server(host: str, port: int, certfile: str, keyfile: str, ca_certs: str):
+def run_tls_tcp_server(
+    host: str,
+    port: int,
+    certfile: str,
+    keyfile: str,
+    ca_certs: str,
+    compression: Optional[FrameCompressor] = None,
+    processes: int = 1,
+    cpu_affinity: bool = False,
+    **options
+):
     """Запускает TLS TCP сервер"""
     if not certfile or not keyfile:
         print("Генерация самоподписанных сертификатов...")
@@ -110,12 +188,29 @@ def run_tls_tcp_server(host: str, port: int, certfile: str, keyfile: str, ca_cer
             print("Не удалось сгенерировать сертификаты")
             return
     
-    server = TLSTCPServer(host, port, certfile=certfile, keyfile=keyfile, ca_certs=ca_certs)
-    server.start()
+    serve(
+        lambda: TLSTCPServer(
+            host, port, certfile=certfile, keyfile=keyfile, ca_certs=ca_certs, compression=compression,
+            reuse_port=processes > 1, **options
+        ),
+        processes, cpu_affinity
+    )
 
-def run_tls_tcp_client(host: str, port: int, ca_certs: str, certfile: str, keyfile: str):
+def run_tls_tcp_client(
+    host: str,
+    port: int,
+    ca_certs: str,
+    certfile: str,
+    keyfile: str,
+    compression: Optional[FrameCompressor] = None,
+    tuning: Optional[SocketTuning] = None,
+    unix_socket: Optional[str] = None
+):
     """Запускает TLS TCP клиент"""
-    client = TLSTCPClient(host, port, ca_certs=ca_certs, certfile=certfile, keyfile=keyfile)
+    client = TLSTCPClient(
+        host, port, ca_certs=ca_certs, certfile=certfile, keyfile=keyfile, compression=compression, tuning=tuning,
+        unix_socket=unix_socket
+    )
     
     if not client.connect():
         return
@@ -134,14 +229,30 @@ def run_tls_tcp_client(host: str, port: int, ca_certs: str, certfile: str, keyfi
     finally:
         client.disconnect()
 
-def run_udp_server(host: str, port: int):
+def run_udp_server(
+    host: str,
+    port: int,
+    processes: int = 1,
+    cpu_affinity: bool = False,
+    tuning: Optional[SocketTuning] = None,
+    unix_socket: Optional[str] = None,
+    log_interval: Optional[float] = None
+):
     """Запускает UDP сервер"""
-    server = UDPServer(host, port)
-    server.start()
+    serve(
+        lambda: UDPServer(host, port, reuse_port=processes > 1, tuning=tuning, unix_socket=unix_socket),
+        processes, cpu_affinity, log_interval
+    )
 
-def run_udp_client(host: str, port: int):
+def run_udp_client(
+    host: str,
+    port: int,
+    tuning: Optional[SocketTuning] = None,
+    unix_socket: Optional[str] = None,
+    reliable: bool = False
+):
     """Запускает UDP клиент"""
-    client = UDPClient(host, port)
+    client = UDPClient(host, port, tuning=tuning, unix_socket=unix_socket, reliable=reliable)
     
     if not client.connect():
         return
@@ -167,9 +278,62 @@ def main():
                        required=True, help='Режим работы')
     parser.add_argument('--host', default='localhost', help='Хост для подключения')
     parser.add_argument('--port', type=int, default=8888, help='Порт для подключения')
+    parser.add_argument('--unix-socket', metavar='PATH',
+                       help='Путь сокета AF_UNIX вместо --host и --port (клиент и сервер на одной машине)')
     parser.add_argument('--certfile', help='Путь к сертификату сервера (для TLS)')
     parser.add_argument('--keyfile', help='Путь к приватному ключу сервера (для TLS)')
     parser.add_argument('--ca-certs', help='Путь к корневому сертификату CA (для TLS)')
+    parser.add_argument('--compression', nargs='+', choices=FrameCompressor.CODECS,
+                       help='Кодеки сжатия кадров в порядке предпочтения (для TCP и TLS)')
+    parser.add_argument('--compression-threshold', type=int, default=1024,
+                       help='Сжимать кадры не короче этого размера в байтах')
+    parser.add_argument('--compression-dict', help='Файл общего словаря для сжатия маленьких сообщений (zlib)')
+    parser.add_argument('--max-frame-size', type=int, default=TCPServer.MAX_FRAME_SIZE,
+                       help='Максимальный размер кадра в байтах (для TCP и TLS серверов)')
+    parser.add_argument('--memory-budget', type=int, default=TCPServer.MEMORY_BUDGET,
+                       help='Общий лимит байт в приеме и обработке на все соединения, 0 - без лимита')
+    parser.add_argument('--engine', choices=TCPServer.ENGINES, default='threads',
+                       help='Движок TCP и TLS серверов: поток на клиента или один цикл событий asyncio')
+    parser.add_argument('--max-connections', type=int,
+                       help='Сколько соединений сервер обслуживает сразу (по умолчанию 1024 для threads, без ограничения для asyncio), 0 - без ограничения')
+    parser.add_argument('--accept-queue', type=int, default=128,
+                       help='Сколько принятых соединений ждут свободного потока (для --engine threads)')
+    parser.add_argument('--idle-timeout', type=float, default=TCPServer.IDLE_TIMEOUT,
+                       help='Закрывать соединения без данных дольше этого числа секунд, 0 - не закрывать')
+    parser.add_argument('--backlog', type=int, default=TCPServer.BACKLOG,
+                       help='Длина очереди еще не принятых соединений (listen) для TCP и TLS серверов')
+    parser.add_argument('--write-high-water', type=int, default=TCPServer.WRITE_HIGH_WATER,
+                       help='Байт неотправленных ответов соединения, после которых сервер перестает его читать')
+    parser.add_argument('--write-low-water', type=int, default=TCPServer.WRITE_LOW_WATER,
+                       help='До скольких байт должен опустеть буфер ответов, чтобы чтение продолжилось')
+    parser.add_argument('--write-stall-timeout', type=float, default=TCPServer.WRITE_STALL_TIMEOUT,
+                       help='Закрывать соединения, которые не читают ответы дольше этого числа секунд, 0 - не закрывать')
+    parser.add_argument('--buffer-pool-size', type=int, default=TCPServer.BUFFER_POOL_SIZE,
+                       help='Сколько байт свободных буферов приема хранит общий пул, 0 - без пула')
+    parser.add_argument('--socket-profile', choices=list(PROFILES), default='default',
+                       help='Профиль параметров сокетов: значения системы, малые задержки или большие объемы')
+    parser.add_argument('--tcp-nodelay', type=int, choices=[0, 1], help='TCP_NODELAY поверх профиля')
+    parser.add_argument('--tcp-quickack', type=int, choices=[0, 1], help='TCP_QUICKACK поверх профиля')
+    parser.add_argument('--rcvbuf', type=int, help='SO_RCVBUF в байтах поверх профиля')
+    parser.add_argument('--sndbuf', type=int, help='SO_SNDBUF в байтах поверх профиля')
+    parser.add_argument('--tcp-fastopen', type=int,
+                       help='TCP Fast Open поверх профиля: длина очереди у сервера, 1/0 у клиента')
+    parser.add_argument('--keepalive', type=int, choices=[0, 1], help='SO_KEEPALIVE поверх профиля')
+    parser.add_argument('--keepidle', type=int, help='Секунд простоя до первой проверки keepalive')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO',
+                       help='Уровень логов сервера')
+    parser.add_argument('--message-log-rate', type=float, default=MESSAGE_RATE,
+                       help='Сколько записей о соединениях и сообщениях в секунду пишет сервер, 0 - без ограничения')
+    parser.add_argument('--no-message-log', action='store_true',
+                       help='Не писать в лог каждое сообщение клиента (для замеров производительности)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Сколько процессов сервера слушают порт через SO_REUSEPORT (для всех серверов)')
+    parser.add_argument('--cpu-affinity', action='store_true',
+                       help='Привязать каждый процесс сервера к своему ядру (с --workers)')
+    parser.add_argument('--stats-log-interval', type=float, default=0,
+                       help='Раз в столько секунд писать в лог скорость приема и потери каждого процесса UDP сервера (с --workers), 0 - не писать')
+    parser.add_argument('--reliable', action='store_true',
+                       help='Надежный режим UDP клиента: повтор потерянных датаграмм и ответы по порядку')
     
     args = parser.parse_args()
     
@@ -181,18 +345,36 @@ def main():
         else:
             print("Предупреждение: SSLKEYLOGFILE не установлен. Wireshark не сможет расшифровать TLS трафик.")
     
+    if args.unix_socket and args.workers > 1:
+        parser.error("--workers несовместим с --unix-socket: путь сокета может занять только один процесс")
+    
+    compression = build_compressor(args)
+    tuning = build_tuning(args)
+    
+    if args.mode.endswith('_server'):
+        # Логи пишет отдельный поток, потоки клиентов не ждут вывода
+        setup_logging(args.log_level, args.message_log_rate or None, messages=not args.no_message_log)
+    
     if args.mode == 'tcp_server':
-        run_tcp_server(args.host, args.port)
+        run_tcp_server(args.host, args.port, compression, args.workers, args.cpu_affinity, **server_options(args))
     elif args.mode == 'tcp_client':
-        run_tcp_client(args.host, args.port)
+        run_tcp_client(args.host, args.port, compression, tuning, args.unix_socket)
     elif args.mode == 'tls_tcp_server':
-        run_tls_tcp_server(args.host, args.port, args.certfile, args.keyfile, args.ca_certs)
+        run_tls_tcp_server(
+            args.host, args.port, args.certfile, args.keyfile, args.ca_certs, compression,
+            args.workers, args.cpu_affinity, **server_options(args)
+        )
     elif args.mode == 'tls_tcp_client':
-        run_tls_tcp_client(args.host, args.port, args.ca_certs, args.certfile, args.keyfile)
+        run_tls_tcp_client(
+            args.host, args.port, args.ca_certs, args.certfile, args.keyfile, compression, tuning, args.unix_socket
+        )
     elif args.mode == 'udp_server':
-        run_udp_server(args.host, args.port)
+        run_udp_server(
+            args.host, args.port, args.workers, args.cpu_affinity, tuning, args.unix_socket,
+            args.stats_log_interval or None
+        )
     elif args.mode == 'udp_client':
-        run_udp_client(args.host, args.port)
+        run_udp_client(args.host, args.port, tuning, args.unix_socket, args.reliable)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
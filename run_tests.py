@@ -56,7 +56,30 @@ def main():
         ('tests/test_1_basic.py', 'Базовое подключение и обмен сообщениями'),
         ('tests/test_2_large_msg.py', 'Отправка больших сообщений (> MTU)'),
         ('tests/test_3_netcat.py', 'Совместимость с netcat'),
-        ('tests/test_4_stability.py', 'Стабильность при долгой работе')
+        ('tests/test_4_stability.py', 'Стабильность при долгой работе'),
+        ('tests/test_5_framing.py', 'Разбор и запись кадров TCP протокола'),
+        ('tests/test_6_compression.py', 'Согласованное сжатие кадров'),
+        ('tests/test_7_streaming.py', 'Потоковая передача сообщений'),
+        ('tests/test_8_multiplexing.py', 'Мультиплексирование запросов'),
+        ('tests/test_9_pipelining.py', 'Конвейерная отправка сообщений'),
+        ('tests/test_10_limits.py', 'Ограничение размера кадров и бюджет памяти'),
+        ('tests/test_11_buffer_pool.py', 'Общий пул буферов приема'),
+        ('tests/test_12_asyncio_engine.py', 'Сервер на asyncio'),
+        ('tests/test_13_connections.py', 'Пул потоков и реестр соединений'),
+        ('tests/test_14_workers.py', 'Несколько процессов сервера на одном порту'),
+        ('tests/test_15_accept.py', 'Прием соединений без опроса по таймауту'),
+        ('tests/test_16_handlers.py', 'Подключаемые обработчики сообщений'),
+        ('tests/test_17_logging.py', 'Логи сервера в фоновом потоке'),
+        ('tests/test_18_tuning.py', 'Профили параметров сокетов'),
+        ('tests/test_19_backpressure.py', 'Буфер ответов и медленные клиенты'),
+        ('tests/test_20_unix.py', 'Сокеты AF_UNIX'),
+        ('tests/test_21_client_pool.py', 'Пул клиентов'),
+        ('tests/test_22_async_clients.py', 'Асинхронные клиенты TCP и UDP'),
+        ('tests/test_23_balancer.py', 'Балансировка между несколькими серверами'),
+        ('tests/test_24_udp_fanout.py', 'Прием UDP несколькими процессами и потери ядра'),
+        ('tests/test_25_reliable_udp.py', 'Надежный режим UDP'),
+        ('tests/test_26_udp_fragmentation.py', 'Фрагментация длинных сообщений UDP'),
+        ('tests/test_27_udp_request_ids.py', 'Идентификаторы запросов UDP и окно запросов')
     ]
     
     results = []
@@ -0,0 +1,72 @@
+import time
+from typing import Optional
+
+def listen_overflows() -> Optional[int]:
+    """Сколько раз очередь accept слушающих сокетов машины переполнялась (только Linux)
+
+    Ядро считает ListenOverflows по всем слушающим сокетам сразу, отдельного
+    счетчика для сокета нет. None - счетчик недоступен.
+    """
+    try:
+        with open('/proc/net/netstat') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for names, values in zip(lines[::2], lines[1::2]):
+        if names.startswith('TcpExt:'):
+            counters = dict(zip(names.split()[1:], values.split()[1:]))
+            if 'ListenOverflows' in counters:
+                return int(counters['ListenOverflows'])
+    return None
+
+class AcceptStats:
+    """Счетчики приема соединений сервера
+
+    Счетчики меняет только поток, который принимает соединения (цикл accept
+    или цикл событий asyncio), поэтому блокировка не нужна.
+    """
+
+    def __init__(self):
+        self.accepted = 0    # Всего принято соединений
+        self.rejected = 0    # Из них сразу закрыто сверх предела соединений
+        self.peak_batch = 0  # Больше всего соединений, принятых за одно пробуждение
+        self._overflows_at_start = None
+        self._second = 0     # Секунда, за которую сейчас считаются соединения
+        self._count = 0      # Принято за эту секунду
+        self._previous = 0   # Принято за предыдущую секунду
+
+    def started(self):
+        """Запоминает счетчик переполнений очереди accept на момент запуска"""
+        self._overflows_at_start = listen_overflows()
+
+    def accept(self):
+        second = int(time.monotonic())
+        if second != self._second:
+            self._previous = self._count if second == self._second + 1 else 0
+            self._second, self._count = second, 0
+        self._count += 1
+        self.accepted += 1
+
+    def batch(self, size: int):
+        """Отмечает, сколько соединений принято за одно пробуждение"""
+        self.peak_batch = max(self.peak_batch, size)
+
+    def rate(self) -> int:
+        """Соединений в секунду за последнюю полную секунду"""
+        second = int(time.monotonic())
+        if second == self._second:
+            return self._previous
+        return self._count if second == self._second + 1 else 0
+
+    def stats(self) -> dict:
+        stats = {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "rate": self.rate(),
+            "peak_batch": self.peak_batch,
+        }
+        overflows = listen_overflows()
+        if overflows is not None and self._overflows_at_start is not None:
+            # Переполнения на всей машине с запуска сервера
+            stats["backlog_overflows"] = overflows - self._overflows_at_start
+        return stats
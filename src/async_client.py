@@ -0,0 +1,499 @@
+import asyncio
+import itertools
+import random
+import socket
+import time
+from typing import Dict, List, Optional, Union
+from src.compression import FrameCompressor
+from src.protocols import Frame, FrameDecoder, FrameTooLargeError, TCPProtocol, UDPProtocol, UDPReassembler
+from src.tls_tcp_client import client_ssl_context
+from src.tuning import SocketTuning
+from src.unix import bind_reply_address, unlink_unix
+
+class _FrameClientProtocol(asyncio.Protocol):
+    """Соединение асинхронного клиента: разбирает кадры ответов в data_received
+
+    Ответы с идентификатором завершают Future своего запроса, ответ hello
+    без идентификатора - Future согласования. Пока транспорт не успевает
+    отправлять, новые запросы ждут в wait_writable.
+    """
+
+    def __init__(self, client: 'AsyncTCPClient'):
+        self.client = client
+        self.transport = None
+        self.decoder = FrameDecoder(client.buffer_size)
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.hello: Optional[asyncio.Future] = None
+        self.error: Optional[Exception] = None
+        self.closed = asyncio.get_running_loop().create_future()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        try:
+            frames = self.decoder.feed(data)
+        except FrameTooLargeError as e:
+            self.error = e
+            self.transport.abort()
+            return
+        for frame in frames:
+            if not frame.stream_id:
+                if self.hello is not None and not self.hello.done():
+                    self.hello.set_result(frame)
+                continue
+            future = self.pending.pop(frame.stream_id, None)
+            if future is None or future.done():
+                continue  # Ответ на запрос, который отменили или не дождались
+            if frame.flags & TCPProtocol.FLAG_CONTROL:
+                message = TCPProtocol.parse_control(frame).get("error")
+                future.set_exception(RuntimeError(f"Ошибка сервера: {message}"))
+            else:
+                try:
+                    future.set_result(str(self.client._decompress(frame), 'utf-8'))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.decoder.close()
+        if self.error is None:
+            self.error = exc or ConnectionError("Сервер отключился")
+        # Запросы, на которые ответа уже не будет, завершаются ошибкой
+        waiting = list(self.pending.values())
+        if self.hello is not None:
+            waiting.append(self.hello)
+        self.pending.clear()
+        for future in waiting:
+            if not future.done():
+                future.set_exception(self.error)
+        self._writable.set()  # Будит ждущих записи, они увидят закрытие
+        self.closed.set_result(None)
+
+    def pause_writing(self):
+        self._writable.clear()
+
+    def resume_writing(self):
+        self._writable.set()
+
+    def write(self, frames: List[Frame]):
+        """Отправляет кадры одним вызовом writelines без копирования данных"""
+        if self.transport.is_closing():
+            raise ConnectionError("Соединение с сервером закрыто")
+        self.transport.writelines(TCPProtocol.message_buffers(frames))
+
+    async def wait_writable(self):
+        """Ждет, пока буфер записи транспорта опустится ниже нижней границы"""
+        await self._writable.wait()
+        if self.transport.is_closing():
+            raise self.error or ConnectionError("Соединение с сервером закрыто")
+
+class AsyncTCPClient:
+    """Клиент TCP сервера для asyncio: много одновременных запросов в одном цикле событий
+
+    Каждый запрос уходит кадром с идентификатором (как submit у TCPClient),
+    поэтому любое число корутин может одновременно ждать ответов по одному
+    соединению: сервер обрабатывает запросы параллельно, а ответы
+    сопоставляются с запросами по идентификатору. У каждого вызова свой
+    таймаут; ответ на отмененный или просроченный запрос отбрасывается, и
+    соединение остается пригодным для следующих запросов.
+    """
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8888,
+        buffer_size: int = 4096,
+        compression: Optional[FrameCompressor] = None,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        self.host = host
+        self.port = port
+        # Путь сокета AF_UNIX сервера на этой машине; host и port тогда не используются
+        self.unix_socket = unix_socket
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self.tuning = SocketTuning.resolve(tuning)
+        self.socket_options = {}
+        # Таймаут подключения и запросов по умолчанию; None - ждать без ограничения
+        self.timeout = timeout
+        self.compressor = None
+        self._protocol: Optional[_FrameClientProtocol] = None
+        self._next_stream_id = 1
+
+    @property
+    def address(self):
+        """Адрес сервера для connect"""
+        return self.unix_socket or (self.host, self.port)
+
+    @property
+    def endpoint(self) -> str:
+        """Адрес сервера для сообщений"""
+        return self.unix_socket or f"{self.host}:{self.port}"
+
+    @property
+    def connected(self) -> bool:
+        return self._protocol is not None and not self._protocol.closed.done()
+
+    @property
+    def in_flight(self) -> int:
+        """Сколько запросов ждут ответа"""
+        return len(self._protocol.pending) if self._protocol else 0
+
+    async def __aenter__(self) -> 'AsyncTCPClient':
+        if not await self.connect():
+            raise ConnectionError(f"Не удалось подключиться к {self.endpoint}")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.disconnect()
+
+    async def connect(self) -> bool:
+        """Подключается к серверу и согласует сжатие, если оно настроено"""
+        try:
+            await asyncio.wait_for(self._connect(), self.timeout)
+            print(f"Подключен к {self._server_name()} серверу {self.endpoint}")
+            return await self._negotiate()
+        except Exception as e:
+            print(f"Ошибка подключения: {e}")
+            await self.disconnect()
+            return False
+
+    def _server_name(self) -> str:
+        return "TCP"
+
+    def _ssl_options(self) -> dict:
+        """Параметры TLS для create_connection"""
+        return {}
+
+    async def _connect(self):
+        loop = asyncio.get_running_loop()
+        family = socket.AF_UNIX if self.unix_socket else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            # Параметры профиля нужно задать до connect
+            self.socket_options = self.tuning.apply(sock)
+            sock.setblocking(False)
+            await loop.sock_connect(sock, self.address)
+            _, self._protocol = await loop.create_connection(
+                lambda: _FrameClientProtocol(self), sock=sock, **self._ssl_options()
+            )
+        except BaseException:
+            sock.close()
+            raise
+
+    async def _negotiate(self) -> bool:
+        if not self.compression:
+            return True
+
+        compressor = self.compression.copy()
+        offer = {"type": "hello"}
+        offer.update(compressor.offer())
+        self._protocol.hello = asyncio.get_running_loop().create_future()
+        self._protocol.write([TCPProtocol.control_frame(offer)])
+        frame = await asyncio.wait_for(self._protocol.hello, self.timeout)
+        answer = TCPProtocol.parse_control(frame) if frame.flags & TCPProtocol.FLAG_CONTROL else {}
+        if answer.get("type") != "hello":
+            print("Сервер не поддерживает согласование сжатия")
+            await self.disconnect()
+            return False
+        compressor.apply(answer)
+        self.compressor = compressor
+        print(f"Сжатие: {self.compressor.codec or 'отключено'}")
+        return True
+
+    async def send_message(self, message: str, timeout: Optional[float] = None) -> str:
+        """Отправляет сообщение и возвращает ответ или текст ошибки
+
+        Отмена вызывающей задачи не перехватывается: CancelledError
+        поднимается как обычно.
+        """
+        if not self.connected:
+            return "Не подключен к серверу"
+        try:
+            return await self.request(message, timeout)
+        except asyncio.TimeoutError:
+            return "Таймаут ожидания ответа"
+        except Exception as e:
+            return f"Ошибка отправки: {e}"
+
+    async def request(self, message: str, timeout: Optional[float] = None) -> str:
+        """Как send_message, но ошибки поднимаются исключениями
+
+        timeout ограничивает весь вызов вместе с ожиданием места в буфере
+        записи; None - таймаут клиента. По истечении поднимается
+        asyncio.TimeoutError.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._exchange(message), timeout)
+
+    async def _exchange(self, message: str) -> str:
+        protocol = self._protocol
+        if protocol is None or protocol.closed.done():
+            raise ConnectionError("Не подключен к серверу")
+        await protocol.wait_writable()
+
+        stream_id = self._next_stream_id
+        self._next_stream_id = stream_id % TCPProtocol.MAX_STREAM_ID + 1
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[stream_id] = future
+        try:
+            protocol.write([self._compress(message.encode('utf-8'))._replace(stream_id=stream_id)])
+            return await future
+        finally:
+            # После отмены или таймаута опоздавший ответ не найдет запроса
+            protocol.pending.pop(stream_id, None)
+
+    def _compress(self, data) -> Frame:
+        if self.compressor:
+            return self.compressor.compress(data)
+        return Frame(data)
+
+    def _decompress(self, frame: Frame):
+        if self.compressor:
+            return self.compressor.decompress(frame)
+        return frame.payload
+
+    async def disconnect(self):
+        """Закрывает соединение; ждущие ответа запросы завершаются ConnectionError"""
+        protocol = self._protocol
+        self._protocol = None
+        self.compressor = None
+        if protocol is None or protocol.transport is None:
+            return
+        protocol.transport.close()
+        await protocol.closed
+
+class AsyncTLSTCPClient(AsyncTCPClient):
+    """AsyncTCPClient поверх TLS; проверка сертификатов как у TLSTCPClient"""
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8888,
+        buffer_size: int = 4096,
+        ca_certs: Optional[str] = None,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+        compression: Optional[FrameCompressor] = None,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None,
+        timeout: Optional[float] = None
+    ):
+        super().__init__(host, port, buffer_size, compression, tuning, unix_socket, timeout)
+        self.ca_certs = ca_certs
+        self.certfile = certfile
+        self.keyfile = keyfile
+
+    def _server_name(self) -> str:
+        return "TLS TCP"
+
+    def _ssl_options(self) -> dict:
+        return {
+            "ssl": client_ssl_context(self.ca_certs, self.certfile, self.keyfile),
+            "server_hostname": self.host,
+        }
+
+class _DatagramClientProtocol(asyncio.DatagramProtocol):
+    """Сокет AsyncUDPClient: ответ завершает Future запроса с тем же идентификатором
+
+    Ответ, пришедший фрагментами, собирается перед разбором. Ответ без
+    идентификатора или на уже снятый запрос считается опоздавшим (stale).
+    """
+
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.reply_path = ''  # Файл своего адреса AF_UNIX, если он создан
+        self.reassembly = UDPReassembler()
+        self.stale = 0
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        if data and data[0] == UDPProtocol.MARKER_FRAGMENT:
+            data = self.reassembly.add(data, addr, time.monotonic())
+            if data is None:
+                return
+        try:
+            request_id, payload = UDPProtocol.split_request(data)
+        except ValueError:
+            self.stale += 1
+            return
+        waiter = self.pending.pop(request_id, None)
+        if waiter is None or waiter.done():
+            self.stale += 1
+            return
+        waiter.set_result(payload)
+
+    def error_received(self, exc: Exception):
+        # Например, ICMP port unreachable, когда сервер не запущен: по ошибке
+        # не понять, какой запрос ее вызвал, поэтому она достается всем ждущим
+        self._fail(exc)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self._fail(exc or ConnectionError("Сокет закрыт"))
+        if self.reply_path:
+            unlink_unix(self.reply_path)
+
+    def _fail(self, exc: Exception):
+        pending, self.pending = self.pending, {}
+        for waiter in pending.values():
+            if not waiter.done():
+                waiter.set_exception(exc)
+
+class AsyncUDPClient:
+    """Клиент UDP сервера для asyncio
+
+    Все запросы идут через один сокет: каждый помечается идентификатором
+    (UDPProtocol.tag_request), и ответ завершает Future своего запроса,
+    в каком бы порядке ответы ни пришли. Одновременно ждут ответа до
+    max_in_flight запросов, следующие ждут своей очереди. Таймаут или
+    отмена снимают запрос, и опоздавший ответ на него только увеличивает
+    счетчик stale, а не достается чужому запросу.
+    """
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8889,
+        timeout: Optional[float] = 5.0,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None,
+        max_in_flight: int = 64,
+        datagram_size: int = UDPProtocol.DATAGRAM_SIZE
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight должно быть не меньше 1")
+        self.host = host
+        self.port = port
+        # Путь датаграммного сокета AF_UNIX сервера; host и port тогда не используются
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+        # Для UDP из профиля применяются только размеры буферов
+        self.tuning = SocketTuning.resolve(tuning)
+        self.socket_options = {}
+        # Ограничивает запросы без ответа, чтобы не переполнить буфер приема сервера
+        self.max_in_flight = max_in_flight
+        # Сообщения длиннее datagram_size уходят фрагментами, ответ сервер присылает так же
+        self.datagram_size = datagram_size
+        self._request_ids = itertools.count(random.getrandbits(32))
+        self.running = False
+        self.requests = 0
+        self.replies = 0
+        self.lost = 0  # Запросы без ответа за timeout
+        self._endpoint: Optional[_DatagramClientProtocol] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def address(self):
+        return self.unix_socket or (self.host, self.port)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._endpoint.pending) if self._endpoint else 0
+
+    async def __aenter__(self) -> 'AsyncUDPClient':
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.disconnect()
+
+    async def connect(self) -> bool:
+        """Создает сокет, через который идут все запросы"""
+        try:
+            self._endpoint = await self._open()
+        except Exception as e:
+            print(f"Ошибка создания сокета: {e}")
+            return False
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.running = True
+        print(f"UDP клиент готов к отправке на {self.unix_socket or f'{self.host}:{self.port}'}")
+        return True
+
+    async def _open(self) -> _DatagramClientProtocol:
+        family = socket.AF_UNIX if self.unix_socket else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            self.socket_options = self.tuning.apply(sock)
+            # Без своего адреса сервер AF_UNIX не сможет ответить
+            reply_path = bind_reply_address(sock) if self.unix_socket else ''
+            sock.setblocking(False)
+            _, protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+                _DatagramClientProtocol, sock=sock
+            )
+        except BaseException:
+            sock.close()
+            raise
+        protocol.reply_path = reply_path
+        return protocol
+
+    async def send_message(self, message: str, timeout: Optional[float] = None) -> str:
+        """Отправляет сообщение и возвращает ответ или текст ошибки"""
+        if not self.running:
+            return "Сокет не создан"
+        try:
+            return await self.request(message, timeout)
+        except asyncio.TimeoutError:
+            return "Таймаут ожидания ответа"
+        except Exception as e:
+            return f"Ошибка отправки: {e}"
+
+    async def request(self, message: str, timeout: Optional[float] = None) -> str:
+        """Как send_message, но ошибки поднимаются исключениями
+
+        timeout ограничивает весь вызов вместе с ожиданием очереди
+        на отправку; None - таймаут клиента.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(self._exchange(message), timeout)
+        except asyncio.TimeoutError:
+            self.lost += 1
+            raise
+
+    async def _exchange(self, message: str) -> str:
+        if not self.running:
+            raise ConnectionError("Сокет не создан")
+        async with self._slots:
+            endpoint = self._endpoint
+            if endpoint.transport.is_closing():
+                raise ConnectionError("Сокет закрыт")
+            request_id = next(self._request_ids) & 0xFFFFFFFF
+            waiter = asyncio.get_running_loop().create_future()
+            endpoint.pending[request_id] = waiter
+            try:
+                data = UDPProtocol.tag_request(request_id, UDPProtocol.create_message(message))
+                # Номер сообщения для фрагментов - тот же идентификатор запроса
+                for datagram in UDPProtocol.fragment(data, request_id, self.datagram_size):
+                    endpoint.transport.sendto(datagram, self.address)
+                self.requests += 1
+                payload = await waiter
+            finally:
+                # Снятый запрос: его опоздавший ответ будет учтен как stale
+                endpoint.pending.pop(request_id, None)
+        self.replies += 1
+        return UDPProtocol.parse_message(payload)
+
+    def stats(self) -> dict:
+        """Счетчики запросов: ответы, потери по таймауту и опоздавшие ответы"""
+        return {
+            "requests": self.requests,
+            "replies": self.replies,
+            "lost": self.lost,
+            "stale": self._endpoint.stale if self._endpoint else 0,
+            "in_flight": self.in_flight,
+        }
+
+    async def disconnect(self):
+        """Закрывает сокет; ждущие ответа запросы завершаются ConnectionError"""
+        self.running = False
+        if self._endpoint is not None:
+            self._endpoint.transport.close()
+        # Транспорт закрывается на следующей итерации цикла событий
+        await asyncio.sleep(0)
@@ -0,0 +1,313 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, Optional
+from src.budget import MemoryBudgetExceeded
+from src.logs import connection_logger
+from src.protocols import Frame, FrameDecoder, FrameTooLargeError, TCPProtocol
+from src.session import ServerSession
+
+class FrameProtocol(asyncio.Protocol):
+    """Соединение асинхронного сервера: кадры разбираются прямо в data_received
+
+    Обычные кадры обрабатываются в цикле событий по порядку. Запросы с
+    идентификатором уходят в пул потоков сервера, а потоковое сообщение -
+    в отдельный поток, потому что обработчик потока сам вытягивает части
+    запроса. Пока поток принимается, следующие кадры ждут его окончания.
+    """
+
+    STREAM_QUEUE_LIMIT = 8  # Сколько частей потока ждут обработчика, прежде чем чтение встанет
+
+    def __init__(self, engine: 'AsyncioEngine'):
+        self.engine = engine
+        self.server = engine.server
+        self.transport = None
+        self.addr = None
+        self.session = None
+        # Буферы пула не используются: транспорт может держать ссылку на
+        # данные ответа дольше, чем живет кадр из пула
+        self.decoder = FrameDecoder(self.server.buffer_size, self.server.max_frame_size, self.server.budget)
+        # Цикл событий не может ждать места в бюджете, без места соединение отклоняется
+        self.decoder.budget_timeout = 0
+        self.inflight = 0
+        self.backlog = deque()    # Кадры, пришедшие вслед за потоковым сообщением
+        self.stream = None        # Очередь частей потока для потока-обработчика
+        self.stream_open = False  # Части текущего потока еще принимаются
+        self.rejected = False
+        self.last_activity = time.monotonic()  # Когда последний раз пришли данные
+        self._linger = None
+        self._pauses = set()      # Причины, по которым чтение приостановлено
+        self._stall = None        # Таймер отключения клиента, который не читает ответы
+
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        # У клиента AF_UNIX адреса обычно нет, в логах его заменяет путь сервера
+        self.addr = transport.get_extra_info('peername') or self.server.unix_socket
+        self.server.tuning.apply_accepted(transport.get_extra_info('socket'))
+        self.session = ServerSession(
+            self.server.name, self.addr, self.server.compression, self.server.max_frame_size, self.server.handler
+        )
+        self.server.accept_stats.accept()
+        connection_logger.info("Подключен клиент: %s", self.addr)
+        limit = self.server.max_connections
+        if limit is not None and len(self.server.connections) >= limit:
+            self.server.accept_stats.rejected += 1
+            connection_logger.warning("Соединение с %s отклонено: достигнут предел %s соединений", self.addr, limit)
+            transport.abort()
+            return
+        self.server.connections.add(self, self.addr)
+        transport.set_write_buffer_limits(self.server.write_high_water, self.server.write_low_water)
+        if transport.get_extra_info('ssl_object') is not None:
+            connection_logger.info("TLS соединение установлено с %s", self.addr)
+
+    def data_received(self, data: bytes):
+        self.last_activity = time.monotonic()
+        if self.rejected:
+            return  # Данные отклоненного соединения отбрасываются
+        try:
+            frames = self.decoder.feed(data)
+        except (FrameTooLargeError, MemoryBudgetExceeded) as e:
+            self._reject(e)
+            return
+        self._process_safely(frames)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self.server.connections.remove(self)
+        self.decoder.close()
+        if self._linger:
+            self._linger.cancel()
+        if self._stall:
+            self._stall.cancel()
+        if self.stream is not None:
+            self.stream.put(None)  # Будит поток-обработчик
+        if isinstance(exc, ConnectionResetError):
+            connection_logger.info("Клиент %s отключился", self.addr)
+        connection_logger.info("Соединение %s с %s закрыто", self.server.name, self.addr)
+
+    def evict(self):
+        """Закрывает соединение по решению реестра соединений"""
+        if 'writing' in self._pauses or self.transport.is_closing():
+            # close ждал бы, пока клиент дочитает буфер записи
+            self.transport.abort()
+        else:
+            self.transport.close()
+
+    def pause_writing(self):
+        # Клиент не читает ответы - перестаем читать его запросы
+        self._pause('writing')
+        timeout = self.server.write_stall_timeout
+        if timeout is not None:
+            self._stall = self.engine.loop.call_later(timeout, self._write_stalled)
+
+    def resume_writing(self):
+        if self._stall:
+            self._stall.cancel()
+            self._stall = None
+        self._resume('writing')
+
+    def _write_stalled(self):
+        self._stall = None
+        self.server.connections.evict_stalled(self, self.server.write_stall_timeout)
+
+    def _process_safely(self, frames: List[Frame]):
+        """Обрабатывает кадры; ошибка обработки закрывает соединение"""
+        try:
+            self._process(frames)
+        except MemoryBudgetExceeded as e:
+            self._reject(e)
+        except Exception as e:
+            connection_logger.error("Ошибка с клиентом %s: %s", self.addr, e)
+            self.transport.close()
+
+    def _process(self, frames: List[Frame]):
+        """Обрабатывает кадры одного чтения, ответы на обычные кадры уходят вместе"""
+        responses = []
+        for frame in frames:
+            if self.stream is not None:
+                if self.stream_open:
+                    self._feed_stream(frame)
+                else:
+                    self.backlog.append(frame)
+                continue
+
+            if frame.stream_id:
+                self._submit(frame)
+                continue
+
+            if frame.flags & TCPProtocol.FLAG_MORE:
+                self._write(responses)
+                responses = []
+                self._start_stream(frame)
+                continue
+
+            responses.extend(self.session.handle_frames([frame]))
+            if self.session.closed:
+                self._write(responses)
+                self.transport.close()
+                return
+        self._write(responses)
+
+    def _write(self, frames: List[Frame]):
+        if frames and not self.transport.is_closing():
+            self.transport.writelines(TCPProtocol.message_buffers(frames))
+
+    def _submit(self, frame: Frame):
+        """Отправляет запрос с идентификатором в пул потоков сервера"""
+        size = len(frame.payload)
+        if self.server.budget:
+            self.server.budget.acquire(size, timeout=0)
+        try:
+            future = self.engine.loop.run_in_executor(self.server.executor, self.session.handle_multiplexed, frame)
+        except RuntimeError:
+            if self.server.budget:
+                self.server.budget.release(size)
+            raise  # Пул уже остановлен вместе с сервером
+        self.inflight += 1
+        if self.inflight >= self.server.max_inflight:
+            self._pause('inflight')
+        future.add_done_callback(lambda done: self._multiplexed_done(done, size))
+
+    def _multiplexed_done(self, future: asyncio.Future, size: int):
+        self.inflight -= 1
+        if self.server.budget:
+            self.server.budget.release(size)
+        if not future.cancelled() and future.exception() is None:
+            self._write([future.result()])
+        if self.inflight < self.server.max_inflight:
+            self._resume('inflight')
+
+    def _start_stream(self, first: Frame):
+        self.stream = queue.Queue()
+        self.stream_open = True
+        self._feed_stream(first)
+        thread = threading.Thread(target=self._run_stream, args=(self.stream,))
+        thread.daemon = True
+        thread.start()
+
+    def _feed_stream(self, frame: Frame):
+        self.stream.put(frame)
+        if not frame.flags & TCPProtocol.FLAG_MORE:
+            self.stream_open = False
+        if self.stream.qsize() >= self.STREAM_QUEUE_LIMIT:
+            self._pause('stream')
+
+    def _stream_frames(self, frames: queue.Queue) -> Iterator[Frame]:
+        """Части потока для обработчика; выполняется в потоке-обработчике"""
+        while True:
+            frame = frames.get()
+            if frame is None:
+                raise ConnectionResetError("Соединение закрыто посреди потокового сообщения")
+            self.engine.call_soon(self._stream_drained, frames)
+            yield frame
+            if not frame.flags & TCPProtocol.FLAG_MORE:
+                return
+
+    def _run_stream(self, frames: queue.Queue):
+        """Поток-обработчик: ответ уходит по частям, пока запрос еще принимается"""
+        error = None
+        try:
+            for reply in self.session.stream_replies(self._stream_frames(frames)):
+                self.engine.call_soon(self._write, [reply])
+        except Exception as e:
+            error = e
+        self.engine.call_soon(self._stream_finished, error)
+
+    def _stream_drained(self, frames: queue.Queue):
+        if frames is self.stream and frames.qsize() < self.STREAM_QUEUE_LIMIT:
+            self._resume('stream')
+
+    def _stream_finished(self, error: Optional[Exception]):
+        self.stream = None
+        if error is not None:
+            if not self.transport.is_closing():
+                connection_logger.error("Ошибка с клиентом %s: %s", self.addr, error)
+                self.transport.close()
+            return
+        self._resume('stream')
+        frames = list(self.backlog)
+        self.backlog.clear()
+        self._process_safely(frames)
+
+    def _reject(self, error: Exception):
+        """Закрывает соединение на запись и отбрасывает входящие данные до закрытия клиентом"""
+        connection_logger.warning("Соединение с клиентом %s отклонено: %s", self.addr, error)
+        self.rejected = True
+        self.decoder.close()
+        if not self.transport.can_write_eof():
+            self.transport.close()
+            return
+        self.transport.write_eof()
+        self._linger = self.engine.loop.call_later(self.server.LINGER_TIMEOUT, self.transport.close)
+
+    def _pause(self, reason: str):
+        if not self._pauses and not self.transport.is_closing():
+            self.transport.pause_reading()
+        self._pauses.add(reason)
+
+    def _resume(self, reason: str):
+        if reason not in self._pauses:
+            return
+        self._pauses.discard(reason)
+        if not self._pauses and not self.transport.is_closing():
+            self.transport.resume_reading()
+
+class AsyncioEngine:
+    """Движок TCPServer на asyncio: все соединения обслуживает один цикл событий
+
+    Вместо потока на клиента соединение - это FrameProtocol, поэтому один
+    процесс держит десятки тысяч соединений. Сокет сервера слушает
+    TCPServer, движок только принимает на нем соединения.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.loop = None
+        self._stopped = None
+
+    def run(self):
+        """Обслуживает соединения, пока не вызван stop"""
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self._stopped = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        if not self.server.running:
+            self.server.server_socket.close()
+            return
+
+        listener = await self.loop.create_server(
+            lambda: FrameProtocol(self),
+            sock=self.server.server_socket,
+            ssl=self.server._server_ssl_context(),
+            backlog=self.server.backlog  # create_server заново вызывает listen, очередь должна остаться длинной
+        )
+        if self.server.connections.idle_timeout is not None:
+            self._schedule_eviction()
+        try:
+            await self._stopped.wait()
+        finally:
+            listener.close()
+            self.server.connections.evict_all()
+            try:
+                await asyncio.wait_for(listener.wait_closed(), timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+
+    def _schedule_eviction(self):
+        """Проверяет простаивающие соединения по таймеру цикла событий"""
+        self.server.connections.evict_idle()
+        self.loop.call_later(min(1.0, self.server.connections.idle_timeout / 4), self._schedule_eviction)
+
+    def call_soon(self, callback, *args):
+        """Выполняет callback в цикле событий из другого потока"""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Цикл событий уже остановлен
+
+    def stop(self):
+        """Останавливает цикл событий; можно вызывать из любого потока"""
+        if self.loop is not None:
+            self.call_soon(self._stopped.set)
@@ -0,0 +1,308 @@
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+from src.client_pool import ClientPool
+from src.tcp_client import TCPClient
+
+Endpoint = Union[str, Tuple[str, int]]
+
+class _Endpoint:
+    """Сервер балансировщика: пул соединений и скользящие оценки его работы"""
+
+    def __init__(self, host: str, port: int, pool: ClientPool):
+        self.name = f"{host}:{port}"
+        self.pool = pool
+        self.outstanding = 0         # Запросы, ждущие ответа
+        self.latency = None          # Скользящее среднее задержки ответа, секунды
+        self.error_rate = 0.0        # Скользящая доля ошибок
+        self.samples = 0             # Запросов с начала наблюдения (после возврата в работу)
+        self.ejected_until = None    # До какого момента сервер исключен из выбора
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+
+class BalancingClient:
+    """Клиент нескольких серверов: распределяет запросы по нагрузке
+
+    Для каждого сервера держится свой ClientPool, поэтому клиентом можно
+    пользоваться из многих потоков. Запрос уходит серверу с наименьшим
+    числом ждущих ответа запросов (least_outstanding) или лучшему из двух
+    случайных (power_of_two). Сервер, у которого доля ошибок выше
+    error_threshold или задержка в latency_factor раз выше медианы
+    остальных, исключается на ejection_time секунд, но исключенными
+    одновременно бывают не больше max_ejected серверов.
+
+    С hedge_delay запрос, на который за это время не пришел ответ,
+    дублируется другому серверу, и возвращается первый ответ. Дублировать
+    можно только запросы, которые безопасно выполнить дважды.
+    """
+
+    STRATEGIES = ('least_outstanding', 'power_of_two')
+    EWMA_WEIGHT = 0.2  # Вес нового замера в скользящих средних
+    LATENCY_MARGIN = 0.01  # Разница задержек меньше 10 мс - шум, а не выброс
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        client_factory: Callable[[str, int], TCPClient] = TCPClient,
+        strategy: str = 'least_outstanding',
+        pool_size: int = 8,
+        checkout_timeout: Optional[float] = 5.0,
+        retries: int = 1,
+        error_threshold: float = 0.5,
+        latency_factor: Optional[float] = 3.0,
+        min_samples: int = 10,
+        ejection_time: float = 10.0,
+        max_ejected: float = 0.5,
+        hedge_delay: Optional[float] = None
+    ):
+        if not endpoints:
+            raise ValueError("Нужен хотя бы один сервер")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия {strategy}, доступны: {', '.join(self.STRATEGIES)}")
+        self.addresses = [self._parse(endpoint) for endpoint in endpoints]
+        # Создает еще не подключенный клиент сервера, например TLSTCPClient или UDPClient
+        self.client_factory = client_factory
+        self.strategy = strategy
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        # Сколько раз запрос повторяется на другом сервере после ошибки
+        self.retries = retries
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor  # None - не исключать по задержке
+        self.min_samples = min_samples        # Сколько запросов нужно, чтобы судить о сервере
+        self.ejection_time = ejection_time
+        self.max_ejected = max_ejected        # Доля серверов, которые можно исключить одновременно
+        self.hedge_delay = hedge_delay        # None - не дублировать запросы
+        self._endpoints: List[_Endpoint] = []
+        self._executor = None
+        self._lock = threading.Lock()
+        # Счетчики для stats()
+        self.retried = 0
+        self.hedges = 0
+        self.hedge_wins = 0  # Ответов, пришедших раньше от дублирующего запроса
+
+    @staticmethod
+    def _parse(endpoint: Endpoint) -> Tuple[str, int]:
+        """Адрес сервера из (host, port) или строки host:port"""
+        if isinstance(endpoint, str):
+            host, _, port = endpoint.rpartition(':')
+            if not host or not port.isdigit():
+                raise ValueError(f"Адрес сервера должен быть в виде host:port, а не {endpoint}")
+            return host, int(port)
+        host, port = endpoint
+        return host, int(port)
+
+    def start(self) -> bool:
+        """Подключается ко всем серверам; False - не подключился ни один"""
+        connected = False
+        for host, port in self.addresses:
+            pool = ClientPool(
+                lambda host=host, port=port: self.client_factory(host, port),
+                min_size=1,
+                max_size=self.pool_size,
+                checkout_timeout=self.checkout_timeout,
+                retries=0  # Повтор идет на другом сервере
+            )
+            connected = pool.start() or connected
+            self._endpoints.append(_Endpoint(host, port, pool))
+        if self.hedge_delay is not None:
+            # Каждый запрос держит клиента пула, больше потоков не понадобится
+            self._executor = ThreadPoolExecutor(self.pool_size * len(self._endpoints), "hedging")
+        return connected
+
+    def __enter__(self) -> 'BalancingClient':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send_message(self, message: str) -> str:
+        """Отправляет сообщение выбранному серверу и возвращает ответ
+
+        После ошибки соединения запрос повторяется на другом сервере, до
+        retries раз; ошибка последней попытки поднимается исключением.
+        """
+        tried = []
+        for attempt in range(self.retries + 1):
+            try:
+                return self._attempt(message, tried)
+            except (ConnectionError, OSError):
+                if attempt == self.retries:
+                    raise
+                with self._lock:
+                    self.retried += 1
+
+    def _attempt(self, message: str, tried: List[_Endpoint]) -> str:
+        """Одна попытка запроса, с дублированием, если оно включено"""
+        endpoint = self._choose(tried)
+        tried.append(endpoint)
+        executor = self._executor
+        if executor is None:
+            return self._send_to(endpoint, message)
+
+        try:
+            futures = {executor.submit(self._send_to, endpoint, message): endpoint}
+        except RuntimeError:
+            # Пул потоков уже остановлен в close: место в outstanding больше никто не освободит
+            self._record(endpoint)
+            raise ConnectionError("Балансировщик закрыт")
+        done, _ = wait(futures, timeout=self.hedge_delay)
+        if not done:
+            # Исключенному серверу дубль не отправляется
+            hedge = self._choose(tried, allow_ejected=False)
+            if hedge is not None:
+                tried.append(hedge)
+                try:
+                    futures[executor.submit(self._send_to, hedge, message)] = hedge
+                except RuntimeError:
+                    self._record(hedge)  # Без дубля: первый запрос еще дорабатывает
+                else:
+                    with self._lock:
+                        self.hedges += 1
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    reply = future.result()
+                except (ConnectionError, OSError) as e:
+                    error = e
+                    continue
+                if futures[future] is not endpoint:
+                    with self._lock:
+                        self.hedge_wins += 1
+                # Опоздавший запрос дорабатывает в пуле потоков, его задержка тоже учитывается
+                return reply
+        raise error
+
+    def _choose(self, exclude: Sequence[_Endpoint] = (), allow_ejected: bool = True) -> Optional[_Endpoint]:
+        """Выбирает сервер по стратегии и занимает у него место в outstanding"""
+        with self._lock:
+            self._readmit(time.monotonic())
+            candidates = [e for e in self._endpoints if e.ejected_until is None and e not in exclude]
+            if not candidates and allow_ejected:
+                # Лучше отправить запрос исключенному или уже опробованному серверу, чем никому
+                candidates = [e for e in self._endpoints if e not in exclude] or list(self._endpoints)
+            if not candidates:
+                return None
+            if self.strategy == 'power_of_two' and len(candidates) > 2:
+                candidates = random.sample(candidates, 2)
+            least = min(e.outstanding for e in candidates)
+            endpoint = random.choice([e for e in candidates if e.outstanding == least])
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _send_to(self, endpoint: _Endpoint, message: str) -> str:
+        """Отправляет запрос серверу и учитывает задержку или ошибку"""
+        started = time.monotonic()
+        try:
+            reply = endpoint.pool.send_message(message)
+        except (ConnectionError, OSError):
+            self._record(endpoint, failed=True)
+            raise
+        except BaseException:
+            self._record(endpoint)  # Ошибка обработчика не говорит о здоровье сервера
+            raise
+        self._record(endpoint, latency=time.monotonic() - started)
+        return reply
+
+    def _record(self, endpoint: _Endpoint, latency: Optional[float] = None, failed: bool = False):
+        """Освобождает место в outstanding, обновляет оценки сервера и исключает его, если он выбивается"""
+        weight = self.EWMA_WEIGHT
+        with self._lock:
+            endpoint.outstanding -= 1
+            if latency is None and not failed:
+                return
+            endpoint.requests += 1
+            endpoint.samples += 1
+            endpoint.error_rate += weight * (failed - endpoint.error_rate)
+            if failed:
+                endpoint.errors += 1
+            elif endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += weight * (latency - endpoint.latency)
+            if endpoint.ejected_until is not None:
+                return
+            reason = self._outlier(endpoint)
+            if reason:
+                self._eject(endpoint, reason)
+
+    def _outlier(self, endpoint: _Endpoint) -> Optional[str]:
+        """Причина исключения сервера или None"""
+        if endpoint.samples < self.min_samples:
+            return None
+        if endpoint.error_rate > self.error_threshold:
+            return f"доля ошибок {endpoint.error_rate:.0%}"
+        if self.latency_factor is None or endpoint.latency is None:
+            return None
+        others = [
+            e.latency for e in self._endpoints
+            if e is not endpoint and e.ejected_until is None and e.latency is not None
+        ]
+        if not others:
+            return None
+        median = statistics.median(others)
+        if endpoint.latency > max(self.latency_factor * median, median + self.LATENCY_MARGIN):
+            return f"задержка {endpoint.latency * 1000:.1f} мс против {median * 1000:.1f} мс"
+        return None
+
+    def _eject(self, endpoint: _Endpoint, reason: str):
+        ejected = sum(1 for e in self._endpoints if e.ejected_until is not None)
+        if ejected + 1 > int(len(self._endpoints) * self.max_ejected):
+            return
+        endpoint.ejected_until = time.monotonic() + self.ejection_time
+        endpoint.ejections += 1
+        print(f"Сервер {endpoint.name} исключен на {self.ejection_time} с: {reason}")
+
+    def _readmit(self, now: float):
+        """Возвращает в работу серверы, у которых истекло время исключения
+
+        Оценки сбрасываются: судить о сервере снова можно после min_samples
+        запросов.
+        """
+        for endpoint in self._endpoints:
+            if endpoint.ejected_until is not None and endpoint.ejected_until <= now:
+                endpoint.ejected_until = None
+                endpoint.latency = None
+                endpoint.error_rate = 0.0
+                endpoint.samples = 0
+                print(f"Сервер {endpoint.name} возвращен в работу")
+
+    def stats(self) -> dict:
+        """Нагрузка и оценки каждого сервера, счетчики повторов и дублей"""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "endpoints": {
+                    e.name: {
+                        "outstanding": e.outstanding,
+                        "requests": e.requests,
+                        "errors": e.errors,
+                        "error_rate": e.error_rate,
+                        "latency": e.latency,
+                        "ejected": e.ejected_until is not None and e.ejected_until > now,
+                        "ejections": e.ejections,
+                    }
+                    for e in self._endpoints
+                },
+                "retried": self.retried,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+    def close(self):
+        """Закрывает пулы всех серверов"""
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        for endpoint in self._endpoints:
+            endpoint.pool.close()
+        self._endpoints = []
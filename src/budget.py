@@ -0,0 +1,41 @@
+import threading
+from typing import Optional
+
+class MemoryBudgetExceeded(Exception):
+    """Кадру не хватило места в общем бюджете памяти сервера"""
+
+class MemoryBudget:
+    """Общий для всех соединений сервера лимит байт, принимаемых и обрабатываемых сразу
+
+    Соединение резервирует место под большой кадр, как только прочитан его
+    заголовок. Если бюджет занят, соединение ждет (и не читает сокет, что
+    дает обратное давление на клиента), а по истечении timeout получает
+    отказ. Кадр больше всего бюджета отклоняется сразу.
+    """
+
+    def __init__(self, limit: int, timeout: float = 5.0):
+        self.limit = limit
+        self.timeout = timeout
+        self.in_use = 0
+        self._changed = threading.Condition()
+
+    def acquire(self, nbytes: int, timeout: Optional[float] = None):
+        """Резервирует nbytes байт, ожидая освобождения не дольше timeout"""
+        if nbytes > self.limit:
+            raise MemoryBudgetExceeded(f"Кадр {nbytes} байт больше бюджета памяти {self.limit} байт")
+
+        timeout = self.timeout if timeout is None else timeout
+        with self._changed:
+            if not self._changed.wait_for(lambda: self.in_use + nbytes <= self.limit, timeout):
+                raise MemoryBudgetExceeded(
+                    f"Бюджет памяти исчерпан: занято {self.in_use} из {self.limit} байт"
+                )
+            self.in_use += nbytes
+
+    def release(self, nbytes: int):
+        """Возвращает зарезервированные байты"""
+        if not nbytes:
+            return
+        with self._changed:
+            self.in_use -= nbytes
+            self._changed.notify_all()
@@ -0,0 +1,74 @@
+import threading
+
+class BufferPool:
+    """Общий для соединений сервера пул буферов приема
+
+    Буферы разбиты на классы размеров - степени двойки от min_size до
+    max_size: запрос округляется вверх до класса, и свободный буфер этого
+    класса выдается повторно вместо нового выделения. Больше max_size
+    буферы не хранятся и выделяются каждый раз заново. Свободные буферы
+    вместе занимают не больше max_bytes, лишние отдаются сборщику мусора.
+    """
+
+    def __init__(self, min_size: int = 4096, max_size: int = 4 * 1024 * 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._free = {}  # Класс размера -> свободные буферы
+        self._lock = threading.Lock()
+        self.hits = 0         # Выдан свободный буфер
+        self.misses = 0       # Класс пуст, выделен новый буфер
+        self.fallbacks = 0    # Запрос больше max_size, буфер вне пула
+        self.dropped = 0      # Возвращенный буфер не поместился в max_bytes
+        self.borrowed = 0     # Сейчас выдано буферов
+        self.pooled_bytes = 0
+
+    def size_class(self, size: int) -> int:
+        """Размер буфера, которым будет обслужен запрос size байт"""
+        if size > self.max_size:
+            return size
+        return max(self.min_size, 1 << (size - 1).bit_length())
+
+    def acquire(self, size: int) -> bytearray:
+        """Выдает буфер не короче size байт"""
+        capacity = self.size_class(size)
+        with self._lock:
+            self.borrowed += 1
+            if size > self.max_size:
+                self.fallbacks += 1
+                return bytearray(capacity)
+            free = self._free.get(capacity)
+            if free:
+                self.hits += 1
+                self.pooled_bytes -= capacity
+                return free.pop()
+            self.misses += 1
+        return bytearray(capacity)
+
+    def release(self, buffer: bytearray):
+        """Возвращает буфер в пул; содержимое не очищается"""
+        capacity = len(buffer)
+        with self._lock:
+            self.borrowed -= 1
+            if capacity > self.max_size or capacity != self.size_class(capacity):
+                return
+            if self.pooled_bytes + capacity > self.max_bytes:
+                self.dropped += 1
+                return
+            self._free.setdefault(capacity, []).append(buffer)
+            self.pooled_bytes += capacity
+
+    def stats(self) -> dict:
+        """Счетчики пула: попадания, новые выделения и объем свободных буферов"""
+        with self._lock:
+            requests = self.hits + self.misses + self.fallbacks
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "fallbacks": self.fallbacks,
+                "dropped": self.dropped,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "borrowed": self.borrowed,
+                "pooled_buffers": sum(len(free) for free in self._free.values()),
+                "pooled_bytes": self.pooled_bytes,
+            }
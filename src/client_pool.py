@@ -0,0 +1,289 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+from src.tcp_client import TCPClient
+
+class PoolTimeout(TimeoutError):
+    """Свободный клиент не появился за время ожидания"""
+
+class ClientPool:
+    """Потокобезопасный пул подключенных TCPClient, TLSTCPClient или UDPClient
+
+    Клиент не делится между потоками: поток берет его из пула (checkout),
+    обменивается сообщениями и возвращает. Соединения используются
+    повторно, поэтому TLS handshake выполняется только при подключении
+    нового клиента.
+
+    factory создает еще не подключенный клиент. Пул держит от min_size до
+    max_size соединений: свободные дольше idle_timeout закрываются (кроме
+    min_size), а раз в health_check_interval секунд и при каждой выдаче
+    клиента проверяется, что сервер не закрыл соединение. Закрытое
+    соединение заменяется новым незаметно для вызывающего.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], TCPClient],
+        min_size: int = 1,
+        max_size: int = 8,
+        idle_timeout: Optional[float] = 60.0,
+        health_check_interval: float = 10.0,
+        checkout_timeout: Optional[float] = 5.0,
+        retries: int = 1
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("Нужно 0 <= min_size <= max_size и max_size >= 1")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout  # None - свободные соединения не закрываются
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout  # None - ждать свободного клиента без ограничения
+        # Сколько раз send_message повторяет запрос на новом соединении, если старое
+        # оборвалось; запрос при этом может дойти до сервера дважды
+        self.retries = retries
+        self.running = False
+        self._idle: List[Tuple[TCPClient, float]] = []  # Свободные клиенты и когда их вернули
+        self._size = 0  # Подключенные и подключающиеся клиенты
+        self._in_use = 0
+        self._changed = threading.Condition()
+        self._maintenance = None
+        # Счетчики для stats()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.closed = 0
+        self.broken = 0     # Закрыто из-за ошибки во время обмена
+        self.unhealthy = 0  # Закрыто проверкой соединения
+        self.reconnects = 0  # Запросов, повторенных на новом соединении
+        self.peak_in_use = 0
+
+    def start(self) -> bool:
+        """Подключает min_size клиентов и запускает обслуживание пула
+
+        False - не все клиенты подключились; недостающие пул подключит позже.
+        """
+        self.running = True
+        connected = self._fill()
+        self._maintenance = threading.Thread(target=self._maintenance_loop, name="client pool")
+        self._maintenance.daemon = True
+        self._maintenance.start()
+        return connected
+
+    def __enter__(self) -> 'ClientPool':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def client(self, timeout: Optional[float] = None) -> Iterator[TCPClient]:
+        """Выдает клиента на время блока with
+
+        Если в блоке было исключение, клиент мог остаться посреди обмена,
+        поэтому его соединение закрывается, а не возвращается в пул.
+        """
+        client = self.checkout(timeout)
+        try:
+            yield client
+        except BaseException:
+            self.release(client, broken=True)
+            raise
+        self.release(client)
+
+    def checkout(self, timeout: Optional[float] = None) -> TCPClient:
+        """Берет свободного клиента или подключает нового; release возвращает его в пул"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            client = self._take(deadline)
+            if client is None:
+                client = self._connect_reserved()
+            elif not client.is_alive():
+                # Сервер закрыл соединение, пока клиент был свободен
+                self._discard(client, "unhealthy")
+                continue
+            waited = time.monotonic() - started
+            with self._changed:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            return client
+
+    def release(self, client: TCPClient, broken: bool = False):
+        """Возвращает клиента в пул; broken - соединение больше нельзя использовать"""
+        if broken or not self.running:
+            self._discard(client, "broken" if broken else None)
+            return
+        with self._changed:
+            self._in_use -= 1
+            self._idle.append((client, time.monotonic()))
+            self._changed.notify()
+
+    def send_message(self, message: str) -> str:
+        """Отправляет сообщение через свободного клиента
+
+        Если соединение оборвалось, запрос повторяется на новом, до retries
+        раз; ошибка последней попытки поднимается исключением.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                with self.client() as client:
+                    return client.request(message)
+            except PoolTimeout:
+                raise
+            except (ConnectionError, OSError):
+                if attempt == self.retries:
+                    raise
+                with self._changed:
+                    self.reconnects += 1
+
+    def _take(self, deadline: Optional[float]) -> Optional[TCPClient]:
+        """Свободный клиент или None, если можно подключить новый (место уже занято)"""
+        with self._changed:
+            while True:
+                if not self.running:
+                    raise ConnectionError("Пул клиентов закрыт")
+                if self._idle or self._size < self.max_size:
+                    self._in_use += 1
+                    self.peak_in_use = max(self.peak_in_use, self._in_use)
+                    if self._idle:
+                        # Последний возвращенный: давно не используемые успеют закрыться по простою
+                        client, _ = self._idle.pop()
+                        return client
+                    self._size += 1
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"Нет свободного клиента: заняты все {self.max_size}")
+                self._changed.wait(remaining)
+
+    def _connect_reserved(self) -> TCPClient:
+        """Подключает клиента на место, занятое в _take
+
+        Если подключиться не удалось или factory поднял исключение, место
+        освобождается и ждущие в _take просыпаются.
+        """
+        try:
+            client = self.factory()
+            if not client.connect():
+                raise ConnectionError("Не удалось подключиться к серверу")
+        except BaseException:
+            with self._changed:
+                self._size -= 1
+                self._in_use -= 1
+                self._changed.notify()
+            raise
+        with self._changed:
+            self.created += 1
+        return client
+
+    def _discard(self, client: TCPClient, reason: Optional[str] = None, checked_out: bool = True):
+        """Закрывает соединение клиента и освобождает его место
+
+        reason - счетчик причины (broken, unhealthy); checked_out - клиент был
+        выдан, а не взят из свободных.
+        """
+        client.disconnect()
+        with self._changed:
+            self._size -= 1
+            if checked_out:
+                self._in_use -= 1
+            self.closed += 1
+            if reason:
+                setattr(self, reason, getattr(self, reason) + 1)
+            self._changed.notify()
+
+    def _fill(self) -> bool:
+        """Подключает клиентов, пока их меньше min_size"""
+        while True:
+            with self._changed:
+                if not self.running or self._size >= self.min_size:
+                    return True
+                self._size += 1
+                self._in_use += 1
+            try:
+                client = self._connect_reserved()
+            except (ConnectionError, OSError):
+                return False
+            self.release(client)
+
+    def _maintenance_loop(self):
+        """Закрывает простаивающие и оборванные соединения и восполняет min_size"""
+        interval = self.health_check_interval
+        if self.idle_timeout is not None:
+            interval = min(interval, self.idle_timeout / 4)
+        interval = min(interval, 1.0)
+        last_check = time.monotonic()
+        while self.running:
+            time.sleep(interval)
+            now = time.monotonic()
+            check_health = now - last_check >= self.health_check_interval
+            if check_health:
+                last_check = now
+            self._evict(now, check_health)
+            self._fill()
+
+    def _evict(self, now: float, check_health: bool):
+        with self._changed:
+            idle = self._idle
+            self._idle = []
+            keep = []
+            evicted = []
+            # Сначала проверяются давно свободные: их закрытие не нарушит min_size
+            for client, since in idle:
+                surplus = self._size - len(evicted) > self.min_size
+                if surplus and self.idle_timeout is not None and now - since > self.idle_timeout:
+                    evicted.append(client)
+                else:
+                    keep.append((client, since))
+        for client in evicted:
+            self._discard(client, checked_out=False)
+
+        healthy = []
+        for client, since in keep:
+            if check_health and not client.is_alive():
+                self._discard(client, "unhealthy", checked_out=False)
+            else:
+                healthy.append((client, since))
+        with self._changed:
+            # Пока шла проверка, клиенты могли вернуться в пул
+            self._idle = healthy + self._idle
+            self._changed.notify_all()
+
+    def stats(self) -> dict:
+        """Размер пула, загрузка и ожидание свободного клиента"""
+        with self._changed:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_size": self.max_size,
+                "utilization": self._in_use / self.max_size,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "wait_mean": self.wait_total / self.checkouts if self.checkouts else 0.0,
+                "wait_max": self.wait_max,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "closed": self.closed,
+                "broken": self.broken,
+                "unhealthy": self.unhealthy,
+                "reconnects": self.reconnects,
+            }
+
+    def close(self):
+        """Закрывает свободные соединения; выданные закроются при возврате"""
+        with self._changed:
+            self.running = False
+            idle = [client for client, _ in self._idle]
+            self._idle = []
+            self._changed.notify_all()
+        for client in idle:
+            self._discard(client, checked_out=False)
@@ -0,0 +1,115 @@
+import hashlib
+import lzma
+import zlib
+from typing import Optional, Sequence
+from src.protocols import Frame, FrameTooLargeError, Payload, TCPProtocol
+
+class FrameCompressor:
+    """Сжатие кадров TCP протокола, согласуемое при подключении
+
+    Клиент отправляет в служебном кадре hello список кодеков и отпечаток
+    общего словаря, сервер выбирает первый поддерживаемый кодек. До
+    согласования (и с клиентами, которые его не проводят) кадры не сжимаются.
+    Каждая сторона сжимает свои кадры длиннее своего порога threshold.
+    """
+
+    CODECS = ('zlib', 'lzma')
+
+    def __init__(
+        self,
+        codecs: Sequence[str] = CODECS,
+        threshold: int = 1024,
+        level: int = 6,
+        dictionary: Optional[bytes] = None
+    ):
+        unknown = set(codecs) - set(self.CODECS)
+        if unknown:
+            raise ValueError(f"Неизвестные кодеки сжатия: {', '.join(sorted(unknown))}")
+        self.codecs = tuple(codecs)
+        self.threshold = threshold
+        self.level = level
+        self.dictionary = dictionary
+        self.codec = None            # Согласованный кодек
+        self.use_dictionary = False  # Словарь совпадает у обеих сторон
+
+    def copy(self) -> 'FrameCompressor':
+        """Создает несогласованную копию настроек для нового соединения"""
+        return FrameCompressor(self.codecs, self.threshold, self.level, self.dictionary)
+
+    def _dictionary_id(self) -> Optional[str]:
+        """Отпечаток словаря, по которому стороны проверяют, что он общий"""
+        if not self.dictionary:
+            return None
+        return hashlib.sha256(self.dictionary).hexdigest()[:16]
+
+    def offer(self) -> dict:
+        """Предложение клиента для кадра hello"""
+        return {"compression": list(self.codecs), "dictionary": self._dictionary_id()}
+
+    def accept(self, offer: dict) -> dict:
+        """Выбирает кодек по предложению клиента и возвращает ответ сервера"""
+        offered = offer.get("compression") or []
+        self.codec = next((codec for codec in offered if codec in self.codecs), None)
+        self.use_dictionary = (
+            self.codec == 'zlib'
+            and self._dictionary_id() is not None
+            and offer.get("dictionary") == self._dictionary_id()
+        )
+        return {"compression": self.codec, "dictionary": self.use_dictionary}
+
+    def apply(self, answer: dict):
+        """Применяет ответ сервера на стороне клиента"""
+        codec = answer.get("compression")
+        self.codec = codec if codec in self.codecs else None
+        self.use_dictionary = bool(answer.get("dictionary")) and self.dictionary is not None
+
+    def compress(self, data: Payload) -> Frame:
+        """Возвращает кадр с данными, сжатыми согласованным кодеком
+
+        Короткие данные и данные, которые не удалось уменьшить, уходят как есть.
+        """
+        buffers = data if isinstance(data, (list, tuple)) else [data]
+        length = sum(memoryview(buf).nbytes for buf in buffers)
+        if self.codec is None or length < self.threshold:
+            return Frame(data)
+
+        raw = b"".join(buffers)
+        if self.codec == 'lzma':
+            flags = TCPProtocol.FLAG_LZMA
+            compressed = lzma.compress(raw, preset=min(self.level, 9))
+        elif self.use_dictionary:
+            flags = TCPProtocol.FLAG_ZLIB | TCPProtocol.FLAG_DICT
+            compressor = zlib.compressobj(self.level, zdict=self.dictionary)
+            compressed = compressor.compress(raw) + compressor.flush()
+        else:
+            flags = TCPProtocol.FLAG_ZLIB
+            compressed = zlib.compress(raw, self.level)
+
+        if len(compressed) >= length:
+            return Frame(data)
+        return Frame(compressed, flags)
+
+    def decompress(self, frame: Frame, max_size: Optional[int] = None) -> Payload:
+        """Возвращает исходные данные кадра
+        
+        С max_size распаковка останавливается, как только данные превысили
+        его, поэтому маленький сжатый кадр не раздуется в памяти.
+        """
+        if frame.flags & TCPProtocol.FLAG_LZMA:
+            data = lzma.LZMADecompressor().decompress(frame.payload, -1 if max_size is None else max_size + 1)
+        elif frame.flags & TCPProtocol.FLAG_ZLIB:
+            if frame.flags & TCPProtocol.FLAG_DICT:
+                if not self.dictionary:
+                    raise ValueError("Кадр сжат со словарем, но словарь не задан")
+                decompressor = zlib.decompressobj(zdict=self.dictionary)
+            else:
+                decompressor = zlib.decompressobj()
+            data = decompressor.decompress(frame.payload, 0 if max_size is None else max_size + 1)
+            if max_size is None or len(data) <= max_size:
+                data += decompressor.flush()
+        else:
+            return frame.payload
+        
+        if max_size is not None and len(data) > max_size:
+            raise FrameTooLargeError(f"Распакованный кадр длиннее допустимых {max_size} байт")
+        return data
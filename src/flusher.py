@@ -0,0 +1,114 @@
+import queue
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Optional
+from src.logs import logger
+
+class WriteFlusher:
+    """Поток, который дописывает буферы записи соединений движка threads
+
+    Поток соединения и потоки пула пишут в DuplexSocket без ожидания:
+    остаток, который не принял буфер ядра, ждет здесь, пока сокет не
+    станет готов к записи. Так медленный клиент держит только свой буфер,
+    а не потоки сервера. Соединение, чтение которого стоит из-за полного
+    буфера дольше stall_timeout секунд, отключается через on_stalled.
+    """
+
+    def __init__(self, stall_timeout: Optional[float], on_stalled: Callable, name: str = "writer"):
+        self.stall_timeout = stall_timeout  # None - не отключать клиентов, которые не читают ответы
+        self.on_stalled = on_stalled
+        self.name = name
+        self.running = False
+        self._added = queue.SimpleQueue()
+        self._connections = {}  # Дескриптор -> соединение с непустым буфером
+        self._selector = None
+        self._wakeup = None
+        self._thread = None
+
+    def start(self):
+        self._selector = selectors.DefaultSelector()
+        wakeup, self._wakeup = socket.socketpair()
+        wakeup.setblocking(False)
+        self._wakeup.setblocking(False)
+        self._selector.register(wakeup, selectors.EVENT_READ)
+        self.running = True
+        self._thread = threading.Thread(target=self._run, args=(wakeup,), name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, connection):
+        """Берет соединение, в буфере которого остались данные; из любого потока"""
+        self._added.put(connection)
+        self._wake()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup.send(b"\0")
+        except OSError:
+            pass  # Пара сокетов переполнена - поток и так проснется, или уже закрыта
+
+    def _run(self, wakeup: socket.socket):
+        interval = min(1.0, self.stall_timeout / 4) if self.stall_timeout else 1.0
+        try:
+            while self.running:
+                for key, _ in self._selector.select(interval):
+                    if key.fileobj is wakeup:
+                        self._drain_wakeup(wakeup)
+                    elif key.data.flush():
+                        self._remove(key.data, key.fd)
+                # Новые соединения регистрируются после снятия дописанных: дескриптор
+                # закрытого сокета мог уже достаться новому соединению
+                self._register_added()
+                self._evict_stalled()
+        except Exception as e:
+            logger.error("Ошибка потока записи: %s", e)
+        finally:
+            for fd, connection in list(self._connections.items()):
+                connection.fail()
+                self._remove(connection, fd)
+            self._selector.close()
+            wakeup.close()
+            self._wakeup.close()
+
+    def _drain_wakeup(self, wakeup: socket.socket):
+        try:
+            while wakeup.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _register_added(self):
+        while True:
+            try:
+                connection = self._added.get_nowait()
+            except queue.Empty:
+                return
+            fd = connection.fileno()
+            if fd < 0:
+                continue
+            self._connections[fd] = connection
+            self._selector.register(fd, selectors.EVENT_WRITE, connection)
+
+    def _remove(self, connection, fd: int):
+        self._selector.unregister(fd)
+        del self._connections[fd]
+        if connection.closing:
+            connection.sock.close()
+
+    def _evict_stalled(self):
+        """Отключает соединения, буфер которых не опускается до low_water дольше stall_timeout"""
+        if self.stall_timeout is None:
+            return
+        deadline = time.monotonic() - self.stall_timeout
+        stalled = [(fd, connection) for fd, connection in self._connections.items()
+                   if connection.paused_since is not None and connection.paused_since < deadline]
+        for fd, connection in stalled:
+            connection.fail()
+            self.on_stalled(connection)
+            self._remove(connection, fd)
@@ -0,0 +1,63 @@
+from typing import Callable, Iterator
+from src.logs import message_logger
+from src.protocols import Payload
+
+# Обработчик сообщений сервера: (данные запроса, адрес клиента) -> данные ответа.
+# Данные - bytes, bytearray или memoryview, которые живут только до возврата из
+# обработчика; ответ - буфер или список буферов, который отправится без склейки.
+Handler = Callable[[Payload, tuple], Payload]
+
+class _Preview:
+    """Начало сообщения для лога; декодируется, только если запись не отброшена"""
+
+    __slots__ = ('data', 'limit')
+
+    def __init__(self, data: Payload, limit: int):
+        self.data = data
+        self.limit = limit
+
+    def __str__(self) -> str:
+        # Символ UTF-8 занимает не больше 4 байт
+        message = str(self.data[:self.limit * 4], 'utf-8', 'replace')
+        if len(message) > self.limit or len(self.data) > self.limit * 4:
+            message = f"{message[:self.limit]}..."
+        return message
+
+class EchoHandler:
+    """Обработчик по умолчанию: отвечает префиксом "<имя> эхо: " и теми же байтами
+
+    Данные не декодируются и не копируются: префикс и запрос уходят
+    отдельными буферами. Только для записи в лог server.messages
+    декодируется начало сообщения, и то если запись не отброшена
+    ограничением частоты; verbose=False отключает и это.
+
+    У обработчика может быть метод stream(chunks, addr), который отвечает на
+    потоковое сообщение по частям. Обработчик без него получает потоковое
+    сообщение целиком, одним буфером.
+    """
+
+    PREVIEW = 100  # Сколько символов сообщения попадает в лог
+
+    def __init__(self, name: str, verbose: bool = True):
+        self.name = name
+        self.prefix = f"{name} эхо: ".encode('utf-8')
+        self.verbose = verbose
+
+    def __call__(self, data: Payload, addr: tuple) -> Payload:
+        if self.verbose:
+            # Запись форматируется до возврата, пока данные запроса еще действительны
+            message_logger.info("%s от %s: %s", self.name, addr, _Preview(data, self.PREVIEW))
+        return (self.prefix, data)
+
+    def stream(self, chunks: Iterator[Payload], addr: tuple) -> Iterator[Payload]:
+        """Каждая часть возвращается сразу после приема, префикс - только перед первой"""
+        first = True
+        total = 0
+        for chunk in chunks:
+            yield (self.prefix, chunk) if first else chunk
+            first = False
+            total += len(chunk)
+        if first:
+            yield self.prefix
+        if self.verbose:
+            message_logger.info("%s поток от %s: %d байт", self.name, addr, total)
@@ -0,0 +1,117 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Optional
+
+# События серверов: запуск, остановка и ошибки
+logger = logging.getLogger("server")
+# Подключение и закрытие соединений
+connection_logger = logging.getLogger("server.connections")
+# Каждое сообщение клиента
+message_logger = logging.getLogger("server.messages")
+
+MESSAGE_RATE = 20.0  # Сколько записей о соединениях и сообщениях в секунду пишется по умолчанию
+LOG_FORMAT = "%(asctime)s %(message)s"
+
+class RateLimitFilter(logging.Filter):
+    """Пропускает не больше rate записей в секунду, остальные отбрасывает
+
+    Отброшенные записи не форматируются, а их число дописывается к
+    следующей пропущенной записи.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.tokens = rate
+        self.suppressed = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False
+            self.tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+        if suppressed:
+            record.msg = f"{record.msg} (пропущено записей: {suppressed})"
+        return True
+
+class _LogWriter:
+    """Очередь записей и поток, который пишет их в настоящие обработчики"""
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        self.listener = None
+        self.start()
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(
+            self.queue_handler.queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def restart_in_child(self):
+        """После fork поток записи остался в родителе - копии нужны свои очередь и поток"""
+        self.queue_handler.queue = queue.SimpleQueue()
+        self.start()
+
+    def stop(self):
+        """Дописывает записи из очереди и останавливает поток"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+_writer: Optional[_LogWriter] = None
+
+def setup_logging(
+    level: str = "INFO",
+    message_rate: Optional[float] = MESSAGE_RATE,
+    messages: bool = True,
+    stream=None
+):
+    """Направляет логи серверов в фоновый поток через QueueHandler/QueueListener
+
+    Потоки, обслуживающие клиентов, только кладут запись в очередь, а в
+    stream (по умолчанию stdout) пишет отдельный поток. Записи о
+    соединениях и сообщениях ограничены message_rate в секунду (None - без
+    ограничения), messages=False отключает записи о сообщениях совсем.
+    """
+    global _writer
+    shutdown_logging()
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _writer = _LogWriter([handler])
+
+    logger.handlers[:] = [_writer.queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    for child in (connection_logger, message_logger):
+        child.filters[:] = [RateLimitFilter(message_rate)] if message_rate else []
+    message_logger.disabled = not messages
+
+def shutdown_logging():
+    """Дописывает накопленные записи; вызывается перед выходом из процесса"""
+    if _writer is not None:
+        _writer.stop()
+
+def _after_fork():
+    if _writer is not None and _writer.listener is not None:
+        _writer.restart_in_child()
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
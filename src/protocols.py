@@ -1,9 +1,51 @@
+import json
+import select
+import socket
+import ssl
 import struct
-from typing import Tuple
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from src.budget import MemoryBudget
+from src.buffer_pool import BufferPool
+
+# Полезная нагрузка кадра: один буфер или список буферов, идущих подряд
+Payload = Union[bytes, bytearray, memoryview, Sequence[Union[bytes, bytearray, memoryview]]]
+
+class Frame(NamedTuple):
+    """Принятый или подготовленный к отправке кадр с флагами"""
+    payload: Payload
+    flags: int = 0
+    stream_id: int = 0  # Идентификатор запроса в мультиплексном режиме
+
+class FrameTooLargeError(ValueError):
+    """Заголовок объявляет кадр длиннее допустимого"""
 
 class TCPProtocol:
     """Протокол для работы с TCP сообщениями"""
     
+    HEADER_SIZE = 4  # Размер заголовка с длиной сообщения
+    MAX_PREALLOCATION = 64 * 1024 * 1024  # Сколько памяти выделяем под сообщение сразу
+    IOV_MAX = 1024                        # Максимум буферов в одном вызове sendmsg
+    COALESCE_LIMIT = 64 * 1024            # До этого объема буферы склеиваются перед отправкой
+    
+    # Расширенный кадр: старший бит длины установлен, за длиной идет байт флагов
+    EXTENDED_BIT = 0x80000000
+    MAX_FRAME_LENGTH = 0x7FFFFFFF
+    EXTENDED_HEADER_SIZE = 5
+    STREAM_HEADER_SIZE = 9  # Расширенный заголовок с идентификатором запроса
+    
+    FLAG_CONTROL = 0x01  # Служебный кадр (согласование возможностей), данные в JSON
+    FLAG_ZLIB = 0x02     # Данные сжаты zlib
+    FLAG_LZMA = 0x04     # Данные сжаты lzma
+    FLAG_DICT = 0x08     # При сжатии zlib использован общий словарь
+    FLAG_MORE = 0x10     # Часть потокового сообщения, за ней следуют еще части
+    FLAG_STREAM_ID = 0x20  # За байтом флагов идет 4-байтовый идентификатор запроса
+    
+    STREAM_CHUNK_SIZE = 1024 * 1024  # Максимальный размер части потокового сообщения
+    MAX_STREAM_ID = 0xFFFFFFFF
+    
     @staticmethod
     def prepare_message(data: bytes) -> bytes:
         """Подготавливает сообщение с заголовком длины"""
@@ -12,33 +54,619 @@ class TCPProtocol:
         return header + data
     
     @staticmethod
-    def receive_message(sock, buffer_size: int = 4096) -> Tuple[bool, bytes]:
-        """Принимает сообщение с заголовком длины"""
+    def frame_buffers(data: Payload, flags: int = 0, stream_id: int = 0) -> List:
+        """Возвращает заголовок и буферы данных кадра без копирования данных"""
+        buffers = list(data) if isinstance(data, (list, tuple)) else [data]
+        length = sum(memoryview(buf).nbytes for buf in buffers)
+        if length > TCPProtocol.MAX_FRAME_LENGTH:
+            raise ValueError(f"Кадр длиной {length} байт превышает максимум протокола")
+        if stream_id:
+            flags |= TCPProtocol.FLAG_STREAM_ID
+            header = struct.pack('!IBI', TCPProtocol.EXTENDED_BIT | length, flags, stream_id)
+        elif flags:
+            header = struct.pack('!IB', TCPProtocol.EXTENDED_BIT | length, flags)
+        else:
+            header = struct.pack('!I', length)
+        return [header] + buffers
+    
+    @staticmethod
+    def required_header_size(buffer, offset: int = 0) -> int:
+        """Возвращает размер заголовка кадра, насколько его можно определить по buffer"""
+        available = len(buffer) - offset
+        if available < TCPProtocol.HEADER_SIZE or not buffer[offset] & 0x80:
+            return TCPProtocol.HEADER_SIZE
+        if available < TCPProtocol.EXTENDED_HEADER_SIZE:
+            return TCPProtocol.EXTENDED_HEADER_SIZE
+        if buffer[offset + TCPProtocol.HEADER_SIZE] & TCPProtocol.FLAG_STREAM_ID:
+            return TCPProtocol.STREAM_HEADER_SIZE
+        return TCPProtocol.EXTENDED_HEADER_SIZE
+    
+    @staticmethod
+    def parse_header(buffer, offset: int = 0) -> Tuple[int, int, int]:
+        """Разбирает полный заголовок и возвращает (длина, флаги, идентификатор запроса)"""
+        word = struct.unpack_from('!I', buffer, offset)[0]
+        if not word & TCPProtocol.EXTENDED_BIT:
+            return word, 0, 0
+        flags = buffer[offset + TCPProtocol.HEADER_SIZE]
+        stream_id = 0
+        if flags & TCPProtocol.FLAG_STREAM_ID:
+            stream_id = struct.unpack_from('!I', buffer, offset + TCPProtocol.EXTENDED_HEADER_SIZE)[0]
+        # Наличие идентификатора видно по stream_id, в флагах кадра бит не нужен
+        return word & TCPProtocol.MAX_FRAME_LENGTH, flags & ~TCPProtocol.FLAG_STREAM_ID, stream_id
+    
+    @staticmethod
+    def control_frame(message: dict) -> Frame:
+        """Создает служебный кадр с JSON сообщением"""
+        return Frame(json.dumps(message).encode('utf-8'), TCPProtocol.FLAG_CONTROL)
+    
+    @staticmethod
+    def parse_control(frame: Frame) -> dict:
+        """Разбирает JSON сообщение служебного кадра"""
+        return json.loads(bytes(frame.payload).decode('utf-8'))
+    
+    @staticmethod
+    def stream_frames(
+        payloads: Iterable[Payload],
+        encode: Callable[[Payload], Frame] = Frame
+    ) -> Iterator[Frame]:
+        """Превращает части сообщения в кадры потока
+        
+        Все кадры, кроме последнего, помечаются FLAG_MORE; кадр без этого
+        флага (возможно пустой) завершает поток. Части обрабатываются по
+        одной, поэтому память не зависит от общего размера сообщения.
+        """
+        previous = None
+        for payload in payloads:
+            if previous is not None:
+                frame = encode(previous)
+                yield Frame(frame.payload, frame.flags | TCPProtocol.FLAG_MORE)
+            previous = payload
+        if previous is None:
+            # Пустой кадр без флагов означает конец сеанса, поэтому пустой
+            # поток начинается с пустой части с FLAG_MORE
+            yield Frame(b"", TCPProtocol.FLAG_MORE)
+            previous = b""
+        yield encode(previous)
+    
+    @staticmethod
+    def split_chunks(chunks: Iterable, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[memoryview]:
+        """Режет части потока на куски не больше chunk_size без копирования"""
+        for chunk in chunks:
+            view = memoryview(chunk).cast('B')
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size]
+    
+    @staticmethod
+    def send_message(sock, data: Payload):
+        """Отправляет один кадр: заголовок и данные уходят отдельными буферами"""
+        TCPProtocol.send_buffers(sock, TCPProtocol.frame_buffers(data))
+    
+    @staticmethod
+    def send_messages(sock, messages: Iterable[Union[Payload, Frame]]):
+        """Отправляет пачку кадров одним векторным системным вызовом"""
+        TCPProtocol.send_buffers(sock, TCPProtocol.message_buffers(messages))
+    
+    @staticmethod
+    def message_buffers(messages: Iterable[Union[Payload, Frame]]) -> List:
+        """Заголовки и данные пачки кадров подряд, без копирования данных"""
+        buffers = []
+        for data in messages:
+            if isinstance(data, Frame):
+                buffers.extend(TCPProtocol.frame_buffers(data.payload, data.flags, data.stream_id))
+            else:
+                buffers.extend(TCPProtocol.frame_buffers(data))
+        return buffers
+    
+    @staticmethod
+    def send_buffers(sock, buffers: List):
+        """Отправляет список буферов целиком через sendmsg (scatter-gather)"""
+        views = [memoryview(buf).cast('B') for buf in buffers if len(buf)]
+        if not views:
+            return
+        if isinstance(sock, DuplexSocket):
+            sock.send_views(views)
+        elif TCPProtocol._supports_sendmsg(sock):
+            TCPProtocol.send_views(sock, views)
+        else:
+            for view in TCPProtocol.coalesce(views):
+                sock.sendall(view)
+    
+    @staticmethod
+    def coalesce(views: List[memoryview]) -> List:
+        """Готовит буферы для сокета без sendmsg (SSL)
+        
+        Маленькие буферы склеиваются в одну запись, большие отправляются
+        по отдельности, чтобы не копировать данные.
+        """
+        total = sum(view.nbytes for view in views)
+        if total <= TCPProtocol.COALESCE_LIMIT:
+            return [b"".join(views)]
+        return views
+    
+    @staticmethod
+    def send_views(sock, views: List[memoryview]):
+        """Отправляет буферы через sendmsg, дописывая частично отправленные"""
+        index = 0
+        while index < len(views):
+            sent = sock.sendmsg(views[index:index + TCPProtocol.IOV_MAX])
+            # Пропускаем полностью отправленные буферы, частично отправленный обрезаем
+            while sent and index < len(views):
+                if sent >= views[index].nbytes:
+                    sent -= views[index].nbytes
+                    index += 1
+                else:
+                    views[index] = views[index][sent:]
+                    sent = 0
+    
+    @staticmethod
+    def _supports_sendmsg(sock) -> bool:
+        """Проверяет, можно ли писать в сокет через sendmsg"""
+        return hasattr(sock, 'sendmsg') and not isinstance(sock, ssl.SSLSocket)
+    
+    @staticmethod
+    def recv_exactly(sock, length: int) -> Tuple[bool, bytearray]:
+        """Читает ровно length байт через recv_into в заранее выделенный буфер"""
+        # Заголовку длины нельзя доверять безоговорочно, поэтому сразу
+        # выделяем не больше MAX_PREALLOCATION и при необходимости удваиваем
+        data = bytearray(min(length, TCPProtocol.MAX_PREALLOCATION))
+        received = 0
+        while received < length:
+            if received == len(data):
+                data.extend(bytes(min(len(data), length - len(data))))
+            with memoryview(data) as view:
+                # Размер чтения подстраивается под оставшийся объем
+                nbytes = sock.recv_into(view[received:], len(data) - received)
+            if not nbytes:
+                return False, data
+            received += nbytes
+        return True, data
+    
+    @staticmethod
+    def receive_frame(sock) -> Tuple[bool, Optional[Frame]]:
+        """Принимает кадр вместе с флагами расширенного заголовка"""
         try:
-            # Получаем заголовок с длиной
-            header = sock.recv(4)
-            if not header:
-                return False, b""
+            # Получаем заголовок: его размер известен только после первых байт
+            header = bytearray()
+            while True:
+                header_size = TCPProtocol.required_header_size(header)
+                if len(header) >= header_size:
+                    break
+                success, part = TCPProtocol.recv_exactly(sock, header_size - len(header))
+                if not success:
+                    return False, None
+                header += part
             
-            message_length = struct.unpack('!I', header)[0]
+            message_length, flags, stream_id = TCPProtocol.parse_header(header)
             
             # Получаем данные
-            received_data = b""
-            while len(received_data) < message_length:
-                remaining = message_length - len(received_data)
-                chunk = sock.recv(min(buffer_size, remaining))
-                if not chunk:
-                    return False, b""
-                received_data += chunk
+            success, received_data = TCPProtocol.recv_exactly(sock, message_length)
+            if not success:
+                return False, None
             
-            return True, received_data
+            return True, Frame(received_data, flags, stream_id)
             
         except (ConnectionResetError, struct.error):
+            return False, None
+    
+    @staticmethod
+    def receive_message(sock, buffer_size: int = 4096) -> Tuple[bool, bytearray]:
+        """Принимает сообщение с заголовком длины
+        
+        Данные читаются через recv_into прямо в буфер размера сообщения,
+        поэтому время приема линейно и лишних копий нет. buffer_size
+        оставлен для совместимости: объем чтения определяется остатком сообщения.
+        Флаги расширенного заголовка отбрасываются, для них есть receive_frame.
+        """
+        success, frame = TCPProtocol.receive_frame(sock)
+        if not success:
             return False, b""
+        return True, frame.payload
+
+class FrameDecoder:
+    """Инкрементальный (sans-IO) декодер кадров TCPProtocol
+    
+    В feed можно передавать куски байт произвольной длины: декодер сам
+    собирает разрезанные заголовки и возвращает все полные кадры, поэтому
+    один recv может дать сразу десятки маленьких сообщений. Тело большого
+    кадра копируется в заранее выделенный буфер, а receive_frames читает
+    его прямо туда через recv_into.
+    
+    Кадр длиннее max_frame_size отклоняется по заголовку, до выделения
+    памяти. Если задан budget, место под большой кадр резервируется в нем
+    до начала приема и возвращается при следующем обращении к декодеру,
+    когда кадр уже обработан.
+    
+    С pool буфер чтения и буферы больших кадров берутся из общего пула.
+    Данные такого кадра (memoryview) действительны только до следующего
+    обращения к декодеру; кадр, который нужен дольше, копируется через retain.
+    """
+    
+    def __init__(
+        self,
+        buffer_size: int = 4096,
+        max_frame_size: int = TCPProtocol.MAX_FRAME_LENGTH,
+        budget: Optional[MemoryBudget] = None,
+        pool: Optional[BufferPool] = None
+    ):
+        self.buffer_size = buffer_size
+        self.max_frame_size = max_frame_size
+        self.budget = budget
+        self.pool = pool
+        self._borrowed = []          # Буферы пула под уже отданными кадрами
+        self.budget_timeout = None   # Сколько ждать места в бюджете; None - таймаут бюджета
+        self._reserved = 0           # Зарезервировано под принимаемый большой кадр
+        self._released = 0           # Зарезервировано под уже отданные кадры
+        self._pending = bytearray()  # Заголовки и неполные маленькие кадры
+        self._frame = None           # Тело большого кадра, который еще принимается
+        self._frame_length = 0
+        self._frame_flags = 0
+        self._frame_stream_id = 0
+        self._frame_pooled = False
+        self._received = 0
+        self._read_buffer = pool.acquire(buffer_size) if pool else bytearray(buffer_size)
+    
+    def feed(self, data) -> List[Frame]:
+        """Добавляет данные и возвращает список всех полных кадров"""
+        self._release_returned()
+        frames = []
+        view = memoryview(data)
+        while self._frame is not None and len(view):
+            nbytes = min(len(view), self._frame_space())
+            self._frame[self._received:self._received + nbytes] = view[:nbytes]
+            view = view[nbytes:]
+            self._frame_received(nbytes, frames)
+        
+        if len(view):
+            self._pending += view
+            self._parse_pending(frames)
+        return frames
+    
+    def _frame_space(self) -> int:
+        """Возвращает свободное место в буфере большого кадра, расширяя его"""
+        if self._received == len(self._frame):
+            # Буфер удваивается, пока не достигнет длины из заголовка
+            grow = min(len(self._frame), self._frame_length - len(self._frame))
+            self._frame.extend(bytes(grow))
+        # Буфер из пула может быть длиннее кадра
+        return min(len(self._frame), self._frame_length) - self._received
+    
+    def _frame_received(self, nbytes: int, frames: List[Frame]):
+        """Учитывает принятые байты тела большого кадра"""
+        self._received += nbytes
+        if self._received == self._frame_length:
+            payload = self._frame
+            if self._frame_pooled:
+                payload = memoryview(self._frame)[:self._frame_length]
+                self._borrowed.append(self._frame)
+            frames.append(Frame(payload, self._frame_flags, self._frame_stream_id))
+            self._frame = None
+            self._released += self._reserved
+            self._reserved = 0
+    
+    def _parse_pending(self, frames: List[Frame]):
+        """Выделяет из накопленных байт все полные кадры"""
+        pending = self._pending
+        offset = 0
+        while True:
+            header_size = TCPProtocol.required_header_size(pending, offset)
+            if len(pending) - offset < header_size:
+                break
+            length, flags, stream_id = TCPProtocol.parse_header(pending, offset)
+            if length > self.max_frame_size:
+                raise FrameTooLargeError(
+                    f"Кадр {length} байт длиннее допустимых {self.max_frame_size} байт"
+                )
+            start = offset + header_size
+            end = start + length
+            if end <= len(pending):
+                frames.append(Frame(pending[start:end], flags, stream_id))
+                offset = end
+                continue
+            
+            if length > self.buffer_size:
+                # Большой кадр: дальше данные пойдут сразу в буфер кадра
+                if self.budget:
+                    self.budget.acquire(length, self.budget_timeout)
+                    self._reserved = length
+                self._frame_length = length
+                self._frame_flags = flags
+                self._frame_stream_id = stream_id
+                self._frame_pooled = self.pool is not None and length <= self.pool.max_size
+                if self._frame_pooled:
+                    self._frame = self.pool.acquire(length)
+                else:
+                    self._frame = bytearray(min(length, TCPProtocol.MAX_PREALLOCATION))
+                self._received = len(pending) - start
+                self._frame[:self._received] = pending[start:]
+                offset = len(pending)
+            break
+        del pending[:offset]
+    
+    def receive_frames(self, sock) -> Tuple[bool, List[Frame]]:
+        """Читает из сокета и возвращает (успех, полные кадры)
+        
+        Пустой список при успехе означает, что кадр еще не дочитан.
+        """
+        frames = []
+        self._release_returned()
+        try:
+            if self._frame is not None:
+                space = self._frame_space()
+                with memoryview(self._frame) as view:
+                    nbytes = sock.recv_into(view[self._received:], space)
+                if not nbytes:
+                    return False, frames
+                self._frame_received(nbytes, frames)
+                return True, frames
+            
+            nbytes = sock.recv_into(self._read_buffer)
+            if not nbytes:
+                return False, frames
+            with memoryview(self._read_buffer) as view:
+                return True, self.feed(view[:nbytes])
+        except ConnectionResetError:
+            return False, frames
+    
+    @staticmethod
+    def retain(frame: Frame) -> Frame:
+        """Возвращает кадр, данные которого переживут следующее чтение"""
+        if isinstance(frame.payload, memoryview):
+            return frame._replace(payload=bytearray(frame.payload))
+        return frame
+    
+    def _release_returned(self):
+        """Возвращает в бюджет и пул место кадров, отданных прошлым вызовом"""
+        if self.budget and self._released:
+            self.budget.release(self._released)
+        self._released = 0
+        for buffer in self._borrowed:
+            self.pool.release(buffer)
+        self._borrowed.clear()
+    
+    def close(self):
+        """Возвращает в бюджет и пул все зарезервированное место"""
+        self._release_returned()
+        if self.budget and self._reserved:
+            self.budget.release(self._reserved)
+        self._reserved = 0
+        if self.pool:
+            if self._frame is not None and self._frame_pooled:
+                self.pool.release(self._frame)
+            if self._read_buffer is not None:
+                self.pool.release(self._read_buffer)
+            self._read_buffer = None
+        self._frame = None
+
+class DuplexSocket:
+    """Сокет, из которого один поток читает, пока другие в него пишут
+    
+    Кадр записывается целиком под блокировкой, поэтому кадры разных
+    потоков не перемешиваются. SSL объект нельзя одновременно читать и
+    писать из разных потоков, поэтому SSL сокет переводится в неблокирующий
+    режим: каждое обращение к нему идет под отдельной блокировкой, а
+    ожидание готовности - через select без нее.
+    
+    С flusher запись не блокирует пишущий поток: то, что не поместилось в
+    буфер ядра, копируется в буфер записи соединения и дописывается потоком
+    flusher. Когда в буфере больше high_water байт, чтение встает, пока
+    буфер не опустеет до low_water, - клиент, который не читает ответы, не
+    заставит сервер копить их без предела.
+    """
+    
+    POLL_INTERVAL = 1.0  # Как часто ожидание перепроверяет сокет
+    # Неблокирующая отправка через блокирующий сокет, из которого другой поток читает
+    DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0)
+    
+    def __init__(self, sock, flusher=None, high_water: int = 1024 * 1024, low_water: int = 256 * 1024):
+        self.sock = sock
+        self.is_ssl = isinstance(sock, ssl.SSLSocket)
+        self._write_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self.last_activity = time.monotonic()  # Когда последний раз пришли данные
+        if self.is_ssl:
+            sock.setblocking(False)
+        # Без MSG_DONTWAIT обычный сокет пишется блокирующими вызовами, как без flusher
+        self.flusher = flusher if self.is_ssl or self.DONTWAIT else None
+        self.high_water = high_water
+        self.low_water = low_water
+        self.buffered = 0          # Байт в буфере записи
+        self.paused_since = None   # Когда буфер превысил high_water; None - чтение идет
+        self.failed = False        # Запись не удалась, буфер отброшен
+        self.closing = False       # Сокет закроет flusher, когда допишет буфер
+        self._pending = []         # Недописанные буферы по порядку
+        self._drained = threading.Condition(self._write_lock)
+    
+    def fileno(self) -> int:
+        return self.sock.fileno()
+    
+    def recv_into(self, buffer, *args) -> int:
+        """Читает данные; блокирует вызывающий поток до их появления"""
+        if self.paused_since is not None:
+            self._wait_drained()
+        if not self.is_ssl:
+            nbytes = self.sock.recv_into(buffer, *args)
+            self.last_activity = time.monotonic()
+            return nbytes
+        
+        while True:
+            with self._io_lock:
+                try:
+                    nbytes = self.sock.recv_into(buffer, *args)
+                    self.last_activity = time.monotonic()
+                    return nbytes
+                except (BlockingIOError, ssl.SSLWantReadError):
+                    want_write = False
+                except ssl.SSLWantWriteError:
+                    want_write = True
+            self._wait(want_write)
+    
+    def send_views(self, views: List[memoryview]):
+        """Отправляет буферы одного или нескольких кадров целиком"""
+        with self._write_lock:
+            if self.flusher is not None:
+                self._send_buffered(views)
+                return
+            
+            if not self.is_ssl:
+                TCPProtocol.send_views(self.sock, views)
+                return
+            
+            for view in TCPProtocol.coalesce(views):
+                view = memoryview(view)
+                while len(view):
+                    with self._io_lock:
+                        try:
+                            sent = self.sock.send(view)
+                        except (BlockingIOError, ssl.SSLWantWriteError):
+                            sent, want_write = 0, True
+                        except ssl.SSLWantReadError:
+                            sent, want_write = 0, False
+                    if sent:
+                        view = view[sent:]
+                    else:
+                        self._wait(want_write)
+    
+    def _send_buffered(self, views: List[memoryview]):
+        """Отправляет, сколько примет ядро, остаток оставляет flusher; под _write_lock"""
+        if self.failed or self.closing:
+            raise ConnectionResetError("Соединение закрыто")
+        was_empty = not self._pending
+        if was_empty:
+            views = self._send_now(views)
+        if not views:
+            return
+        # Данные запроса живут только до следующего чтения, поэтому остаток копируется
+        self._pending.extend(bytes(view) for view in views)
+        self.buffered += sum(len(chunk) for chunk in self._pending[-len(views):])
+        if self.paused_since is None and self.buffered > self.high_water:
+            self.paused_since = time.monotonic()
+        if was_empty:
+            self.flusher.add(self)
+    
+    def _send_now(self, views: List) -> List:
+        """Пишет буферы без ожидания; возвращает то, что не поместилось"""
+        views = list(views)
+        if self.is_ssl:
+            # Отложенную SSL запись нужно повторить тем же буфером, поэтому буферы не склеиваются
+            for index, view in enumerate(views):
+                view = memoryview(view)
+                while len(view):
+                    with self._io_lock:
+                        try:
+                            sent = self.sock.send(view)
+                        except (BlockingIOError, ssl.SSLWantWriteError, ssl.SSLWantReadError):
+                            return [view] + views[index + 1:]
+                    view = view[sent:]
+            return []
+        
+        index = 0
+        while index < len(views):
+            try:
+                sent = self.sock.sendmsg(views[index:index + TCPProtocol.IOV_MAX], [], self.DONTWAIT)
+            except BlockingIOError:
+                break
+            while sent and index < len(views):
+                if sent >= len(views[index]):
+                    sent -= len(views[index])
+                    index += 1
+                else:
+                    views[index] = memoryview(views[index])[sent:]
+                    sent = 0
+        return views[index:]
+    
+    def flush(self) -> bool:
+        """Дописывает буфер записи из потока flusher; True - дописывать больше нечего"""
+        with self._write_lock:
+            if self.failed:
+                return True
+            try:
+                remaining = self._send_now(self._pending)
+            except OSError:
+                self._fail()
+                return True
+            self._pending = remaining
+            self.buffered = sum(len(chunk) for chunk in self._pending)
+            if self.paused_since is not None and self.buffered <= self.low_water:
+                self.paused_since = None
+                self._drained.notify_all()
+            return not self._pending
+    
+    def fail(self):
+        """Отбрасывает буфер записи; ждущие чтения получат ConnectionResetError"""
+        with self._write_lock:
+            self._fail()
+    
+    def _fail(self):
+        self.failed = True
+        self._pending = []
+        self.buffered = 0
+        self.paused_since = None
+        self._drained.notify_all()
+    
+    def _wait_drained(self):
+        """Ждет, пока flusher допишет буфер записи до low_water"""
+        with self._drained:
+            while self.paused_since is not None:
+                self._drained.wait()
+            if self.failed:
+                raise ConnectionResetError("Клиент не читает ответы")
+    
+    def _drain(self):
+        """Ждет, пока буфер записи не опустеет совсем (перед shutdown)"""
+        with self._drained:
+            if self._pending and not self.failed:
+                self.low_water = 0
+                if self.paused_since is None:
+                    self.paused_since = time.monotonic()
+        self._wait_drained()
+    
+    def _wait(self, want_write: bool):
+        """Ждет готовности сокета к чтению или записи"""
+        if self.sock.fileno() < 0:
+            raise ConnectionResetError("Сокет закрыт")
+        if want_write:
+            select.select([], [self.sock], [], self.POLL_INTERVAL)
+        else:
+            select.select([self.sock], [], [], self.POLL_INTERVAL)
+    
+    def shutdown(self, how: int):
+        self._drain()
+        self.sock.shutdown(how)
+    
+    def evict(self):
+        """Прерывает соединение; поток, ждущий данных, получит конец потока"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
+    def close(self):
+        with self._write_lock:
+            if self._pending and not self.failed:
+                # Ответы из буфера допишет flusher и сам закроет сокет; до тех пор
+                # действует тот же срок, что и для клиента, не читающего ответы
+                self.closing = True
+                self.low_water = 0
+                if self.paused_since is None:
+                    self.paused_since = time.monotonic()
+                return
+        self.sock.close()
 
 class UDPProtocol:
     """Протокол для работы с UDP сообщениями"""
     
+    # Первые байты, которые не встречаются в UTF-8: ими начинаются служебные датаграммы
+    MARKER_RELIABLE = 0xFF  # Надежный режим (src/reliable.py)
+    MARKER_FRAGMENT = 0xFE  # Фрагмент сообщения, не поместившегося в одну датаграмму
+    MARKER_REQUEST = 0xFD   # Запрос или ответ с идентификатором запроса
+    
+    # Датаграмма, которая проходит без IP фрагментации с запасом на IPv6 и туннели (MTU 1500)
+    DATAGRAM_SIZE = 1400
+    MAX_DATAGRAM = 65507  # Больше в одну датаграмму UDP поверх IPv4 не помещается
+    FRAGMENT_HEADER = struct.Struct('!BIHH')  # Маркер, номер сообщения, номер фрагмента, число фрагментов
+    MAX_FRAGMENTS = 0xFFFF
+    REQUEST_HEADER = struct.Struct('!BI')  # Маркер, идентификатор запроса
+    
     @staticmethod
     def create_message(data: str) -> bytes:
         """Создает UDP сообщение"""
@@ -47,4 +675,138 @@ class UDPProtocol:
     @staticmethod
     def parse_message(data: bytes) -> str:
         """Парсит UDP сообщение"""
-        return data.decode('utf-8')
\ No newline at end of file
+        return data.decode('utf-8')
+    
+    @classmethod
+    def tag_request(cls, request_id: int, data) -> bytes:
+        """Сообщение с идентификатором запроса; ответ на него придет с тем же идентификатором"""
+        return cls.REQUEST_HEADER.pack(cls.MARKER_REQUEST, request_id & 0xFFFFFFFF) + data
+    
+    @classmethod
+    def split_request(cls, data):
+        """(идентификатор запроса, данные) сообщения tag_request; ValueError, если идентификатора нет
+        
+        Данные - срез того же типа, что и data: у memoryview без копирования.
+        """
+        if len(data) < cls.REQUEST_HEADER.size or data[0] != cls.MARKER_REQUEST:
+            raise ValueError("Сообщение без идентификатора запроса")
+        _, request_id = cls.REQUEST_HEADER.unpack_from(data)
+        return request_id, data[cls.REQUEST_HEADER.size:]
+    
+    @classmethod
+    def fragment(cls, data, message_id: int, datagram_size: int = DATAGRAM_SIZE) -> List[bytes]:
+        """Датаграммы сообщения: само сообщение, если оно помещается, иначе фрагменты
+        
+        Сообщение, которое начинается с байта служебной датаграммы,
+        отправляется одним фрагментом, чтобы получатель его не спутал.
+        """
+        data = memoryview(data).cast('B')
+        if len(data) <= datagram_size and not (data and data[0] in (cls.MARKER_RELIABLE, cls.MARKER_FRAGMENT)):
+            return [bytes(data)]
+        chunk = datagram_size - cls.FRAGMENT_HEADER.size
+        if chunk <= 0:
+            raise ValueError(f"В датаграмму размером {datagram_size} байт не помещается заголовок фрагмента")
+        count = max(1, -(-len(data) // chunk))
+        if count > cls.MAX_FRAGMENTS:
+            raise ValueError(f"Сообщение длиной {len(data)} байт не помещается в {cls.MAX_FRAGMENTS} фрагментов")
+        message_id &= 0xFFFFFFFF
+        return [
+            cls.FRAGMENT_HEADER.pack(cls.MARKER_FRAGMENT, message_id, index, count)
+            + data[index * chunk:(index + 1) * chunk]
+            for index in range(count)
+        ]
+
+class _PartialMessage:
+    """Сообщение, от которого получены не все фрагменты"""
+    __slots__ = ('count', 'chunks', 'missing', 'size', 'deadline')
+    
+    def __init__(self, count: int, deadline: float):
+        self.count = count
+        self.chunks: Dict[int, bytes] = {}  # Память растет с полученными фрагментами, а не с объявленными
+        self.missing = (1 << count) - 1  # Бит на каждый еще не полученный фрагмент
+        self.size = 0
+        self.deadline = deadline
+
+class UDPReassembler:
+    """Сборка сообщений из фрагментов UDPProtocol.fragment
+    
+    Таблица недособранных сообщений ограничена max_messages: когда она
+    заполнена, новое сообщение вытесняет самое старое. Сообщение, не
+    собранное за timeout секунд, отбрасывается - один потерянный фрагмент
+    теряет все сообщение, повторов здесь нет. Сообщения длиннее
+    max_message_size отклоняются по заголовку первого пришедшего фрагмента.
+    """
+    
+    def __init__(self, max_messages: int = 64, max_message_size: int = 16 * 1024 * 1024, timeout: float = 5.0):
+        self.max_messages = max_messages
+        self.max_message_size = max_message_size
+        self.timeout = timeout
+        # (адрес, номер сообщения) -> сообщение; в порядке создания, то есть и истечения
+        self._partial: Dict[tuple, _PartialMessage] = OrderedDict()
+        # Счетчики для stats()
+        self.completed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.duplicates = 0
+        self.invalid = 0
+    
+    def add(self, packet, source, now: float) -> Optional[bytes]:
+        """Принимает фрагмент; возвращает сообщение, если этот фрагмент был последним"""
+        self.expire(now)
+        header = UDPProtocol.FRAGMENT_HEADER
+        if len(packet) < header.size or packet[0] != UDPProtocol.MARKER_FRAGMENT:
+            self.invalid += 1
+            return None
+        _, message_id, index, count = header.unpack_from(packet)
+        chunk = packet[header.size:]
+        if index >= count or (count - 1) * len(chunk) > self.max_message_size:
+            self.invalid += 1
+            return None
+        if count == 1:
+            self.completed += 1
+            return bytes(chunk)
+        key = (source, message_id)
+        partial = self._partial.get(key)
+        if partial is None:
+            if len(self._partial) >= self.max_messages:
+                self._partial.popitem(last=False)
+                self.evicted += 1
+            partial = self._partial[key] = _PartialMessage(count, now + self.timeout)
+        elif partial.count != count:
+            self.invalid += 1
+            return None
+        bit = 1 << index
+        if not partial.missing & bit:
+            self.duplicates += 1
+            return None
+        partial.missing &= ~bit
+        partial.chunks[index] = bytes(chunk)
+        partial.size += len(chunk)
+        if partial.size > self.max_message_size:
+            del self._partial[key]
+            self.invalid += 1
+            return None
+        if partial.missing:
+            return None
+        del self._partial[key]
+        self.completed += 1
+        return b"".join(partial.chunks[i] for i in range(count))
+    
+    def expire(self, now: float):
+        """Отбрасывает сообщения, которые не собрались вовремя"""
+        while self._partial:
+            key, partial = next(iter(self._partial.items()))
+            if partial.deadline > now:
+                break
+            del self._partial[key]
+            self.expired += 1
+    
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._partial),
+            "completed": self.completed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+        }
\ No newline at end of file
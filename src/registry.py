@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Optional
+from src.logs import connection_logger
+
+class ConnectionRegistry:
+    """Живые соединения сервера с вытеснением простаивающих
+
+    Соединение - любой объект с атрибутом last_activity (time.monotonic()
+    последнего приема данных) и методом evict(), который его закрывает.
+    Соединение удаляется из реестра, как только завершается, поэтому
+    реестр не растет за время работы сервера.
+    """
+
+    def __init__(self, idle_timeout: Optional[float] = None):
+        self.idle_timeout = idle_timeout  # None - простаивающие соединения не вытесняются
+        self._connections = {}  # Соединение -> адрес клиента
+        self._lock = threading.Lock()
+        self.total = 0    # Всего зарегистрировано соединений
+        self.evicted = 0  # Из них вытеснено за простой
+        self.stalled = 0  # Отключено, потому что клиент не читал ответы
+
+    def add(self, connection, addr: tuple):
+        with self._lock:
+            self._connections[connection] = addr
+            self.total += 1
+
+    def remove(self, connection):
+        with self._lock:
+            self._connections.pop(connection, None)
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def evict_idle(self) -> int:
+        """Закрывает соединения без приема данных дольше idle_timeout"""
+        if self.idle_timeout is None:
+            return 0
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [(connection, addr) for connection, addr in self._connections.items()
+                    if connection.last_activity < deadline]
+            # Вытесненное соединение больше не учитывается, даже если еще закрывается
+            for connection, _ in idle:
+                del self._connections[connection]
+        for connection, addr in idle:
+            connection_logger.info("Соединение с %s закрыто после %g с простоя", addr, self.idle_timeout)
+            connection.evict()
+        self.evicted += len(idle)
+        return len(idle)
+
+    def evict_stalled(self, connection, timeout: float):
+        """Отключает соединение, клиент которого не читает ответы дольше timeout секунд"""
+        with self._lock:
+            addr = self._connections.pop(connection, None)
+        self.stalled += 1
+        if addr is not None:  # Иначе соединение уже закрывалось и только дописывало ответы
+            connection_logger.warning("Соединение с %s закрыто: клиент не читает ответы %g с", addr, timeout)
+        connection.evict()
+
+    def evict_all(self):
+        """Закрывает все соединения при остановке сервера"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            connection.evict()
+
+    def stats(self) -> dict:
+        return {"active": len(self._connections), "total": self.total, "evicted": self.evicted,
+                "stalled": self.stalled}
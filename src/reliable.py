@@ -0,0 +1,425 @@
+import struct
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.protocols import UDPProtocol
+
+class _Outgoing:
+    """Отправленная, но еще не подтвержденная датаграмма"""
+    __slots__ = ('packet', 'sent_at', 'order', 'transmissions', 'sacked', 'lost')
+
+    def __init__(self, packet: bytes):
+        self.packet = packet
+        self.sent_at = 0.0
+        self.order = 0          # Номер последней отправки среди всех отправок канала
+        self.transmissions = 0
+        self.sacked = False     # Получатель подтвердил ее выборочно
+        self.lost = False       # Ждет повторной отправки
+
+class ReliableChannel:
+    """Надежная доставка сообщений между двумя адресами поверх датаграмм
+
+    Класс сам не работает с сокетом: receive разбирает пришедшую
+    датаграмму и возвращает сообщения, доставленные по порядку, а
+    datagrams отдает датаграммы, которые пора отправить (новые в пределах
+    окна, повторы и подтверждения). Поэтому один класс обслуживает и
+    клиента, и сессии сервера, и соединение не нужно устанавливать.
+
+    Каждое сообщение - одна датаграмма с порядковым номером. Получатель
+    подтверждает непрерывный префикс и до MAX_SACK_BLOCKS диапазонов,
+    принятых после разрыва, поэтому повторяются только потерянные
+    датаграммы. Датаграмма считается потерянной, когда подтверждены
+    отправленные на DUP_THRESHOLD позже нее, или по таймеру повтора, который
+    вычисляется по RTT (RFC 6298). Окно перегрузки растет медленным стартом,
+    а при потере уменьшается вдвое (AIMD); после таймаута оно падает до
+    одной датаграммы.
+    """
+
+    HEADER = struct.Struct('!BBII')  # Маркер, тип, номер сессии, номер датаграммы (у ACK - ожидаемый)
+    SACK_BLOCK = struct.Struct('!II')  # Начало и конец (не включая) принятого диапазона
+    DATA = 1
+    ACK = 2
+
+    WINDOW = 64             # Сколько датаграмм может быть без подтверждения
+    INITIAL_CWND = 4
+    DUP_THRESHOLD = 3
+    MAX_SACK_BLOCKS = 4
+    INITIAL_RTO = 0.25      # Секунды до первого замера RTT
+    MIN_RTO = 0.02
+    MAX_RTO = 3.0
+    MAX_TRANSMISSIONS = 10  # После стольких отправок без подтверждения канал считается оборванным
+    SEQ_MASK = 0xFFFFFFFF   # Номера датаграмм 32-битные и после 2**32 - 1 начинаются с нуля
+
+    def __init__(self, session_id: int, window: int = WINDOW, max_datagram: int = 4096):
+        if window < 1:
+            raise ValueError("Окно должно быть не меньше 1")
+        self.session_id = session_id
+        self.window = window
+        self.max_datagram = max_datagram
+        self.failed = False
+        self.last_activity = 0.0  # Когда пришла последняя датаграмма (для сессий сервера)
+        # Отправка
+        self._queue = deque()  # Сообщения, еще не попавшие в окно
+        self._unacked: Dict[int, _Outgoing] = OrderedDict()
+        self._next_seq = 0
+        self._sent = 0
+        self._order = 0
+        self._delivered_order = 0  # Наибольший номер отправки среди подтвержденных
+        self._recovery_order = 0   # Потери до этой отправки уже уменьшили окно
+        self.cwnd = float(self.INITIAL_CWND)
+        self.ssthresh = float(window)
+        self.srtt = None
+        self.rttvar = None
+        self.rto = self.INITIAL_RTO
+        # Прием
+        self._expected = 0
+        self._delivered = 0
+        self._out_of_order: Dict[int, bytes] = {}
+        self._ack_due = False
+        # Счетчики для stats()
+        self.retransmits = 0
+        self.timeouts = 0
+        self.lost = 0
+        self.duplicates = 0
+
+    @classmethod
+    def seq_offset(cls, seq: int, base: int) -> int:
+        """На сколько seq дальше base с учетом перехода через 2**32 (RFC 1982)
+
+        Отрицательное значение - seq раньше base; окно намного меньше 2**31,
+        поэтому сравнение однозначно.
+        """
+        offset = (seq - base) & cls.SEQ_MASK
+        return offset - (cls.SEQ_MASK + 1) if offset > cls.SEQ_MASK >> 1 else offset
+
+    @classmethod
+    def parse_header(cls, packet) -> Tuple[int, int, int]:
+        """(тип, номер сессии, номер) служебной датаграммы; ValueError, если она не наша"""
+        if len(packet) < cls.HEADER.size or packet[0] != UDPProtocol.MARKER_RELIABLE:
+            raise ValueError("Датаграмма не относится к надежному режиму")
+        _, kind, session_id, number = cls.HEADER.unpack_from(packet)
+        return kind, session_id, number
+
+    def send(self, payload):
+        """Ставит сообщение в очередь; уйдет, когда освободится место в окне"""
+        if len(payload) + self.HEADER.size > self.max_datagram:
+            raise ValueError(f"Сообщение длиной {len(payload)} байт не помещается в одну датаграмму")
+        self._queue.append(bytes(payload))
+
+    def receive(self, packet, now: float) -> List[bytes]:
+        """Разбирает датаграмму канала и возвращает доставленные по порядку сообщения"""
+        kind, session_id, number = self.parse_header(packet)
+        if session_id != self.session_id:
+            return []  # Датаграмма прошлой сессии
+        if kind == self.DATA:
+            return self._receive_data(number, bytes(packet[self.HEADER.size:]))
+        if kind == self.ACK:
+            self._receive_ack(number, packet, now)
+        return []
+
+    def datagrams(self, now: float) -> List[bytes]:
+        """Датаграммы, которые пора отправить: подтверждение, повторы и новые в пределах окна"""
+        out = []
+        acked = self._ack_due
+        if acked:
+            # Подтверждение раньше ответов: отправитель узнает о доставке запроса до ответа на него
+            out.append(self._ack_packet())
+            self._ack_due = False
+        self._check_timeout(now)
+        budget = int(min(self.cwnd, self.window)) - self._in_flight()
+        # Повторы потерянных уходят раньше новых
+        for item in self._unacked.values():
+            if budget <= 0:
+                break
+            if item.lost:
+                self._transmit(item, now, out)
+                budget -= 1
+        base = next(iter(self._unacked), self._next_seq)
+        while budget > 0 and self._queue and self.seq_offset(self._next_seq, base) < self.window:
+            header = self.HEADER.pack(UDPProtocol.MARKER_RELIABLE, self.DATA, self.session_id, self._next_seq)
+            item = _Outgoing(header + self._queue.popleft())
+            self._unacked[self._next_seq] = item
+            self._next_seq = (self._next_seq + 1) & self.SEQ_MASK
+            self._sent += 1
+            self._transmit(item, now, out)
+            budget -= 1
+        if out and not acked and (self._delivered or self._out_of_order):
+            # Подтверждение идет и с данными: если последнее подтверждение
+            # потерялось, другая сторона не ждет повтора по таймеру
+            out.insert(0, self._ack_packet())
+        return out
+
+    def next_timeout(self, now: float) -> Optional[float]:
+        """Через сколько секунд снова вызвать datagrams; None - ждать нечего"""
+        if self._ack_due:
+            return 0.0
+        deadline = self._rto_deadline()
+        if deadline is None:
+            # Все неподтвержденные ждут повтора - окно свободно, отправлять можно сразу
+            return 0.0 if self._queue or self._unacked else None
+        return max(0.0, deadline - now)
+
+    def idle(self) -> bool:
+        """Все отправленное подтверждено и отправлять нечего"""
+        return not self._queue and not self._unacked and not self._ack_due
+
+    def stats(self) -> dict:
+        return {
+            "sent": self._sent,
+            "delivered": self._delivered,
+            "in_flight": self._in_flight(),
+            "queued": len(self._queue),
+            "retransmits": self.retransmits,
+            "timeouts": self.timeouts,
+            "lost": self.lost,
+            "duplicates": self.duplicates,
+            "cwnd": self.cwnd,
+            "srtt": self.srtt,
+            "rto": self.rto,
+        }
+
+    def _receive_data(self, number: int, payload: bytes) -> List[bytes]:
+        self._ack_due = True
+        offset = self.seq_offset(number, self._expected)
+        if offset < 0 or number in self._out_of_order:
+            self.duplicates += 1  # Наше подтверждение потерялось, отправим его снова
+            return []
+        if offset >= self.window:
+            return []  # Не помещается в окно приема
+        self._out_of_order[number] = payload
+        delivered = []
+        while self._expected in self._out_of_order:
+            delivered.append(self._out_of_order.pop(self._expected))
+            self._expected = (self._expected + 1) & self.SEQ_MASK
+        self._delivered += len(delivered)
+        return delivered
+
+    def _ack_packet(self) -> bytes:
+        """Подтверждение: следующий ожидаемый номер и диапазоны, принятые после разрыва"""
+        blocks = []
+        for seq in sorted(self._out_of_order, key=lambda seq: self.seq_offset(seq, self._expected)):
+            end = (seq + 1) & self.SEQ_MASK
+            if blocks and blocks[-1][1] == seq:
+                blocks[-1][1] = end
+            elif len(blocks) < self.MAX_SACK_BLOCKS:
+                blocks.append([seq, end])
+            else:
+                break
+        header = self.HEADER.pack(UDPProtocol.MARKER_RELIABLE, self.ACK, self.session_id, self._expected)
+        return header + bytes([len(blocks)]) + b"".join(self.SACK_BLOCK.pack(*block) for block in blocks)
+
+    def _receive_ack(self, cumulative: int, packet, now: float):
+        offset = self.HEADER.size
+        count = packet[offset] if len(packet) > offset else 0
+        blocks = [
+            self.SACK_BLOCK.unpack_from(packet, offset + 1 + i * self.SACK_BLOCK.size)
+            for i in range(min(count, (len(packet) - offset - 1) // self.SACK_BLOCK.size))
+        ]
+        delivered = []
+        while self._unacked:
+            seq = next(iter(self._unacked))
+            if self.seq_offset(seq, cumulative) >= 0:
+                break
+            item = self._unacked.pop(seq)
+            if not item.sacked:
+                delivered.append(item)
+        for start, end in blocks:
+            if self.seq_offset(start, cumulative) < 0:
+                start = cumulative
+            # Диапазон не дальше отправленного и не длиннее окна, даже если подтверждение испорчено
+            length = min(self.seq_offset(end, start), self.seq_offset(self._next_seq, start), self.window)
+            for i in range(max(length, 0)):
+                item = self._unacked.get((start + i) & self.SEQ_MASK)
+                if item is not None and not item.sacked:
+                    item.sacked = True
+                    item.lost = False
+                    delivered.append(item)
+        if delivered:
+            newest = max(delivered, key=lambda item: item.order)
+            if newest.transmissions == 1:
+                # RTT замеряется только по последней отправке: подтверждение старых
+                # датаграмм могло задержаться из-за потерь, а RTT повторно
+                # отправленных неоднозначен (алгоритм Карна)
+                self._rtt_sample(now - newest.sent_at)
+            self._delivered_order = max(self._delivered_order, newest.order)
+            self._detect_losses()
+            for _ in range(len(delivered)):
+                # Медленный старт до ssthresh, дальше плюс одна датаграмма за окно
+                self.cwnd += 1.0 if self.cwnd < self.ssthresh else 1.0 / self.cwnd
+            self.cwnd = min(self.cwnd, float(self.window))
+
+    def _rtt_sample(self, rtt: float):
+        """Оценка RTT и таймер повтора по RFC 6298"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.MIN_RTO), self.MAX_RTO)
+
+    def _detect_losses(self):
+        """Датаграмма потеряна, если подтверждены отправленные на DUP_THRESHOLD позже нее
+
+        Когда неподтвержденных датаграмм меньше порога, столько
+        подтверждений не придет, и хватает одного (early retransmit, RFC 5827).
+        """
+        threshold = self.DUP_THRESHOLD if len(self._unacked) > self.DUP_THRESHOLD else 1
+        for item in self._unacked.values():
+            if item.sacked or item.lost or item.order + threshold > self._delivered_order:
+                continue
+            item.lost = True
+            self.lost += 1
+            if item.order > self._recovery_order:
+                # Одно уменьшение окна на все потери одного окна
+                self.ssthresh = max(self.cwnd / 2, 2.0)
+                self.cwnd = self.ssthresh
+                self._recovery_order = self._order
+
+    def _check_timeout(self, now: float):
+        deadline = self._rto_deadline()
+        if deadline is None or now < deadline:
+            return
+        # Подтверждений нет целый RTO: все неподтвержденные, включая выборочно
+        # подтвержденные, повторяются, начиная с окна в одну датаграмму
+        self.timeouts += 1
+        self.ssthresh = max(self.cwnd / 2, 2.0)
+        self.cwnd = 1.0
+        self.rto = min(self.rto * 2, self.MAX_RTO)
+        self._recovery_order = self._order
+        for item in self._unacked.values():
+            if not item.lost:
+                item.lost = True
+                item.sacked = False
+                self.lost += 1
+
+    def _rto_deadline(self) -> Optional[float]:
+        # Выборочно подтвержденные тоже держат таймер: без него пропавшее
+        # подтверждение префикса остановило бы канал
+        sent = [item.sent_at for item in self._unacked.values() if not item.lost]
+        return min(sent) + self.rto if sent else None
+
+    def _in_flight(self) -> int:
+        return sum(1 for item in self._unacked.values() if not item.sacked and not item.lost)
+
+    def _transmit(self, item: _Outgoing, now: float, out: List[bytes]):
+        if item.transmissions >= self.MAX_TRANSMISSIONS:
+            self.failed = True
+            item.lost = False  # Больше не повторяется
+            return
+        if item.transmissions:
+            self.retransmits += 1
+        item.transmissions += 1
+        self._order += 1
+        item.order = self._order
+        item.sent_at = now
+        item.lost = False
+        out.append(item.packet)
+
+class ReliableSessions:
+    """Сессии надежного режима на сервере: свой канал на каждый адрес и номер сессии
+
+    Таймеры повтора всех сессий проверяет sweep, когда подходит ближайший
+    из них, поэтому обработка датаграммы не перебирает все сессии.
+    Сессия без неподтвержденных датаграмм закрывается после idle_timeout
+    секунд тишины, оборванная - сразу.
+    """
+
+    MAX_SESSIONS = 1024
+    IDLE_TIMEOUT = 30.0
+
+    def __init__(
+        self,
+        window: int = ReliableChannel.WINDOW,
+        max_datagram: int = 4096,
+        max_sessions: int = MAX_SESSIONS,
+        idle_timeout: float = IDLE_TIMEOUT
+    ):
+        self.window = window
+        self.max_datagram = max_datagram
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._channels: Dict[tuple, ReliableChannel] = OrderedDict()  # В порядке последней активности
+        self._next_sweep = None
+        self.created = 0
+        self.rejected = 0  # Новые сессии, для которых не нашлось места
+        self.failed = 0
+
+    def receive(self, packet, addr, now: float) -> Tuple[Optional[ReliableChannel], List[bytes]]:
+        """Канал, к которому относится датаграмма, и доставленные им сообщения"""
+        try:
+            kind, session_id, _ = ReliableChannel.parse_header(packet)
+        except ValueError:
+            return None, []
+        key = (addr, session_id)
+        channel = self._channels.get(key)
+        if channel is None:
+            if kind != ReliableChannel.DATA or not self._make_room(now):
+                return None, []
+            channel = ReliableChannel(session_id, self.window, self.max_datagram)
+            self._channels[key] = channel
+            self.created += 1
+        self._channels.move_to_end(key)
+        channel.last_activity = now
+        return channel, channel.receive(packet, now)
+
+    def flush(self, channel: ReliableChannel, now: float) -> List[bytes]:
+        """Датаграммы канала после обработки пришедшей датаграммы"""
+        datagrams = channel.datagrams(now)
+        self._schedule(channel.next_timeout(now), now)
+        return datagrams
+
+    def due(self, now: float) -> bool:
+        return self._next_sweep is not None and now >= self._next_sweep
+
+    def timeout(self, now: float, limit: float) -> float:
+        """Сколько ждать следующую датаграмму, чтобы не пропустить таймер"""
+        if self._next_sweep is None:
+            return limit
+        return min(limit, max(self._next_sweep - now, 0.001))
+
+    def sweep(self, now: float) -> Iterator[Tuple[bytes, tuple]]:
+        """Повторы по таймерам всех сессий и закрытие оборванных и простаивающих"""
+        self._next_sweep = None
+        for key, channel in list(self._channels.items()):
+            for datagram in channel.datagrams(now):
+                yield datagram, key[0]
+            if channel.failed:
+                self.failed += 1
+                del self._channels[key]
+            elif channel.idle() and now - channel.last_activity > self.idle_timeout:
+                del self._channels[key]
+            else:
+                self._schedule(channel.next_timeout(now), now)
+                if channel.idle():
+                    self._schedule(channel.last_activity + self.idle_timeout - now, now)
+
+    def _schedule(self, timeout: Optional[float], now: float):
+        if timeout is None:
+            return
+        deadline = now + timeout
+        if self._next_sweep is None or deadline < self._next_sweep:
+            self._next_sweep = deadline
+
+    def _make_room(self, now: float) -> bool:
+        if len(self._channels) < self.max_sessions:
+            return True
+        # Освобождает место, закрывая самую давнюю простаивающую сессию
+        for key, channel in self._channels.items():
+            if channel.idle():
+                del self._channels[key]
+                return True
+        self.rejected += 1
+        return False
+
+    def stats(self) -> dict:
+        totals = {"retransmits": 0, "timeouts": 0, "lost": 0}
+        for channel in list(self._channels.values()):  # stats зовут и из других потоков
+            for name in totals:
+                totals[name] += getattr(channel, name)
+        return {
+            "sessions": len(self._channels),
+            "created": self.created,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            **totals,
+        }
@@ -0,0 +1,171 @@
+from collections import deque
+from typing import Iterable, Iterator, List, Optional
+from src.budget import MemoryBudget
+from src.buffer_pool import BufferPool
+from src.compression import FrameCompressor
+from src.handlers import EchoHandler, Handler
+from src.protocols import Frame, FrameDecoder, Payload, TCPProtocol
+
+class FrameReader:
+    """Чтение кадров из блокирующего сокета через FrameDecoder
+    
+    Кадры, прочитанные раньше, чем они понадобились (например, вслед за
+    началом потокового сообщения), можно вернуть обратно через unread.
+    """
+    
+    def __init__(
+        self,
+        sock,
+        buffer_size: int = 4096,
+        max_frame_size: int = TCPProtocol.MAX_FRAME_LENGTH,
+        budget: Optional[MemoryBudget] = None,
+        pool: Optional[BufferPool] = None
+    ):
+        self.sock = sock
+        self.decoder = FrameDecoder(buffer_size, max_frame_size, budget, pool)
+        self.pending = deque()
+    
+    def read_frames(self) -> Optional[List[Frame]]:
+        """Возвращает ранее прочитанные или новые кадры; None - соединение закрыто"""
+        if self.pending:
+            frames = list(self.pending)
+            self.pending.clear()
+            return frames
+        
+        while True:
+            success, frames = self.decoder.receive_frames(self.sock)
+            if not success:
+                return None
+            if frames:
+                return frames
+    
+    def unread(self, frames: List[Frame]):
+        """Возвращает кадры, чтобы они были прочитаны первыми"""
+        self.pending.extendleft(reversed(frames))
+    
+    def next_frame(self) -> Optional[Frame]:
+        """Возвращает один следующий кадр"""
+        frames = self.read_frames()
+        if not frames:
+            return None
+        self.unread(frames[1:])
+        return frames[0]
+    
+    def stream_frames(self, first: Frame) -> Iterator[Frame]:
+        """Лениво читает кадры потокового сообщения, начиная с first"""
+        frame = first
+        yield frame
+        while frame.flags & TCPProtocol.FLAG_MORE:
+            frame = self.next_frame()
+            if frame is None:
+                raise ConnectionResetError("Соединение закрыто посреди потокового сообщения")
+            yield frame
+    
+    def close(self):
+        """Освобождает место в бюджете памяти и буферы пула"""
+        self.pending.clear()
+        self.decoder.close()
+
+class ServerSession:
+    """Обработка кадров одного TCP соединения без привязки к вводу-выводу
+    
+    Общая для TCPServer и TLSTCPServer: отвечает на служебные кадры
+    согласования, распаковывает данные и передает их обработчику сообщений
+    (по умолчанию эхо).
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        addr: tuple,
+        compressor: Optional[FrameCompressor] = None,
+        max_frame_size: int = TCPProtocol.MAX_FRAME_LENGTH,
+        handler: Optional[Handler] = None
+    ):
+        self.name = name
+        self.addr = addr
+        self.max_frame_size = max_frame_size  # Предел и для распакованных данных
+        # Без настроек сжатия сервер ничего не предлагает, но сжатые кадры понимает
+        self.compressor = compressor.copy() if compressor else FrameCompressor(codecs=())
+        self.handler = handler or EchoHandler(name)
+        self.closed = False
+    
+    def handle_frames(self, frames: Iterable[Frame]) -> List[Frame]:
+        """Обрабатывает принятые кадры и возвращает кадры ответов"""
+        responses = []
+        for frame in frames:
+            if frame.flags & TCPProtocol.FLAG_CONTROL:
+                responses.append(self._handle_control(frame))
+                continue
+            
+            data = self._decompress(frame)
+            if not data:
+                self.closed = True  # Пустой кадр - клиент завершает сеанс
+                break
+            
+            responses.append(self.compressor.compress(self.handle_message(data)))
+        return responses
+    
+    def handle_message(self, data: Payload) -> Payload:
+        """Формирует ответ на сообщение обработчиком сервера"""
+        return self.handler(data, self.addr)
+    
+    def handle_multiplexed(self, frame: Frame) -> Frame:
+        """Отвечает на запрос с идентификатором; ответ несет тот же идентификатор"""
+        try:
+            if frame.flags & (TCPProtocol.FLAG_CONTROL | TCPProtocol.FLAG_MORE):
+                raise ValueError("Служебные и потоковые кадры не поддерживаются в мультиплексном режиме")
+            response = self.compressor.compress(self.handle_message(self._decompress(frame)))
+        except Exception as e:
+            response = TCPProtocol.control_frame({"type": "error", "error": str(e)})
+        return response._replace(stream_id=frame.stream_id)
+    
+    def handle_stream(self, chunks: Iterator[Payload]) -> Iterator[Payload]:
+        """Части ответа на потоковое сообщение
+        
+        Обработчик без метода stream получает сообщение целиком.
+        """
+        stream = getattr(self.handler, 'stream', None)
+        if stream is not None:
+            yield from stream(chunks, self.addr)
+        else:
+            yield self.handler(b"".join(chunks), self.addr)
+    
+    def stream_replies(self, frames: Iterator[Frame]) -> Iterator[Frame]:
+        """Кадры ответа на потоковое сообщение из кадров запроса"""
+        frames = iter(frames)
+        # stream_frames заглядывает на часть вперед, поэтому часть должна
+        # пережить чтение следующей
+        chunks = (self._decompress(FrameDecoder.retain(frame)) for frame in frames)
+        yield from TCPProtocol.stream_frames(self.handle_stream(chunks), self.compressor.compress)
+        for _ in frames:
+            pass  # Дочитываем запрос, если обработчик закончил раньше
+    
+    def _decompress(self, frame: Frame) -> Payload:
+        """Распаковывает кадр, не давая данным вырасти больше max_frame_size"""
+        return self.compressor.decompress(frame, self.max_frame_size)
+    
+    def _handle_control(self, frame: Frame) -> Frame:
+        """Отвечает на служебный кадр"""
+        request = TCPProtocol.parse_control(frame)
+        if request.get("type") == "hello":
+            answer = {"type": "hello", "streaming": True, "multiplexing": True}
+            answer.update(self.compressor.accept(request))
+        else:
+            answer = {"type": "error", "error": f"Неизвестный служебный кадр: {request.get('type')}"}
+        return TCPProtocol.control_frame(answer)
+
+def negotiate(sock, compressor: FrameCompressor) -> bool:
+    """Проводит согласование hello на стороне клиента"""
+    offer = {"type": "hello"}
+    offer.update(compressor.offer())
+    TCPProtocol.send_messages(sock, [TCPProtocol.control_frame(offer)])
+    
+    success, frame = TCPProtocol.receive_frame(sock)
+    if not success or not frame.flags & TCPProtocol.FLAG_CONTROL:
+        return False
+    answer = TCPProtocol.parse_control(frame)
+    if answer.get("type") != "hello":
+        return False
+    compressor.apply(answer)
+    return True
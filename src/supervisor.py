@@ -0,0 +1,226 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from src.logs import logger, shutdown_logging
+
+def merge_stats(reports: List[dict]) -> dict:
+    """Складывает счетчики процессов; доли (float) усредняются"""
+    merged = {}
+    for report in reports:
+        for key, value in report.items():
+            merged.setdefault(key, []).append(value)
+    for key, values in merged.items():
+        if isinstance(values[0], dict):
+            merged[key] = merge_stats(values)
+        elif isinstance(values[0], float):
+            merged[key] = sum(values) / len(values)
+        else:
+            merged[key] = sum(values)
+    return merged
+
+def _run_worker(factory: Callable, index: int, cpu: Optional[int], reports, interval: float):
+    """Тело процесса-копии: создает сервер, присылает его счетчики и обслуживает клиентов"""
+    # Ctrl+C получает вся группа процессов, а останавливает копии супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    server = factory()
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    supervisor = os.getppid()
+
+    def report():
+        while True:
+            time.sleep(interval)
+            if os.getppid() != supervisor:
+                server.stop()  # Супервизор убит и не остановит копию сам
+                return
+            reports.put((index, os.getpid(), server.stats()))
+
+    reporter = threading.Thread(target=report, name="stats reporter")
+    reporter.daemon = True
+    reporter.start()
+    try:
+        server.start()
+    finally:
+        shutdown_logging()  # Копия завершается через os._exit, без atexit
+
+class Supervisor:
+    """Запускает несколько процессов-копий сервера на одном порту
+
+    Каждая копия создает сервер через factory, и сервер открывает свой
+    слушающий сокет с SO_REUSEPORT, поэтому подключения и датаграммы UDP
+    распределяет между процессами ядро. Копия, которая завершилась без
+    команды супервизора, запускается заново. Раз в stats_interval копии
+    присылают server.stats(), а stats() складывает их в общую сводку.
+    worker_stats() показывает каждую копию отдельно вместе со скоростью
+    роста ее счетчиков, а с log_interval эти скорости пишутся в лог.
+    """
+
+    RESTART_DELAY = 1.0   # Не чаще раза в столько секунд перезапускать одну копию
+    STATS_INTERVAL = 1.0  # Как часто копии присылают счетчики
+    STOP_TIMEOUT = 5.0    # Сколько ждать копию после SIGTERM, прежде чем убить
+
+    def __init__(
+        self,
+        factory: Callable,
+        workers: int,
+        cpu_affinity: bool = False,
+        stats_interval: float = STATS_INTERVAL,
+        restart_delay: float = RESTART_DELAY,
+        log_interval: Optional[float] = None
+    ):
+        self.factory = factory  # Создает сервер в процессе-копии
+        self.workers = workers
+        self.stats_interval = stats_interval
+        self.restart_delay = restart_delay
+        self.log_interval = log_interval  # Как часто писать в лог скорости копий; None - не писать
+        self.cpus = None  # Ядра, по одному на копию по кругу; None - без привязки
+        if cpu_affinity:
+            if hasattr(os, "sched_setaffinity"):
+                self.cpus = sorted(os.sched_getaffinity(0))
+            else:
+                logger.warning("Привязка к ядрам не поддерживается в этой системе")
+        # fork: копия получает factory вместе с замыканием, без сериализации
+        self._context = multiprocessing.get_context("fork")
+        self._reports = self._context.Queue()
+        self._processes = [None] * workers
+        self._started = [0.0] * workers
+        self._stats: Dict[int, dict] = {}  # Номер копии -> последние счетчики
+        self._rates: Dict[int, dict] = {}  # Номер копии -> прирост счетчиков в секунду
+        self._reported: Dict[int, float] = {}  # Номер копии -> когда пришли счетчики
+        self._lock = threading.Lock()
+        self.restarts = 0
+        self.running = False
+
+    def run(self):
+        """Запускает копии и следит за ними, пока не вызван stop"""
+        self.running = True
+        if threading.current_thread() is threading.main_thread():
+            # kill и systemctl stop останавливают копии так же, как Ctrl+C
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info("Супервизор запустил %d процессов сервера", self.workers)
+        logged = time.monotonic()
+        try:
+            while self.running:
+                self._collect(timeout=0.2)
+                self._restart_exited()
+                if self.log_interval and time.monotonic() - logged >= self.log_interval:
+                    logged = time.monotonic()
+                    self._log_rates()
+        except KeyboardInterrupt:
+            logger.info("Остановка сервера...")
+        finally:
+            self.running = False
+            self._terminate()
+            logger.info("Сводка процессов сервера: %s", self.stats())
+
+    def stop(self):
+        """Останавливает копии; можно вызывать из любого потока"""
+        self.running = False
+
+    def pids(self) -> List[Optional[int]]:
+        """PID текущих копий по номерам"""
+        return [process.pid if process else None for process in self._processes]
+
+    def stats(self) -> dict:
+        """Сумма последних счетчиков живых копий и число перезапусков"""
+        with self._lock:
+            reports = list(self._stats.values())
+        alive = sum(1 for process in self._processes if process and process.is_alive())
+        return {"workers": alive, "restarts": self.restarts, **merge_stats(reports)}
+
+    def worker_stats(self) -> List[dict]:
+        """Последние счетчики каждой копии и их прирост в секунду между двумя отчетами"""
+        with self._lock:
+            return [
+                {
+                    "worker": index,
+                    "pid": self._processes[index].pid if self._processes[index] else None,
+                    "stats": self._stats[index],
+                    "rates": self._rates.get(index, {}),
+                }
+                for index in sorted(self._stats)
+            ]
+
+    def _log_rates(self):
+        for worker in self.worker_stats():
+            rates = ", ".join(f"{name} {rate:.0f}/с" for name, rate in worker["rates"].items())
+            if rates:
+                logger.info("Процесс %d (pid %s): %s", worker["worker"], worker["pid"], rates)
+
+    def _spawn(self, index: int):
+        cpu = self.cpus[index % len(self.cpus)] if self.cpus else None
+        process = self._context.Process(
+            target=_run_worker,
+            args=(self.factory, index, cpu, self._reports, self.stats_interval),
+            name=f"server worker {index}"
+        )
+        process.daemon = True
+        process.start()
+        self._processes[index] = process
+        self._started[index] = time.monotonic()
+        with self._lock:
+            # Счетчики упавшей копии больше не актуальны
+            self._stats.pop(index, None)
+            self._rates.pop(index, None)
+            self._reported.pop(index, None)
+
+    def _collect(self, timeout: float):
+        """Принимает счетчики копий; отчеты уже замененных процессов отбрасываются"""
+        try:
+            index, pid, stats = self._reports.get(timeout=timeout)
+            while True:
+                if self._processes[index] and self._processes[index].pid == pid:
+                    self._store(index, stats)
+                index, pid, stats = self._reports.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _store(self, index: int, stats: dict):
+        """Сохраняет счетчики копии и скорость роста целых счетчиков верхнего уровня"""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._stats.get(index)
+            elapsed = now - self._reported.get(index, now)
+            if previous is not None and elapsed > 0:
+                self._rates[index] = {
+                    name: (value - previous.get(name, 0)) / elapsed
+                    for name, value in stats.items()
+                    if isinstance(value, int) and not isinstance(value, bool)
+                }
+            self._stats[index] = stats
+            self._reported[index] = now
+
+    def _restart_exited(self):
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or not self.running:
+                continue
+            if time.monotonic() - self._started[index] < self.restart_delay:
+                continue  # Копия падает сразу после запуска - перезапуск с задержкой
+            logger.warning("Процесс сервера %s завершился с кодом %s, перезапуск", process.pid, process.exitcode)
+            process.close()
+            self.restarts += 1
+            self._spawn(index)
+
+    def _terminate(self):
+        """SIGTERM копиям, а не остановившимся за STOP_TIMEOUT или после повторного Ctrl+C - SIGKILL"""
+        processes = [process for process in self._processes if process]
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        try:
+            for process in processes:
+                process.join(max(0.0, deadline - time.monotonic()))
+        except KeyboardInterrupt:
+            pass
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+                process.join()
@@ -1,46 +1,475 @@
+import select
 import socket
-from src.protocols import TCPProtocol  # Абсолютный импорт
+import ssl
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Iterable, Iterator, List, Optional, Union
+from src.compression import FrameCompressor
+from src.protocols import DuplexSocket, Frame, FrameDecoder, TCPProtocol  # Абсолютный импорт
+from src.session import FrameReader, negotiate
+from src.tuning import SocketTuning
+
+class ServerClosedError(ConnectionError):
+    """Сервер закрыл соединение, не ответив на запрос"""
 
 class TCPClient:
-    def __init__(self, host: str = 'localhost', port: int = 8888, buffer_size: int = 4096):
+    PIPELINE_WINDOW = 64  # Сколько запросов send_stream держит без ответа по умолчанию
+    
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8888,
+        buffer_size: int = 4096,
+        compression: Optional[FrameCompressor] = None,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None
+    ):
         self.host = host
         self.port = port
+        # Путь сокета AF_UNIX сервера на этой машине; host и port тогда не используются
+        self.unix_socket = unix_socket
         self.buffer_size = buffer_size
+        self.compression = compression
+        # Профиль (default, latency, throughput) или свои параметры сокета
+        self.tuning = SocketTuning.resolve(tuning)
+        self.socket_options = {}  # Действующие параметры сокета после подключения
+        self.compressor = None
         self.socket = None
+        # Мультиплексный режим: ответы читает отдельный поток и раздает по идентификатору
+        self._duplex = None
+        self._reader_thread = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_stream_id = 1
         
     def connect(self):
         """Подключается к TCP серверу"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.host, self.port))
-            print(f"Подключен к TCP серверу {self.host}:{self.port}")
-            return True
+            self.socket = self._create_socket()
+            self.socket.connect(self.address)
+            print(f"Подключен к TCP серверу {self.endpoint}")
+            return self._negotiate()
         except Exception as e:
             print(f"Ошибка подключения: {e}")
             return False
     
+    def _create_socket(self) -> socket.socket:
+        """Создает сокет с параметрами профиля; их нужно задать до connect"""
+        family = socket.AF_UNIX if self.unix_socket else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        self.socket_options = self.tuning.apply(sock)
+        if self.socket_options:
+            print(f"Параметры сокета: {SocketTuning.describe(self.socket_options)}")
+        return sock
+    
+    @property
+    def address(self):
+        """Адрес сервера для connect"""
+        return self.unix_socket or (self.host, self.port)
+    
+    @property
+    def endpoint(self) -> str:
+        """Адрес сервера для сообщений"""
+        return self.unix_socket or f"{self.host}:{self.port}"
+    
+    def _connection(self):
+        """Сокет, через который идет обмен сообщениями"""
+        return self.socket
+    
+    def _negotiate(self) -> bool:
+        """Согласует сжатие сразу после подключения, если оно настроено"""
+        if not self.compression:
+            return True
+        
+        self.compressor = self.compression.copy()
+        if not negotiate(self._connection(), self.compressor):
+            print("Сервер не поддерживает согласование сжатия")
+            self.disconnect()
+            return False
+        print(f"Сжатие: {self.compressor.codec or 'отключено'}")
+        return True
+    
     def send_message(self, message: str) -> str:
         """Отправляет сообщение и возвращает ответ"""
-        if not self.socket:
+        if not self._connection():
             return "Не подключен к серверу"
+        try:
+            return self.request(message)
+        except ServerClosedError:
+            return "Сервер отключился"
+        except Exception as e:
+            return self._send_error(e)
+    
+    def request(self, message: str) -> str:
+        """Как send_message, но ошибки поднимаются исключениями, а не возвращаются текстом"""
+        sock = self._connection()
+        if not sock:
+            raise ConnectionError("Не подключен к серверу")
+        if self._duplex:
+            # Сокет уже читает поток мультиплексного режима
+            return self.submit(message).result()
+        
+        # Отправка сообщения
+        TCPProtocol.send_messages(sock, [self._compress(message.encode('utf-8'))])
+        
+        # Получение ответа
+        success, frame = TCPProtocol.receive_frame(sock)
+        response_data = self._decompress(frame) if success else b""
+        if not success or not response_data:
+            raise ServerClosedError("Сервер отключился")
+        return str(response_data, 'utf-8')
+    
+    def is_alive(self) -> bool:
+        """Проверяет без обмена сообщениями, что соединение не закрыто сервером
         
+        Между запросами данных от сервера быть не должно: если сокет что-то
+        отдает, это конец потока, сброс или ответ, который никто не ждет.
+        Служебные записи TLS (билеты сессии) при этом просто дочитываются.
+        """
+        sock = self._connection()
+        if not sock:
+            return False
+        if self._duplex:
+            return self._reader_thread is not None and self._reader_thread.is_alive()
         try:
-            # Отправка сообщения
-            message_data = TCPProtocol.prepare_message(message.encode('utf-8'))
-            self.socket.sendall(message_data)
-            
-            # Получение ответа
-            success, response_data = TCPProtocol.receive_message(self.socket, self.buffer_size)
-            if success and response_data:
-                return response_data.decode('utf-8')
-            else:
-                return "Сервер отключился"
+            sock.setblocking(False)
+            try:
+                if isinstance(sock, ssl.SSLSocket):
+                    sock.recv(1)
+                else:
+                    sock.recv(1, socket.MSG_PEEK)
+            finally:
+                sock.setblocking(True)
+        except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+            return True
+        except (OSError, ValueError):
+            return False
+        return False  # Конец потока или лишние данные
+    
+    def _send_error(self, error: Exception) -> str:
+        """Текст ошибки отправки для пользователя"""
+        return f"Ошибка отправки: {error}"
+    
+    def stream_message(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Отправляет сообщение по частям и по частям отдает ответ
+        
+        Части запроса уходят кадрами с FLAG_MORE, ответ читается
+        одновременно с отправкой, поэтому размер сообщения не ограничен
+        памятью и заголовком длины. Итератор нужно дочитать до конца,
+        иначе соединение останется посреди потока.
+        """
+        sock = self._connection()
+        if not sock:
+            raise ConnectionError("Не подключен к серверу")
+        if self._duplex:
+            raise RuntimeError("Потоковые сообщения недоступны в мультиплексном режиме")
+        
+        frames = TCPProtocol.stream_frames(TCPProtocol.split_chunks(chunks), self._compress)
+        return self._exchange_stream(sock, frames)
+    
+    def _exchange_stream(self, sock, frames: Iterator[Frame]) -> Iterator[bytes]:
+        """Одновременно пишет кадры запроса и читает кадры ответа
+        
+        Сокет временно переводится в неблокирующий режим: блокирующая
+        отправка большой части могла бы зависнуть, пока сервер ждет,
+        когда мы прочитаем его ответ.
+        """
+        decoder = FrameDecoder(self.buffer_size)
+        read_buffer = bytearray(max(self.buffer_size, 64 * 1024))
+        outgoing = deque()
+        sending = True
+        
+        sock.setblocking(False)
+        try:
+            while True:
+                if sending and not outgoing:
+                    frame = next(frames, None)
+                    if frame is None:
+                        sending = False
+                    else:
+                        buffers = TCPProtocol.frame_buffers(frame.payload, frame.flags)
+                        outgoing.extend(memoryview(buf).cast('B') for buf in buffers if len(buf))
                 
+                # У SSL сокета данные могут уже лежать расшифрованными в буфере
+                pending = isinstance(sock, ssl.SSLSocket) and sock.pending()
+                readable, writable, _ = select.select(
+                    [sock], [sock] if outgoing else [], [], 0 if pending else None
+                )
+                
+                if readable or pending:
+                    try:
+                        nbytes = sock.recv_into(read_buffer)
+                    except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                        nbytes = None
+                    if nbytes == 0:
+                        raise ConnectionError("Сервер отключился посреди потокового сообщения")
+                    if nbytes:
+                        with memoryview(read_buffer) as view:
+                            replies = decoder.feed(view[:nbytes])
+                        for reply in replies:
+                            chunk = self._decompress(reply)
+                            if len(chunk):
+                                yield bytes(chunk)
+                            if not reply.flags & TCPProtocol.FLAG_MORE:
+                                return
+                
+                if writable and outgoing:
+                    try:
+                        sent = sock.send(outgoing[0])
+                    except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                        sent = 0
+                    if sent == outgoing[0].nbytes:
+                        outgoing.popleft()
+                    elif sent:
+                        outgoing[0] = outgoing[0][sent:]
+        finally:
+            sock.setblocking(True)
+    
+    def send_many(self, messages: Iterable[str], window: int = PIPELINE_WINDOW) -> List[str]:
+        """Отправляет сообщения конвейером и возвращает ответы в том же порядке"""
+        return list(self.send_stream(messages, window))
+    
+    def send_stream(self, messages: Iterable[str], window: int = PIPELINE_WINDOW) -> Iterator[str]:
+        """Отправляет сообщения конвейером и по одному отдает ответы по порядку
+        
+        Запросы уходят, не дожидаясь ответов на предыдущие, но без ответа
+        одновременно остается не больше window запросов. Сервер отвечает на
+        обычные кадры по порядку, поэтому протокол не меняется. Сообщения
+        можно генерировать лениво: они читаются по мере освобождения окна.
+        """
+        if window < 1:
+            raise ValueError("Окно конвейера должно быть не меньше 1")
+        sock = self._connection()
+        if not sock:
+            raise ConnectionError("Не подключен к серверу")
+        if self._duplex:
+            return self._pipeline_multiplexed(messages, window)
+        return self._pipeline(sock, messages, window)
+    
+    def _pipeline(self, sock, messages: Iterable[str], window: int) -> Iterator[str]:
+        """Конвейер обычных кадров: пишет отдельный поток, читает вызывающий"""
+        duplex = DuplexSocket(sock)
+        pipeline = _Pipeline(window)
+        sender = threading.Thread(target=self._pipeline_sender, args=(duplex, messages, pipeline))
+        sender.daemon = True
+        sender.start()
+        
+        reader = FrameReader(duplex, self.buffer_size)
+        try:
+            while pipeline.wait_outstanding():
+                frames = reader.read_frames()
+                if frames is None:
+                    raise ConnectionError("Сервер отключился")
+                pipeline.received += len(frames)
+                pipeline.slots.release(len(frames))
+                for frame in frames:
+                    yield str(self._decompress(frame), 'utf-8')
+            if pipeline.error:
+                raise pipeline.error
+        finally:
+            # Если ответы перестали читать раньше, поток отправки останавливается,
+            # а ответы на уже отправленные запросы дочитываются, пока он завершается
+            pipeline.stop()
+            try:
+                while pipeline.wait_outstanding():
+                    frames = reader.read_frames()
+                    if frames is None:
+                        break
+                    pipeline.received += len(frames)
+                sender.join()
+            finally:
+                if duplex.is_ssl:
+                    sock.setblocking(True)
+    
+    def _pipeline_sender(self, duplex: DuplexSocket, messages: Iterable[str], pipeline: '_Pipeline'):
+        """Пишет кадры конвейера, пока в окне есть место
+        
+        Пока окно не заполнено, кадры копятся в пачку и уходят одним
+        векторным вызовом вместе.
+        """
+        batch = []
+        try:
+            for message in messages:
+                if not pipeline.slots.acquire(blocking=False):
+                    pipeline.send(duplex, batch)
+                    batch = []
+                    pipeline.slots.acquire()
+                if pipeline.stopped:
+                    break
+                batch.append(self._compress(message.encode('utf-8')))
+                if len(batch) >= TCPProtocol.IOV_MAX // 2:
+                    pipeline.send(duplex, batch)
+                    batch = []
+            pipeline.send(duplex, batch)
+        except Exception as e:
+            pipeline.error = e
+        finally:
+            pipeline.finish()
+    
+    def _pipeline_multiplexed(self, messages: Iterable[str], window: int) -> Iterator[str]:
+        """Конвейер поверх мультиплексного режима: окно из Future по порядку"""
+        futures = deque()
+        try:
+            for message in messages:
+                if len(futures) >= window:
+                    yield futures.popleft().result()
+                futures.append(self.submit(message))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def submit(self, message: str) -> Future:
+        """Отправляет запрос с идентификатором и сразу возвращает Future ответа
+        
+        Запросы не ждут друг друга: по одному соединению может идти сколько
+        угодно запросов, сервер обрабатывает их параллельно и отвечает по
+        готовности, а ответы сопоставляются с запросами по идентификатору.
+        Метод можно вызывать из нескольких потоков.
+        """
+        sock = self._connection()
+        if not sock:
+            raise ConnectionError("Не подключен к серверу")
+        
+        future = Future()
+        with self._pending_lock:
+            if self._duplex is None:
+                self._start_multiplexing(sock)
+            stream_id = self._next_stream_id
+            self._next_stream_id = stream_id % TCPProtocol.MAX_STREAM_ID + 1
+            self._pending[stream_id] = future
+        
+        frame = self._compress(message.encode('utf-8'))._replace(stream_id=stream_id)
+        try:
+            TCPProtocol.send_messages(self._duplex, [frame])
+        except Exception as e:
+            with self._pending_lock:
+                self._pending.pop(stream_id, None)
+            self._resolve(future, error=e)
+        return future
+    
+    def _start_multiplexing(self, sock):
+        """Переводит соединение в мультиплексный режим и запускает чтение ответов"""
+        self._duplex = DuplexSocket(sock)
+        self._reader_thread = threading.Thread(target=self._read_multiplexed, args=(self._duplex,))
+        self._reader_thread.daemon = True
+        self._reader_thread.start()
+    
+    def _read_multiplexed(self, duplex: DuplexSocket):
+        """Читает ответы и завершает Future по идентификатору запроса"""
+        error = ConnectionError("Сервер отключился")
+        try:
+            reader = FrameReader(duplex, self.buffer_size)
+            while True:
+                frames = reader.read_frames()
+                if frames is None:
+                    break
+                for frame in frames:
+                    with self._pending_lock:
+                        future = self._pending.pop(frame.stream_id, None)
+                    if future is None:
+                        continue
+                    if frame.flags & TCPProtocol.FLAG_CONTROL:
+                        message = TCPProtocol.parse_control(frame).get("error")
+                        self._resolve(future, error=RuntimeError(f"Ошибка сервера: {message}"))
+                    else:
+                        self._resolve(future, result=str(self._decompress(frame), 'utf-8'))
         except Exception as e:
-            return f"Ошибка отправки: {e}"
+            error = e
+        finally:
+            # Запросы, на которые ответа уже не будет, завершаются ошибкой
+            with self._pending_lock:
+                pending = list(self._pending.values())
+                self._pending.clear()
+            for future in pending:
+                self._resolve(future, error=error)
+    
+    @staticmethod
+    def _resolve(future: Future, result=None, error: Optional[Exception] = None):
+        """Завершает Future, если его еще не отменили"""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+    
+    def _compress(self, data) -> Frame:
+        """Готовит кадр запроса, сжимая его, если сжатие согласовано"""
+        if self.compressor:
+            return self.compressor.compress(data)
+        return Frame(data)
+    
+    def _decompress(self, frame: Frame):
+        """Распаковывает данные кадра ответа"""
+        if self.compressor:
+            return self.compressor.decompress(frame)
+        return frame.payload
+    
+    def _stop_multiplexing(self):
+        """Останавливает поток чтения ответов мультиплексного режима"""
+        if self._duplex is None:
+            return
+        try:
+            # shutdown будит поток, заблокированный в recv
+            self._duplex.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if self._reader_thread is not threading.current_thread():
+            self._reader_thread.join(timeout=2.0)
+        self._duplex = None
+        self._reader_thread = None
     
     def disconnect(self):
         """Отключается от сервера"""
+        self._stop_multiplexing()
         if self.socket:
             self.socket.close()
-            self.socket = None
\ No newline at end of file
+            self.socket = None
+class _Pipeline:
+    """Общее состояние потока отправки и читателя ответов конвейера"""
+    
+    def __init__(self, window: int):
+        self.slots = threading.Semaphore(window)  # Свободные места в окне
+        self.sent = 0
+        self.received = 0
+        self.done = False
+        self.stopped = False
+        self.error = None
+        self._changed = threading.Condition()
+    
+    def send(self, duplex: DuplexSocket, frames: List[Frame]):
+        """Отправляет пачку кадров и сообщает читателю, сколько ждать ответов"""
+        if not frames:
+            return
+        # Читатель начинает принимать ответы еще до конца записи: иначе сервер, у
+        # которого переполнен буфер ответов, перестал бы читать недописанную пачку
+        with self._changed:
+            self.sent += len(frames)
+            self._changed.notify()
+        try:
+            TCPProtocol.send_messages(duplex, frames)
+        except Exception:
+            with self._changed:
+                self.sent -= len(frames)
+            raise
+    
+    def finish(self):
+        """Поток отправки завершил работу"""
+        with self._changed:
+            self.done = True
+            self._changed.notify()
+    
+    def stop(self):
+        """Просит поток отправки остановиться и будит его, если он ждет окна"""
+        self.stopped = True
+        self.slots.release()
+    
+    def wait_outstanding(self) -> bool:
+        """Ждет запросов без ответа; False - ответы на все запросы получены"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.sent > self.received or self.done)
+            return self.sent > self.received
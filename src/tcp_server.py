@@ -1,107 +1,496 @@
+import errno
+import queue
+import select
+import selectors
 import socket
+import ssl
 import threading
 import time
-from src.protocols import TCPProtocol
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Union
+from src.accept_stats import AcceptStats
+from src.async_engine import AsyncioEngine
+from src.budget import MemoryBudget, MemoryBudgetExceeded
+from src.buffer_pool import BufferPool
+from src.compression import FrameCompressor
+from src.flusher import WriteFlusher
+from src.handlers import EchoHandler, Handler
+from src.logs import connection_logger, logger
+from src.protocols import DuplexSocket, Frame, FrameDecoder, FrameTooLargeError, TCPProtocol
+from src.registry import ConnectionRegistry
+from src.session import FrameReader, ServerSession
+from src.tuning import SocketTuning
+from src.unix import bind_unix, unlink_unix
 
 class TCPServer:
-    def __init__(self, host: str = 'localhost', port: int = 8888, buffer_size: int = 4096, max_retries: int = 3):
+    name = "TCP"  # Имя протокола в сообщениях сервера и в эхо-ответах
+    
+    MAX_FRAME_SIZE = 64 * 1024 * 1024   # Самый длинный кадр, который примет сервер
+    MEMORY_BUDGET = 256 * 1024 * 1024   # Байт в приеме и обработке на все соединения
+    BUFFER_POOL_SIZE = 64 * 1024 * 1024 # Сколько байт свободных буферов приема хранит пул
+    LINGER_TIMEOUT = 5.0                # Сколько отклоненное соединение дочитывается перед закрытием
+    ENGINES = ("threads", "asyncio")
+    THREAD_CONNECTIONS = 1024           # Сколько соединений движок threads обслуживает сразу по умолчанию
+    IDLE_TIMEOUT = 300.0                # Через сколько секунд без данных соединение закрывается
+    BACKLOG = socket.SOMAXCONN          # Очередь установленных, но еще не принятых соединений
+    WRITE_HIGH_WATER = 1024 * 1024      # Байт неотправленных ответов, после которых чтение соединения встает
+    WRITE_LOW_WATER = 256 * 1024        # До скольких байт буфер должен опустеть, чтобы чтение продолжилось
+    WRITE_STALL_TIMEOUT = 30.0          # Через сколько секунд остановленное так соединение закрывается
+    
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8888,
+        buffer_size: int = 4096,
+        max_retries: int = 3,
+        compression: Optional[FrameCompressor] = None,
+        workers: int = 16,
+        max_inflight: int = 1024,
+        max_frame_size: int = MAX_FRAME_SIZE,
+        memory_budget: Optional[int] = MEMORY_BUDGET,
+        buffer_pool_size: int = BUFFER_POOL_SIZE,
+        engine: str = "threads",
+        max_connections: Optional[int] = None,
+        accept_queue: int = 128,
+        idle_timeout: Optional[float] = IDLE_TIMEOUT,
+        reuse_port: bool = False,
+        backlog: int = BACKLOG,
+        handler: Optional[Handler] = None,
+        tuning: Union[str, SocketTuning, None] = None,
+        write_high_water: int = WRITE_HIGH_WATER,
+        write_low_water: int = WRITE_LOW_WATER,
+        write_stall_timeout: Optional[float] = WRITE_STALL_TIMEOUT,
+        unix_socket: Optional[str] = None
+    ):
         self.host = host
         self.port = port
         self.buffer_size = buffer_size
         self.max_retries = max_retries
+        self.compression = compression
+        # Обработчик сообщений: байты запроса -> байты ответа, по умолчанию эхо
+        self.handler = handler or EchoHandler(self.name)
+        # Профиль (default, latency, throughput) или свои параметры сокетов
+        self.tuning = SocketTuning.resolve(tuning)
+        self.socket_options = {}  # Действующие параметры слушающего сокета
+        self.workers = workers            # Потоки для запросов с идентификатором
+        self.max_inflight = max_inflight  # Сколько таких запросов одного клиента обрабатывается сразу
+        self.max_frame_size = max_frame_size
+        # None - без общего ограничения памяти
+        self.budget = MemoryBudget(memory_budget) if memory_budget else None
+        # Буферы приема общие для всех соединений; 0 - у каждого соединения свои
+        self.buffer_pool = BufferPool(max_bytes=buffer_pool_size) if buffer_pool_size else None
+        if engine not in self.ENGINES:
+            raise ValueError(f"Неизвестный движок сервера: {engine}")
+        self.engine = engine  # threads - поток на клиента, asyncio - один цикл событий
+        self._engine = None
+        # None - THREAD_CONNECTIONS потоков для threads и без ограничения для asyncio; 0 - без ограничения
+        if max_connections is None and engine == "threads":
+            max_connections = self.THREAD_CONNECTIONS
+        self.max_connections = max_connections or None
+        self.accept_queue = accept_queue  # Сколько принятых соединений ждут свободного потока
+        self.connections = ConnectionRegistry(idle_timeout)
+        # Несколько процессов слушают один порт, ядро распределяет между ними подключения
+        self.reuse_port = reuse_port
+        self.backlog = backlog  # Длина очереди accept; ядро ограничивает ее net.core.somaxconn
+        # Путь сокета AF_UNIX вместо host и port: клиенты на той же машине обходят стек TCP
+        self.unix_socket = unix_socket
+        if unix_socket and reuse_port:
+            raise ValueError("reuse_port не поддерживается для сокета AF_UNIX")
+        self._unix_bound = False
+        self.accept_stats = AcceptStats()
+        if not 0 <= write_low_water <= write_high_water:
+            raise ValueError("Нужно 0 <= write_low_water <= write_high_water")
+        # Буфер неотправленных ответов каждого соединения: выше high_water чтение
+        # встает до low_water, а простоявшее дольше write_stall_timeout соединение
+        # закрывается (None - не закрывается)
+        self.write_high_water = write_high_water
+        self.write_low_water = write_low_water
+        self.write_stall_timeout = write_stall_timeout
+        self.flusher = None  # Поток, дописывающий буферы соединений движка threads
         self.running = False
         self.server_socket = None
-        self.client_threads = []
+        self.executor = None
+        self._pending_clients = queue.Queue()
+        # Места для обслуживаемых и ждущих в очереди соединений движка threads
+        self._connection_slots = (
+            threading.BoundedSemaphore(self.max_connections + accept_queue) if self.max_connections else None
+        )
+        self._connection_threads = []
+        self._idle_threads = 0
+        self._waiting_clients = 0  # Принятые соединения, которые еще не взял поток пула
+        self._threads_lock = threading.Lock()
+        self._wakeup = None  # Пишущий конец пары сокетов, будит цикл accept при остановке
         
     def start(self):
         """Запускает TCP сервер"""
+        self._setup()
+        if not self._bind():
+            return
+        
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.name} worker")
+        
+        if self.connections.idle_timeout is not None and self.engine == "threads":
+            reaper = threading.Thread(target=self._evict_idle_loop, name=f"{self.name} reaper")
+            reaper.daemon = True
+            reaper.start()
+        
+        if self.engine == "threads":
+            self.flusher = WriteFlusher(self.write_stall_timeout, self._on_write_stalled, f"{self.name} writer")
+            self.flusher.start()
+        
+        try:
+            if self.engine == "asyncio":
+                self._engine = AsyncioEngine(self)
+                self._engine.run()
+            else:
+                self._accept_loop()
+        except KeyboardInterrupt:
+            logger.info("Остановка сервера...")
+        except Exception as e:
+            logger.error("Ошибка в основном цикле сервера: %s", e)
+        finally:
+            self.stop()
+    
+    def _bind(self) -> bool:
+        """Открывает слушающий сокет, при неудаче пробуя следующие порты"""
         for attempt in range(self.max_retries):
             try:
-                self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self.server_socket.bind((self.host, self.port))
-                self.server_socket.settimeout(1.0)
-                self.server_socket.listen(5)
+                if self.unix_socket:
+                    self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    bind_unix(self.server_socket, self.unix_socket)
+                    self._unix_bound = True  # Файл сокета создан этим сервером, stop его удалит
+                else:
+                    self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    if self.reuse_port:
+                        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                    self.server_socket.bind((self.host, self.port))
+                # Буферы и Fast Open нужно задать до listen, принятые сокеты их наследуют
+                self.socket_options = self.tuning.apply(self.server_socket, listening=True)
+                self.server_socket.setblocking(False)
+                self.server_socket.listen(self.backlog)
                 
+                self.accept_stats.started()
                 self.running = True
-                print(f"TCP сервер запущен на {self.host}:{self.port}")
-                break
+                logger.info("%s сервер запущен на %s", self.name, self.endpoint)
+                logger.info("Параметры сокета: %s", SocketTuning.describe(self.socket_options))
+                self._on_started()
+                return True
                 
             except OSError as e:
                 if attempt < self.max_retries - 1:
-                    print(f"Попытка {attempt + 1} не удалась: {e}. Пробуем снова...")
+                    logger.warning("Попытка %d не удалась: %s. Пробуем снова...", attempt + 1, e)
                     time.sleep(1)
-                    self.port += 1  # Пробуем следующий порт
+                    if not self.reuse_port and not self.unix_socket:
+                        self.port += 1  # Пробуем следующий порт; с reuse_port порт общий для всех процессов
                 else:
-                    print(f"Ошибка запуска сервера после {self.max_retries} попыток: {e}")
-                    return
-        
-        if not self.running:
-            return
-            
+                    logger.error("Ошибка запуска сервера после %d попыток: %s", self.max_retries, e)
+        return False
+    
+    @property
+    def endpoint(self) -> str:
+        """Адрес сервера для сообщений: host:port или путь сокета AF_UNIX"""
+        return self.unix_socket or f"{self.host}:{self.port}"
+    
+    def _accept_loop(self):
+        """Принимает подключения в очередь, которую разбирает ограниченный пул потоков
+
+        Цикл спит в селекторе, пока нет подключений, и за одно пробуждение
+        принимает все ждущие. stop() будит его через пару сокетов.
+        """
+        wakeup, self._wakeup = socket.socketpair()
+        selector = selectors.DefaultSelector()
         try:
+            selector.register(self.server_socket, selectors.EVENT_READ)
+            selector.register(wakeup, selectors.EVENT_READ)
             while self.running:
+                events = selector.select()
+                if any(key.fileobj is wakeup for key, _ in events):
+                    break
+                if not self._accept_pending():
+                    break
+        except (OSError, ValueError) as e:
+            if self.running:
+                logger.error("Ошибка accept: %s", e)
+        finally:
+            selector.close()
+            wakeup.close()
+            self._wakeup.close()
+    
+    def _accept_pending(self) -> bool:
+        """Принимает все ждущие подключения; False - слушающий сокет закрыт"""
+        accepted = 0
+        try:
+            while True:
                 try:
                     client_socket, addr = self.server_socket.accept()
-                    print(f"Подключен клиент: {addr}")
-                    
-                    client_thread = threading.Thread(
-                        target=self._handle_client,
-                        args=(client_socket, addr)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                    self.client_threads.append(client_thread)
-                    
-                except socket.timeout:
-                    continue
+                except BlockingIOError:
+                    return True
                 except OSError as e:
-                    if self.running:
-                        print(f"Ошибка accept: {e}")
-                    break
-                except Exception as e:
-                    print(f"Неожиданная ошибка: {e}")
-                    break
-                    
-        except KeyboardInterrupt:
-            print("\nОстановка сервера...")
-        except Exception as e:
-            print(f"Ошибка в основном цикле сервера: {e}")
+                    if not self.running:
+                        return False
+                    if e.errno in (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM):
+                        # Подключения остаются в очереди ядра до освобождения ресурсов
+                        logger.error("Ошибка accept: %s", e)
+                        time.sleep(0.1)
+                        return True
+                    if e.errno in (errno.ECONNABORTED, errno.EPROTO):
+                        continue  # Клиент закрыл соединение, пока оно ждало в очереди
+                    raise
+                accepted += 1
+                # У клиента AF_UNIX адреса обычно нет, в логах его заменяет путь сервера
+                self._accept_client(client_socket, addr or self.unix_socket)
         finally:
-            self.stop()
+            self.accept_stats.batch(accepted)
+    
+    def _accept_client(self, client_socket: socket.socket, addr: tuple):
+        client_socket.setblocking(True)
+        self.tuning.apply_accepted(client_socket)
+        self.accept_stats.accept()
+        connection_logger.info("Подключен клиент: %s", addr)
+        
+        if self._connection_slots and not self._connection_slots.acquire(blocking=False):
+            # Все потоки заняты и очередь полна - новое соединение не ждет
+            self.accept_stats.rejected += 1
+            connection_logger.warning("Соединение с %s отклонено: достигнут предел %s соединений", addr, self.max_connections)
+            client_socket.close()
+            return
+        self._add_connection_threads(client_socket, addr)
+    
+    def _add_connection_threads(self, client_socket: socket.socket, addr: tuple):
+        """Ставит соединение в очередь и запускает потоки, если ждущих больше, чем свободных потоков
+        
+        Оба счетчика меняются под одной блокировкой: поток, который уже взял
+        соединение из очереди, но еще не отметил себя занятым, иначе
+        считался бы свободным для следующего соединения.
+        """
+        with self._threads_lock:
+            self._waiting_clients += 1
+            self._pending_clients.put((client_socket, addr))
+            while (self._idle_threads < self._waiting_clients
+                   and (self.max_connections is None or len(self._connection_threads) < self.max_connections)):
+                thread = threading.Thread(
+                    target=self._connection_worker,
+                    name=f"{self.name} connection {len(self._connection_threads) + 1}"
+                )
+                thread.daemon = True
+                self._idle_threads += 1
+                self._connection_threads.append(thread)
+                thread.start()
+    
+    def _connection_worker(self):
+        """Поток пула: обслуживает соединения из очереди одно за другим"""
+        while self.running:
+            try:
+                client_socket, addr = self._pending_clients.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            with self._threads_lock:
+                self._idle_threads -= 1
+                self._waiting_clients -= 1
+            try:
+                # TLS handshake тоже идет в потоке пула, а не в цикле accept
+                client_socket = self._wrap_client(client_socket, addr)
+                if client_socket is not None:
+                    self._handle_client(client_socket, addr)
+            finally:
+                if self._connection_slots:
+                    self._connection_slots.release()
+                with self._threads_lock:
+                    self._idle_threads += 1
+    
+    def _evict_idle_loop(self):
+        """Периодически закрывает соединения, простаивающие дольше idle_timeout"""
+        interval = min(1.0, self.connections.idle_timeout / 4)
+        while self.running:
+            time.sleep(interval)
+            self.connections.evict_idle()
+    
+    def _on_write_stalled(self, connection: DuplexSocket):
+        self.connections.evict_stalled(connection, self.write_stall_timeout)
+    
+    def _setup(self):
+        """Подготовка перед запуском (переопределяется в TLSTCPServer)"""
+    
+    def _on_started(self):
+        """Вызывается после успешного запуска сервера"""
+    
+    def _server_ssl_context(self) -> Optional[ssl.SSLContext]:
+        """SSL контекст для движка asyncio; None - соединения без шифрования"""
+        return None
+    
+    def _wrap_client(self, client_socket: socket.socket, addr: tuple) -> Optional[socket.socket]:
+        """Подготавливает сокет клиента; None - соединение отклонено"""
+        return client_socket
     
     def _handle_client(self, client_socket: socket.socket, addr: tuple):
         """Обрабатывает подключение TCP клиента"""
+        # Ответы на запросы с идентификатором пишут потоки пула, пока этот поток читает
+        connection = DuplexSocket(client_socket, self.flusher, self.write_high_water, self.write_low_water)
+        reader = FrameReader(connection, self.buffer_size, self.max_frame_size, self.budget, self.buffer_pool)
+        self.connections.add(connection, addr)
         try:
-            while self.running:
-                success, data = TCPProtocol.receive_message(client_socket, self.buffer_size)
-                if not success or not data:
+            session = ServerSession(self.name, addr, self.compression, self.max_frame_size, self.handler)
+            inflight = threading.BoundedSemaphore(self.max_inflight)
+            while self.running and not session.closed:
+                # Один recv может содержать сразу несколько кадров
+                frames = reader.read_frames()
+                if frames is None:
                     break
+                self._process_frames(connection, reader, session, frames, inflight)
                 
-                message = data.decode('utf-8')
-                print(f"TCP от {addr}: {message[:100]}..." if len(message) > 100 else f"TCP от {addr}: {message}")
-                
-                response = f"TCP эхо: {message}"
-                response_data = TCPProtocol.prepare_message(response.encode('utf-8'))
-                client_socket.sendall(response_data)
-                
+        except (FrameTooLargeError, MemoryBudgetExceeded) as e:
+            connection_logger.warning("Соединение с клиентом %s отклонено: %s", addr, e)
+            self._linger(connection)
+        except ssl.SSLError as e:
+            connection_logger.warning("SSL ошибка с клиентом %s: %s", addr, e)
         except ConnectionResetError:
-            print(f"Клиент {addr} отключился")
+            connection_logger.info("Клиент %s отключился", addr)
         except Exception as e:
             if self.running:
-                print(f"Ошибка с клиентом {addr}: {e}")
+                connection_logger.error("Ошибка с клиентом %s: %s", addr, e)
         finally:
+            self.connections.remove(connection)
+            reader.close()
             try:
-                client_socket.close()
-                print(f"Соединение с {addr} закрыто")
+                connection.close()
+                connection_logger.info("Соединение %s с %s закрыто", self.name, addr)
             except:
                 pass
     
+    def _linger(self, connection: DuplexSocket):
+        """Закрывает соединение на запись и отбрасывает входящие данные
+        
+        Данные читаются в маленький буфер и не накапливаются, пока клиент
+        не закроет соединение или не выйдет LINGER_TIMEOUT: close с
+        непрочитанными данными сбросил бы соединение, и клиент получил бы
+        ошибку вместо конца потока.
+        """
+        try:
+            # У SSL сокета shutdown заканчивает сеанс TLS, дальше читаются сырые байты
+            connection.shutdown(socket.SHUT_WR)
+        except OSError:
+            return
+        sink = bytearray(self.buffer_size)
+        deadline = time.monotonic() + self.LINGER_TIMEOUT
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([connection.sock], [], [], remaining)
+            if not readable:
+                continue
+            try:
+                if not connection.sock.recv_into(sink):
+                    break
+            except (BlockingIOError, ssl.SSLWantReadError):
+                continue
+            except OSError:
+                break
+    
+    def _process_frames(
+        self,
+        connection: DuplexSocket,
+        reader: FrameReader,
+        session: ServerSession,
+        frames: List[Frame],
+        inflight: threading.BoundedSemaphore
+    ):
+        """Обрабатывает пачку кадров: обычные по порядку, с идентификатором - параллельно"""
+        responses = []
+        for index, frame in enumerate(frames):
+            if frame.stream_id:
+                # Запрос с идентификатором уходит в пул, ответ отправится по готовности;
+                # буфер кадра вернется в пул буферов при следующем чтении, поэтому данные копируются
+                frame = FrameDecoder.retain(frame)
+                inflight.acquire()
+                size = len(frame.payload)
+                if self.budget:
+                    # Запрос в очереди пула занимает память, пока на него не ответят
+                    try:
+                        self.budget.acquire(size)
+                    except MemoryBudgetExceeded:
+                        inflight.release()
+                        raise
+                future = self.executor.submit(session.handle_multiplexed, frame)
+                future.add_done_callback(
+                    lambda done, size=size: self._send_multiplexed(connection, done, inflight, size)
+                )
+                continue
+            
+            if frame.flags & TCPProtocol.FLAG_MORE:
+                TCPProtocol.send_messages(connection, responses)
+                responses = []
+                reader.unread(frames[index + 1:])
+                # Потоковое сообщение: ответ уходит по частям, пока запрос еще принимается
+                for reply in session.stream_replies(reader.stream_frames(frame)):
+                    TCPProtocol.send_messages(connection, [reply])
+                break
+            
+            responses.extend(session.handle_frames([frame]))
+            if session.closed:
+                break
+        
+        # Ответы на все обычные кадры из одного recv отправляются одним вызовом
+        TCPProtocol.send_messages(connection, responses)
+    
+    def _send_multiplexed(
+        self,
+        connection: DuplexSocket,
+        future: Future,
+        inflight: threading.BoundedSemaphore,
+        size: int
+    ):
+        """Отправляет ответ на запрос с идентификатором из потока пула"""
+        try:
+            TCPProtocol.send_messages(connection, [future.result()])
+        except Exception as e:
+            if self.running:
+                connection_logger.error("Ошибка отправки ответа: %s", e)
+        finally:
+            inflight.release()
+            if self.budget:
+                self.budget.release(size)
+    
+    def stats(self) -> dict:
+        """Счетчики сервера: соединения, пул буферов и занятый бюджет памяти"""
+        stats = {"accept": self.accept_stats.stats(), "connections": self.connections.stats()}
+        if self.buffer_pool:
+            stats["buffer_pool"] = self.buffer_pool.stats()
+        if self.budget:
+            stats["memory_in_use"] = self.budget.in_use
+        return stats
+    
     def stop(self):
         """Останавливает сервер"""
         self.running = False
-        if self.server_socket:
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        if self.flusher:
+            self.flusher.stop()
+        if self._engine:
+            # Слушающий сокет закроет цикл событий движка
+            self._engine.stop()
+        elif self.server_socket:
+            if self._wakeup:
+                try:
+                    self._wakeup.send(b"\0")
+                except OSError:
+                    pass  # Цикл accept уже завершился
             try:
                 self.server_socket.close()
             except:
-                pass
\ No newline at end of file
+                pass
+            # Соединения, которые ждали потока, и открытые соединения закрываются
+            while True:
+                try:
+                    client_socket, _ = self._pending_clients.get_nowait()
+                except queue.Empty:
+                    break
+                client_socket.close()
+                if self._connection_slots:
+                    self._connection_slots.release()
+            self.connections.evict_all()
+        if self._unix_bound:
+            unlink_unix(self.unix_socket)
+            self._unix_bound = False
\ No newline at end of file
@@ -1,10 +1,32 @@
-import socket
 import ssl
 import os
-from typing import Optional
-from src.protocols import TCPProtocol
+from typing import Optional, Union
+from src.compression import FrameCompressor
+from src.tcp_client import TCPClient
+from src.tuning import SocketTuning
 
-class TLSTCPClient:
+def client_ssl_context(
+    ca_certs: Optional[str] = None,
+    certfile: Optional[str] = None,
+    keyfile: Optional[str] = None
+) -> ssl.SSLContext:
+    """SSL контекст клиента: проверка сервера по ca_certs и свой сертификат"""
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    
+    if ca_certs:
+        context.load_verify_locations(cafile=ca_certs)
+        context.verify_mode = ssl.CERT_REQUIRED
+    else:
+        # Для самоподписанных сертификатов отключаем проверку
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        
+    if certfile and keyfile:
+        context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+        
+    return context
+
+class TLSTCPClient(TCPClient):
     def __init__(
         self, 
         host: str = 'localhost', 
@@ -12,38 +34,25 @@ class TLSTCPClient:
         buffer_size: int = 4096,
         ca_certs: Optional[str] = None,
         certfile: Optional[str] = None,
-        keyfile: Optional[str] = None
+        keyfile: Optional[str] = None,
+        compression: Optional[FrameCompressor] = None,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None
     ):
-        self.host = host
-        self.port = port
-        self.buffer_size = buffer_size
+        super().__init__(host, port, buffer_size, compression, tuning, unix_socket)
         self.ca_certs = ca_certs
         self.certfile = certfile
         self.keyfile = keyfile
-        self.socket = None
         self.ssl_socket = None
         
     def _setup_ssl_context(self) -> ssl.SSLContext:
         """Настраивает SSL контекст для клиента"""
-        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-        
-        if self.ca_certs:
-            context.load_verify_locations(cafile=self.ca_certs)
-            context.verify_mode = ssl.CERT_REQUIRED
-        else:
-            # Для самоподписанных сертификатов отключаем проверку
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            
-        if self.certfile and self.keyfile:
-            context.load_cert_chain(certfile=self.certfile, keyfile=self.keyfile)
-            
-        return context
+        return client_ssl_context(self.ca_certs, self.certfile, self.keyfile)
     
     def connect(self) -> bool:
         """Подключается к TLS TCP серверу"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket = self._create_socket()
             
             ssl_context = self._setup_ssl_context()
             self.ssl_socket = ssl_context.wrap_socket(
@@ -51,11 +60,11 @@ class TLSTCPClient:
                 server_hostname=self.host
             )
             
-            self.ssl_socket.connect((self.host, self.port))
-            print(f"Подключен к TLS TCP серверу {self.host}:{self.port}")
+            self.ssl_socket.connect(self.address)
+            print(f"Подключен к TLS TCP серверу {self.endpoint}")
             print(f"SSL версия: {self.ssl_socket.version()}")
             print(f"SSL Key Log File: {os.environ.get('SSLKEYLOGFILE', 'Не установлен')}")
-            return True
+            return self._negotiate()
             
         except ssl.SSLError as e:
             print(f"SSL ошибка подключения: {e}")
@@ -64,30 +73,19 @@ class TLSTCPClient:
             print(f"Ошибка подключения: {e}")
             return False
     
-    def send_message(self, message: str) -> str:
-        """Отправляет сообщение и возвращает ответ"""
-        if not self.ssl_socket:
-            return "Не подключен к серверу"
-        
-        try:
-            # Отправка сообщения
-            message_data = TCPProtocol.prepare_message(message.encode('utf-8'))
-            self.ssl_socket.sendall(message_data)
-            
-            # Получение ответа
-            success, response_data = TCPProtocol.receive_message(self.ssl_socket, self.buffer_size)
-            if success and response_data:
-                return response_data.decode('utf-8')
-            else:
-                return "Сервер отключился"
-                
-        except ssl.SSLError as e:
-            return f"SSL ошибка отправки: {e}"
-        except Exception as e:
-            return f"Ошибка отправки: {e}"
+    def _connection(self):
+        """Обмен сообщениями идет через SSL сокет"""
+        return self.ssl_socket
+    
+    def _send_error(self, error: Exception) -> str:
+        """Текст ошибки отправки с отдельным сообщением для ошибок SSL"""
+        if isinstance(error, ssl.SSLError):
+            return f"SSL ошибка отправки: {error}"
+        return super()._send_error(error)
     
     def disconnect(self):
         """Отключается от сервера"""
+        self._stop_multiplexing()
         if self.ssl_socket:
             self.ssl_socket.close()
             self.ssl_socket = None
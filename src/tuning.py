@@ -0,0 +1,107 @@
+import socket
+import sys
+from typing import NamedTuple, Optional, Union
+from src.logs import logger
+
+# Клиентский TCP Fast Open в Linux (4.11+); в модуле socket константы нет
+TCP_FASTOPEN_CONNECT = getattr(socket, 'TCP_FASTOPEN_CONNECT', 30 if sys.platform.startswith('linux') else None)
+
+class SocketTuning(NamedTuple):
+    """Параметры сокетов сервера или клиента; None - значение системы не меняется
+
+    Для UDP и AF_UNIX применяются только размеры буферов. Сокеты, принятые сервером,
+    получают те же параметры, что и слушающий сокет.
+    """
+    nodelay: Optional[bool] = None    # TCP_NODELAY: маленькие сообщения уходят без задержки Нейгла
+    quickack: Optional[bool] = None   # TCP_QUICKACK: подтверждать сразу (ядро может сбросить режим)
+    rcvbuf: Optional[int] = None      # SO_RCVBUF в байтах (ядро удваивает и ограничивает значение)
+    sndbuf: Optional[int] = None      # SO_SNDBUF в байтах
+    fastopen: Optional[int] = None    # TCP Fast Open: длина очереди у сервера, любое ненулевое - у клиента
+    keepalive: Optional[bool] = None  # SO_KEEPALIVE
+    keepidle: Optional[int] = None    # Секунд простоя до первой проверки keepalive
+    keepintvl: Optional[int] = None   # Секунд между проверками
+    keepcnt: Optional[int] = None     # Проверок без ответа до разрыва
+
+    @classmethod
+    def resolve(cls, tuning: Union[str, 'SocketTuning', None]) -> 'SocketTuning':
+        """Профиль по имени, готовые параметры или профиль default для None"""
+        if tuning is None:
+            return PROFILES["default"]
+        if isinstance(tuning, str):
+            if tuning not in PROFILES:
+                raise ValueError(f"Неизвестный профиль сокетов: {tuning}")
+            return PROFILES[tuning]
+        return tuning
+
+    def override(self, **values) -> 'SocketTuning':
+        """Копия с заменой параметров, переданных не как None"""
+        return self._replace(**{name: value for name, value in values.items() if value is not None})
+
+    def apply(self, sock, listening: bool = False) -> dict:
+        """Устанавливает параметры и возвращает действующие значения из getsockopt
+
+        Параметр, который система не поддерживает, пропускается с
+        предупреждением. listening - сокет сервера до listen().
+        """
+        options = [
+            (socket.SOL_SOCKET, 'SO_RCVBUF', self.rcvbuf),
+            (socket.SOL_SOCKET, 'SO_SNDBUF', self.sndbuf),
+        ]
+        if sock.type == socket.SOCK_STREAM and sock.family in (socket.AF_INET, socket.AF_INET6):
+            fastopen = self.fastopen
+            if fastopen is not None and not listening:
+                fastopen = int(bool(fastopen))
+            options += [
+                (socket.IPPROTO_TCP, 'TCP_NODELAY', self.nodelay),
+                (socket.IPPROTO_TCP, 'TCP_QUICKACK', self.quickack),
+                (socket.SOL_SOCKET, 'SO_KEEPALIVE', self.keepalive),
+                (socket.IPPROTO_TCP, 'TCP_KEEPIDLE', self.keepidle),
+                (socket.IPPROTO_TCP, 'TCP_KEEPINTVL', self.keepintvl),
+                (socket.IPPROTO_TCP, 'TCP_KEEPCNT', self.keepcnt),
+                (socket.IPPROTO_TCP, 'TCP_FASTOPEN' if listening else 'TCP_FASTOPEN_CONNECT', fastopen),
+            ]
+
+        effective = {}
+        for level, name, value in options:
+            option = TCP_FASTOPEN_CONNECT if name == 'TCP_FASTOPEN_CONNECT' else getattr(socket, name, None)
+            if value is None:
+                continue
+            if option is None:
+                logger.warning("Параметр сокета %s не поддерживается в этой системе", name)
+                continue
+            try:
+                sock.setsockopt(level, option, int(value))
+                effective[name] = sock.getsockopt(level, option)
+            except OSError as e:
+                logger.warning("Не удалось установить %s=%s: %s", name, int(value), e)
+        return effective
+
+    def apply_accepted(self, sock):
+        """Параметры, которые принятый сервером сокет не наследует от слушающего
+
+        asyncio к тому же сам включает TCP_NODELAY на каждом соединении.
+        """
+        if sock.family not in (socket.AF_INET, socket.AF_INET6):
+            return
+        for name, value in (('TCP_NODELAY', self.nodelay), ('TCP_QUICKACK', self.quickack)):
+            if value is not None and hasattr(socket, name):
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, name), int(value))
+                except OSError:
+                    pass  # Предупреждение уже было при настройке слушающего сокета
+
+    @staticmethod
+    def describe(effective: dict) -> str:
+        """Действующие значения для сообщения при запуске"""
+        if not effective:
+            return "значения системы"
+        return ", ".join(f"{name}={value}" for name, value in effective.items())
+
+PROFILES = {
+    # Значения системы, как без профиля
+    "default": SocketTuning(),
+    # Короткие запросы и ответы: без задержки Нейгла и отложенных подтверждений
+    "latency": SocketTuning(nodelay=True, quickack=True, fastopen=256, keepalive=True, keepidle=60),
+    # Большие объемы: буферы под окно в несколько мегабайт, мелкие записи склеиваются
+    "throughput": SocketTuning(rcvbuf=4 * 1024 * 1024, sndbuf=4 * 1024 * 1024, keepalive=True, keepidle=60),
+}
@@ -1,20 +1,83 @@
+import itertools
+import random
 import socket
-from src.protocols import UDPProtocol  # Абсолютный импорт
+import time
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Union
+from src.protocols import UDPProtocol, UDPReassembler  # Абсолютный импорт
+from src.reliable import ReliableChannel
+from src.tuning import SocketTuning
+from src.unix import bind_reply_address, unlink_unix
+
+class RequestResult(NamedTuple):
+    """Итог одного запроса UDPClient.send_window"""
+    message: str
+    reply: Optional[str]      # None - ответ не пришел за timeout, запрос потерян
+    latency: Optional[float]  # Секунды от отправки запроса до ответа
 
 class UDPClient:
-    def __init__(self, host: str = 'localhost', port: int = 8889, buffer_size: int = 4096, timeout: float = 5.0):
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8889,
+        buffer_size: int = 4096,
+        timeout: float = 5.0,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None,
+        reliable: bool = False,
+        window: int = ReliableChannel.WINDOW,
+        datagram_size: int = UDPProtocol.DATAGRAM_SIZE,
+        request_ids: bool = True
+    ):
+        if datagram_size > buffer_size:
+            raise ValueError("datagram_size не может быть больше buffer_size")
         self.host = host
         self.port = port
+        # Путь датаграммного сокета AF_UNIX сервера; host и port тогда не используются
+        self.unix_socket = unix_socket
+        self._reply_path = ''  # Файл своего адреса клиента AF_UNIX, если он создан
         self.buffer_size = buffer_size
         self.timeout = timeout
+        # Для UDP из профиля применяются только размеры буферов
+        self.tuning = SocketTuning.resolve(tuning)
+        self.socket_options = {}
         self.socket = None
+        # Надежный режим: повторы потерянных датаграмм и окно запросов без ответа;
+        # timeout тогда отсчитывается от последнего полученного ответа
+        self.reliable = reliable
+        self.window = window
+        self.channel = None
+        # Сообщения длиннее datagram_size уходят фрагментами, ответ сервер присылает так же
+        self.datagram_size = datagram_size
+        self.reassembly = UDPReassembler()
+        self._message_ids = itertools.count(random.getrandbits(32))
+        # Запросы несут идентификатор, и ответ сопоставляется с запросом по нему,
+        # а не по порядку; False - для серверов, которые не знают UDPProtocol.tag_request
+        self.request_ids = request_ids
+        self._request_ids = itertools.count(random.getrandbits(32))
+        # Счетчики для stats()
+        self.requests = 0
+        self.replies = 0
+        self.lost = 0   # Запросы без ответа за timeout
+        self.stale = 0  # Ответы на уже просроченные запросы
+        self._latency_total = 0.0
+        self.latency_max = 0.0
         
     def connect(self):
         """Создает UDP сокет"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            family = socket.AF_UNIX if self.unix_socket else socket.AF_INET
+            self.socket = socket.socket(family, socket.SOCK_DGRAM)
             self.socket.settimeout(self.timeout)
-            print(f"UDP клиент готов к отправке на {self.host}:{self.port}")
+            self.socket_options = self.tuning.apply(self.socket)
+            if self.socket_options:
+                print(f"Параметры сокета: {SocketTuning.describe(self.socket_options)}")
+            if self.unix_socket:
+                # Без своего адреса сервер не сможет ответить
+                self._reply_path = bind_reply_address(self.socket)
+            if self.reliable:
+                self._new_channel()
+            print(f"UDP клиент готов к отправке на {self.unix_socket or f'{self.host}:{self.port}'}")
             return True
         except Exception as e:
             print(f"Ошибка создания сокета: {e}")
@@ -26,20 +89,225 @@ class UDPClient:
             return "Сокет не создан"
         
         try:
-            # Отправка сообщения
-            self.socket.sendto(UDPProtocol.create_message(message), (self.host, self.port))
-            
-            # Получение ответа
-            data, addr = self.socket.recvfrom(self.buffer_size)
-            return UDPProtocol.parse_message(data)
-            
+            return self.request(message)
         except socket.timeout:
             return "Таймаут ожидания ответа"
         except Exception as e:
             return f"Ошибка отправки: {e}"
     
+    def request(self, message: str) -> str:
+        """Как send_message, но ошибки и таймаут поднимаются исключениями"""
+        if not self.socket:
+            raise ConnectionError("Сокет не создан")
+        if self.channel:
+            return self._exchange_reliable([message])[0]
+        
+        if self.request_ids:
+            # Опоздавший ответ на прошлый запрос не будет принят за ответ на этот
+            result = self._exchange_window([message], 1, self.timeout)[0]
+            if result.reply is None:
+                raise socket.timeout("Таймаут ожидания ответа")
+            return result.reply
+        
+        # Отправка сообщения
+        self._send_message(UDPProtocol.create_message(message))
+        
+        # Получение ответа
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            return UDPProtocol.parse_message(self._next_message(deadline))
+        finally:
+            if self.socket:
+                self.socket.settimeout(self.timeout)
+    
+    def _send_message(self, data: bytes):
+        """Отправляет сообщение одной датаграммой или фрагментами"""
+        address = self.unix_socket or (self.host, self.port)
+        for datagram in UDPProtocol.fragment(data, next(self._message_ids), self.datagram_size):
+            self.socket.sendto(datagram, address)
+    
+    def _next_message(self, deadline: Optional[float]) -> bytes:
+        """Следующее сообщение сервера: датаграмма или собранное из фрагментов
+        
+        После deadline поднимается socket.timeout; он ограничивает сборку
+        всего сообщения, а не каждый фрагмент. Таймаут сокета меняется,
+        вызывающий восстанавливает его.
+        """
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("Таймаут ожидания ответа")
+                self.socket.settimeout(remaining)
+            data, addr = self.socket.recvfrom(self.buffer_size)
+            if not data or data[0] != UDPProtocol.MARKER_FRAGMENT:
+                return data
+            message = self.reassembly.add(data, addr, time.monotonic())
+            if message is not None:
+                return message
+    
+    def send_many(self, messages: Iterable[str]) -> List[str]:
+        """Отправляет сообщения и возвращает ответы в том же порядке
+        
+        Без ответа одновременно остается до window сообщений (в надежном
+        режиме еще и не больше окна перегрузки); без идентификаторов
+        запросов сообщения уходят по одному. Ошибки и таймаут поднимаются
+        исключениями.
+        """
+        if not self.socket:
+            raise ConnectionError("Сокет не создан")
+        if self.channel:
+            return self._exchange_reliable(list(messages))
+        if not self.request_ids:
+            return [self.request(message) for message in messages]
+        results = self._exchange_window(list(messages), self.window, self.timeout)
+        lost = sum(1 for result in results if result.reply is None)
+        if lost:
+            raise socket.timeout(f"Нет ответа на {lost} из {len(results)} сообщений")
+        return [result.reply for result in results]
+    
+    def send_window(
+        self,
+        messages: Iterable[str],
+        window: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[RequestResult]:
+        """Отправляет сообщения, держа без ответа до window запросов (по умолчанию self.window)
+        
+        Ответы сопоставляются с запросами по идентификатору, поэтому они
+        могут приходить в любом порядке. Запрос без ответа за timeout секунд
+        (по умолчанию таймаут клиента) считается потерянным и не повторяется,
+        а его место в окне занимает следующий. Результаты идут в порядке
+        сообщений, с задержкой каждого ответа.
+        """
+        if not self.socket:
+            raise ConnectionError("Сокет не создан")
+        if not self.request_ids:
+            raise ValueError("send_window работает только с идентификаторами запросов")
+        window = window or self.window
+        timeout = self.timeout if timeout is None else timeout
+        return self._exchange_window(list(messages), window, timeout)
+    
+    def _exchange_window(self, messages: List[str], window: int, timeout: Optional[float]) -> List[RequestResult]:
+        results: List[Optional[RequestResult]] = [None] * len(messages)
+        pending = OrderedDict()  # Идентификатор -> (номер сообщения, время отправки), в порядке отправки
+        next_index = 0
+        try:
+            while next_index < len(messages) or pending:
+                while next_index < len(messages) and len(pending) < window:
+                    request_id = next(self._request_ids) & 0xFFFFFFFF
+                    self._send_message(UDPProtocol.tag_request(request_id, UDPProtocol.create_message(messages[next_index])))
+                    pending[request_id] = (next_index, time.monotonic())
+                    next_index += 1
+                    self.requests += 1
+                # Ближе всего к истечению самый старый запрос
+                oldest, (index, sent_at) = next(iter(pending.items()))
+                try:
+                    reply = self._next_message(None if timeout is None else sent_at + timeout)
+                except socket.timeout:
+                    del pending[oldest]
+                    results[index] = RequestResult(messages[index], None, None)
+                    self.lost += 1
+                    continue
+                try:
+                    request_id, payload = UDPProtocol.split_request(reply)
+                except ValueError:
+                    self.stale += 1  # Ответ без идентификатора нельзя сопоставить с запросом
+                    continue
+                entry = pending.pop(request_id, None)
+                if entry is None:
+                    self.stale += 1
+                    continue
+                index, sent_at = entry
+                latency = time.monotonic() - sent_at
+                results[index] = RequestResult(messages[index], UDPProtocol.parse_message(payload), latency)
+                self.replies += 1
+                self._latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+        finally:
+            if self.socket:
+                self.socket.settimeout(self.timeout)
+        return results
+    
+    def stats(self) -> dict:
+        """Счетчики запросов с идентификатором: потери, опоздавшие ответы и задержка"""
+        return {
+            "requests": self.requests,
+            "replies": self.replies,
+            "lost": self.lost,
+            "stale": self.stale,
+            "latency_mean": self._latency_total / self.replies if self.replies else None,
+            "latency_max": self.latency_max,
+        }
+    
+    def _new_channel(self):
+        """Новая сессия: старые ответы и повторы прежней сессии сервер и клиент не спутают"""
+        self.channel = ReliableChannel(random.getrandbits(32), self.window, self.buffer_size)
+    
+    def _exchange_reliable(self, messages: List[str]) -> List[str]:
+        """Отправляет сообщения через канал и ждет ответы на все
+        
+        Сервер доставляет запросы сессии по порядку и отвечает в том же
+        порядке, поэтому ответы соответствуют сообщениям по номеру.
+        """
+        channel = self.channel
+        chunk = self.datagram_size - ReliableChannel.HEADER.size
+        for message in messages:
+            # Длинное сообщение идет по каналу фрагментами, каждый повторяется отдельно
+            for fragment in UDPProtocol.fragment(UDPProtocol.create_message(message), next(self._message_ids), chunk):
+                channel.send(fragment)
+        replies = []
+        deadline = time.monotonic() + self.timeout
+        try:
+            while len(replies) < len(messages):
+                now = time.monotonic()
+                self._flush_reliable(now)
+                if channel.failed:
+                    raise ConnectionError("Сервер не подтверждает датаграммы")
+                if now >= deadline:
+                    raise socket.timeout("Таймаут ожидания ответа")
+                wait = channel.next_timeout(now)
+                wait = deadline - now if wait is None else min(wait, deadline - now)
+                self.socket.settimeout(max(wait, 0.001))
+                try:
+                    data, addr = self.socket.recvfrom(self.buffer_size)
+                except socket.timeout:
+                    continue
+                try:
+                    delivered = channel.receive(data, time.monotonic())
+                except ValueError:
+                    continue  # Датаграмма не надежного режима
+                if delivered:
+                    deadline = time.monotonic() + self.timeout
+                for reply in delivered:
+                    if reply[:1] == bytes([UDPProtocol.MARKER_FRAGMENT]):
+                        reply = self.reassembly.add(reply, channel.session_id, time.monotonic())
+                        if reply is None:
+                            continue
+                    replies.append(UDPProtocol.parse_message(reply))
+            self._flush_reliable(time.monotonic())  # Подтверждение последних ответов
+        except BaseException:
+            # Недоставленные запросы прежней сессии не должны получить чужие ответы
+            self._new_channel()
+            raise
+        finally:
+            if self.socket:
+                self.socket.settimeout(self.timeout)
+        return replies
+    
+    def _flush_reliable(self, now: float):
+        for datagram in self.channel.datagrams(now):
+            self.socket.sendto(datagram, self.unix_socket or (self.host, self.port))
+    
+    def is_alive(self) -> bool:
+        """У UDP нет соединения: клиент пригоден, пока сокет открыт"""
+        return self.socket is not None
+    
     def disconnect(self):
         """Закрывает сокет"""
         if self.socket:
             self.socket.close()
-            self.socket = None
\ No newline at end of file
+            self.socket = None
+        if self._reply_path:
+            unlink_unix(self._reply_path)
+            self._reply_path = ''
\ No newline at end of file
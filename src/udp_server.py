@@ -1,57 +1,267 @@
+import itertools
+import os
+import random
 import socket
+import sys
 import time
-from src.protocols import UDPProtocol
+from typing import Optional, Union
+from src.handlers import EchoHandler, Handler
+from src.logs import logger
+from src.protocols import Payload, UDPProtocol, UDPReassembler
+from src.reliable import ReliableChannel, ReliableSessions
+from src.tuning import SocketTuning
+from src.unix import bind_unix, unlink_unix
+
+def socket_drops(sock: Optional[socket.socket]) -> Optional[int]:
+    """Сколько датаграмм ядро отбросило из-за переполненного буфера приема сокета
+
+    Счетчик берется из столбца drops в /proc/net/udp по inode сокета. None -
+    счетчик недоступен (не Linux, AF_UNIX или сокет закрыт).
+    """
+    if sock is None or sock.family not in (socket.AF_INET, socket.AF_INET6):
+        return None
+    table = '/proc/net/udp6' if sock.family == socket.AF_INET6 else '/proc/net/udp'
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        with open(table) as f:
+            next(f)  # Заголовок
+            for line in f:
+                fields = line.split()
+                if fields[9] == inode:
+                    return int(fields[-1])
+    except (OSError, ValueError, IndexError, StopIteration):
+        pass
+    return None
+
+# С этим флагом Linux возвращает настоящую длину датаграммы, даже если она не поместилась в буфер
+RECV_TRUNC = socket.MSG_TRUNC if sys.platform.startswith('linux') else 0
 
 class UDPServer:
-    def __init__(self, host: str = 'localhost', port: int = 8889, buffer_size: int = 4096):
+    POLL_INTERVAL = 1.0  # Как часто проверять running, пока датаграмм нет
+    
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8889,
+        buffer_size: int = 4096,
+        reuse_port: bool = False,
+        handler: Optional[Handler] = None,
+        tuning: Union[str, SocketTuning, None] = None,
+        unix_socket: Optional[str] = None,
+        datagram_size: int = UDPProtocol.DATAGRAM_SIZE,
+        reassembly: Optional[UDPReassembler] = None
+    ):
+        if datagram_size > buffer_size:
+            raise ValueError("datagram_size не может быть больше buffer_size")
         self.host = host
         self.port = port
+        # Путь датаграммного сокета AF_UNIX вместо host и port
+        self.unix_socket = unix_socket
+        if unix_socket and reuse_port:
+            raise ValueError("reuse_port не поддерживается для сокета AF_UNIX")
+        self._unix_bound = False
         self.buffer_size = buffer_size
+        # Обработчик датаграмм: байты запроса -> байты ответа, по умолчанию эхо
+        self.handler = handler or EchoHandler("UDP")
+        # Для UDP из профиля применяются только размеры буферов
+        self.tuning = SocketTuning.resolve(tuning)
+        self.socket_options = {}
+        # Несколько процессов слушают один порт, ядро распределяет между ними датаграммы
+        self.reuse_port = reuse_port
         self.running = False
         self.socket = None
+        self.received = 0  # Принято датаграмм
+        self.sent = 0      # Отправлено ответов
+        self.drops = None  # Отброшено ядром при переполненном буфере приема, если известно
+        self.truncated = 0  # Датаграммы длиннее buffer_size (отброшены)
+        # Сообщения длиннее datagram_size приходят и уходят фрагментами UDPProtocol.fragment
+        self.datagram_size = datagram_size
+        self.reassembly = reassembly or UDPReassembler()
+        self._message_ids = itertools.count(random.getrandbits(32))
+        # Клиенты надежного режима: их датаграммы начинаются с UDPProtocol.MARKER_RELIABLE
+        self.sessions = ReliableSessions(max_datagram=buffer_size)
         
     def start(self):
         """Запускает UDP сервер"""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.socket.settimeout(1.0)  # Таймаут для recvfrom
-            self.socket.bind((self.host, self.port))
+            family = socket.AF_UNIX if self.unix_socket else socket.AF_INET
+            self.socket = socket.socket(family, socket.SOCK_DGRAM)
+            self.socket.settimeout(self.POLL_INTERVAL)  # Таймаут для recvfrom
+            if self.reuse_port:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.socket_options = self.tuning.apply(self.socket)
+            if self.unix_socket:
+                bind_unix(self.socket, self.unix_socket)
+                self._unix_bound = True
+            else:
+                self.socket.bind((self.host, self.port))
             
             self.running = True
-            print(f"UDP сервер запущен на {self.host}:{self.port}")
+            logger.info("UDP сервер запущен на %s", self.unix_socket or f"{self.host}:{self.port}")
+            logger.info("Параметры сокета: %s", SocketTuning.describe(self.socket_options))
+            self._check_rcvbuf()
             
+            # Датаграммы читаются в один буфер; ответ отправляется до следующего приема
+            buffer = bytearray(self.buffer_size)
+            view = memoryview(buffer)
             while self.running:
                 try:
-                    data, addr = self.socket.recvfrom(self.buffer_size)
-                    message = UDPProtocol.parse_message(data)
-                    print(f"UDP от {addr}: {message}")
-                    
-                    # Эхо-ответ
-                    response = f"UDP эхо: {message}"
-                    self.socket.sendto(UDPProtocol.create_message(response), addr)
+                    self._reliable_timers()
+                    nbytes, addr = self.socket.recvfrom_into(buffer, 0, RECV_TRUNC)
+                    self.received += 1
+                    if not addr:
+                        continue  # Клиент AF_UNIX без своего адреса не получит ответ
+                    if nbytes > len(buffer):
+                        # Обрезанная датаграмма - это уже другое сообщение, отвечать на него нельзя
+                        self.truncated += 1
+                        logger.warning("Датаграмма от %s длиной %d байт больше buffer_size=%d и отброшена", addr, nbytes, len(buffer))
+                        continue
+                    if nbytes and buffer[0] == UDPProtocol.MARKER_RELIABLE:
+                        self._receive_reliable(view[:nbytes], addr)
+                        continue
+                    if nbytes and buffer[0] == UDPProtocol.MARKER_FRAGMENT:
+                        self._receive_fragment(view[:nbytes], addr)
+                        continue
+                    self._respond(view[:nbytes], addr)
                     
                 except socket.timeout:
                     continue  # Таймаут - проверяем running
                 except OSError as e:
                     if self.running:
-                        print(f"Ошибка UDP: {e}")
+                        logger.error("Ошибка UDP: %s", e)
                     break
                 except Exception as e:
-                    print(f"Неожиданная ошибка UDP: {e}")
-                    break
+                    # Ошибка обработчика теряет одну датаграмму, а не останавливает сервер
+                    logger.error("Неожиданная ошибка UDP: %s", e)
                     
         except KeyboardInterrupt:
-            print("\nОстановка сервера...")
+            logger.info("Остановка сервера...")
         except Exception as e:
-            print(f"Ошибка запуска UDP сервера: {e}")
+            logger.error("Ошибка запуска UDP сервера: %s", e)
         finally:
             self.stop()
     
+    def _respond(self, data: memoryview, addr: tuple, fragmented: bool = False):
+        """Вызывает обработчик и отправляет ответ; идентификатор запроса возвращается в ответе"""
+        if data and data[0] == UDPProtocol.MARKER_REQUEST:
+            request_id, data = UDPProtocol.split_request(data)
+            header = UDPProtocol.REQUEST_HEADER.pack(UDPProtocol.MARKER_REQUEST, request_id)
+            response = self.handler(data, addr)
+            # Заголовок идет отдельным буфером, ответ обработчика не копируется
+            response = [header, *response] if isinstance(response, (list, tuple)) else [header, response]
+        else:
+            response = self.handler(data, addr)
+        self._send(response, addr, fragmented)
+        self.sent += 1
+    
+    def _send(self, response: Payload, addr: tuple, fragmented: bool = False):
+        """Отправляет ответ одной датаграммой; список буферов уходит через sendmsg без склейки
+        
+        Ответ длиннее datagram_size уходит фрагментами, если запрос пришел
+        фрагментами (клиент умеет их собирать) или в одну датаграмму ответ
+        не поместится вовсе. Иначе клиенты без фрагментации, например
+        netcat, получают ответ как раньше.
+        """
+        size = len(response) if not isinstance(response, (list, tuple)) else sum(len(part) for part in response)
+        if size > UDPProtocol.MAX_DATAGRAM or (fragmented and size > self.datagram_size):
+            if isinstance(response, (list, tuple)):
+                response = b"".join(response)
+            for datagram in UDPProtocol.fragment(response, next(self._message_ids), self.datagram_size):
+                self.socket.sendto(datagram, addr)
+        elif not isinstance(response, (list, tuple)):
+            self.socket.sendto(response, addr)
+        elif hasattr(self.socket, 'sendmsg'):
+            self.socket.sendmsg(response, (), 0, addr)
+        else:
+            self.socket.sendto(b"".join(response), addr)
+    
+    def _receive_reliable(self, packet: memoryview, addr):
+        """Датаграмма надежного режима: ответы на доставленные запросы уходят через сессию
+        
+        Длинные сообщения и ответы идут по сессии фрагментами, поэтому
+        потерянный фрагмент повторяется, а не теряет все сообщение.
+        """
+        now = time.monotonic()
+        channel, messages = self.sessions.receive(packet, addr, now)
+        if channel is None:
+            return
+        for message in messages:
+            if message[:1] == bytes([UDPProtocol.MARKER_FRAGMENT]):
+                message = self.reassembly.add(message, (addr, channel.session_id), now)
+                if message is None:
+                    continue
+            response = self.handler(memoryview(message), addr)
+            if isinstance(response, (list, tuple)):
+                response = b"".join(response)
+            chunk = self.datagram_size - ReliableChannel.HEADER.size
+            for fragment in UDPProtocol.fragment(response, next(self._message_ids), chunk):
+                channel.send(fragment)
+            self.sent += 1
+        for datagram in self.sessions.flush(channel, now):
+            self.socket.sendto(datagram, addr)
+    
+    def _receive_fragment(self, packet: memoryview, addr):
+        """Фрагмент сообщения: обработчик вызывается, когда собраны все фрагменты"""
+        message = self.reassembly.add(packet, addr, time.monotonic())
+        if message is None:
+            return
+        self._respond(memoryview(message), addr, fragmented=True)
+    
+    def _reliable_timers(self):
+        """Повторы по таймерам сессий; recvfrom ждет не дольше ближайшего таймера"""
+        now = time.monotonic()
+        if self.sessions.due(now):
+            for datagram, addr in self.sessions.sweep(now):
+                self.socket.sendto(datagram, addr)
+        timeout = self.sessions.timeout(now, self.POLL_INTERVAL)
+        if timeout != self.socket.gettimeout():
+            self.socket.settimeout(timeout)
+    
+    def _check_rcvbuf(self):
+        """Предупреждает, если ядро урезало SO_RCVBUF до net.core.rmem_max"""
+        requested = self.tuning.rcvbuf
+        effective = self.socket_options.get('SO_RCVBUF')
+        if not requested or effective is None:
+            return
+        # Linux удваивает значение под служебные данные ядра
+        expected = 2 * requested if sys.platform.startswith('linux') else requested
+        if effective < expected:
+            logger.warning(
+                "SO_RCVBUF=%d ограничен ядром до %d, увеличьте net.core.rmem_max", requested, effective
+            )
+    
+    def stats(self) -> dict:
+        """Счетчики датаграмм сервера
+        
+        drops - потери в буфере приема по данным ядра, truncated - датаграммы
+        длиннее buffer_size, fragments - сборка фрагментированных сообщений,
+        reliable - сессии надежного режима; последние два - если такие
+        клиенты были.
+        """
+        drops = socket_drops(self.socket)
+        if drops is not None:
+            self.drops = drops
+        stats = {"received": self.received, "sent": self.sent}
+        if self.drops is not None:
+            stats["drops"] = self.drops
+        if self.truncated:
+            stats["truncated"] = self.truncated
+        fragments = self.reassembly.stats()
+        if any(fragments.values()):
+            stats["fragments"] = fragments
+        if self.sessions.created:
+            stats["reliable"] = self.sessions.stats()
+        return stats
+    
     def stop(self):
         """Останавливает сервер"""
         self.running = False
         if self.socket:
+            self.stats()  # Счетчик потерь ядра пропадет вместе с сокетом
             try:
                 self.socket.close()
             except:
-                pass
\ No newline at end of file
+                pass
+        if self._unix_bound:
+            unlink_unix(self.unix_socket)
+            self._unix_bound = False
\ No newline at end of file
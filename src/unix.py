@@ -0,0 +1,52 @@
+import errno
+import os
+import socket
+import stat
+import sys
+import tempfile
+
+def bind_unix(sock: socket.socket, path: str):
+    """Привязывает сокет к пути, убирая файл, оставшийся от остановленного сервера
+
+    Файл, на котором еще кто-то слушает, не трогается - bind завершится
+    ошибкой EADDRINUSE, как для занятого порта.
+    """
+    try:
+        is_socket = stat.S_ISSOCK(os.stat(path).st_mode)
+    except FileNotFoundError:
+        is_socket = False
+    if is_socket:
+        probe = socket.socket(socket.AF_UNIX, sock.type)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)  # Сервер, создавший файл, уже не работает
+        except OSError:
+            pass
+        else:
+            raise OSError(errno.EADDRINUSE, f"Путь {path} уже занят другим сервером")
+        finally:
+            probe.close()
+    sock.bind(path)
+
+def unlink_unix(path: str):
+    """Удаляет файл сокета после остановки"""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def bind_reply_address(sock: socket.socket) -> str:
+    """Привязывает датаграммный сокет клиента к своему адресу, чтобы получать ответы
+
+    В Linux ядро само выдает адрес в абстрактном пространстве имен, в других
+    системах создается файл во временном каталоге. Возвращает путь файла,
+    который нужно удалить при закрытии, или пустую строку.
+    """
+    if sys.platform.startswith('linux'):
+        sock.bind('')
+        return ''
+    path = os.path.join(tempfile.gettempdir(), f"udp-client-{os.getpid()}-{id(sock)}.sock")
+    unlink_unix(path)
+    sock.bind(path)
+    return path
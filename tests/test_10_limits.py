@@ -0,0 +1,133 @@
+import unittest
+import time
+import threading
+import socket
+import zlib
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.budget import MemoryBudget, MemoryBudgetExceeded
+from src.compression import FrameCompressor
+from src.protocols import Frame, FrameDecoder, FrameTooLargeError, TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestLimits(unittest.TestCase):
+    """Test 10: Ограничение размера кадров и бюджет памяти"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10300 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_decoder_rejects_large_header(self):
+        """Строка netcat читается как огромная длина и отклоняется по заголовку"""
+        decoder = FrameDecoder(max_frame_size=1024 * 1024)
+        with self.assertRaises(FrameTooLargeError):
+            decoder.feed(b"Simple message\n")
+
+    def test_decoder_budget_reservation(self):
+        """Место под большой кадр занято, пока кадр не обработан"""
+        budget = MemoryBudget(100000)
+        decoder = FrameDecoder(buffer_size=1024, budget=budget)
+
+        message = os.urandom(50000)
+        stream = TCPProtocol.prepare_message(message)
+        self.assertEqual(decoder.feed(stream[:1000]), [])
+        self.assertEqual(budget.in_use, len(message))
+
+        frames = decoder.feed(stream[1000:])
+        self.assertEqual(bytes(frames[0].payload), message)
+        self.assertEqual(budget.in_use, len(message))
+
+        decoder.feed(b"")
+        self.assertEqual(budget.in_use, 0)
+
+        with self.assertRaises(MemoryBudgetExceeded):
+            decoder.feed(TCPProtocol.prepare_message(os.urandom(200000))[:1000])
+
+    def test_budget_timeout(self):
+        """Резервирование ждет освобождения и отказывает по таймауту"""
+        budget = MemoryBudget(1000, timeout=0.2)
+        budget.acquire(800)
+        with self.assertRaises(MemoryBudgetExceeded):
+            budget.acquire(400)
+
+        threading.Timer(0.1, budget.release, args=(800,)).start()
+        budget.acquire(400, timeout=2.0)
+        self.assertEqual(budget.in_use, 400)
+
+    def test_decompression_bounded(self):
+        """Маленький сжатый кадр не распаковывается больше предела"""
+        bomb = Frame(zlib.compress(bytes(10 * 1024 * 1024)), TCPProtocol.FLAG_ZLIB)
+        with self.assertRaises(FrameTooLargeError):
+            FrameCompressor().decompress(bomb, max_size=1024 * 1024)
+        self.assertEqual(len(FrameCompressor().decompress(bomb)), 10 * 1024 * 1024)
+
+    def test_server_closes_oversized_frame(self):
+        """Сервер закрывает соединение с кадром длиннее предела и продолжает работать"""
+        self.start_server(max_frame_size=1024 * 1024)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(3.0)
+        sock.connect((self.host, self.port))
+        try:
+            sock.sendall(b"Simple message\n")
+            self.assertEqual(sock.recv(1024), b"")
+        finally:
+            sock.close()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        self.assertEqual(client.send_message("still alive"), "TCP эхо: still alive")
+        client.disconnect()
+        self.assertEqual(self.server.budget.in_use, 0)
+
+    def test_budget_backpressure(self):
+        """Клиенты делят бюджет: лишние ждут, а не получают отказ"""
+        self.start_server(memory_budget=300 * 1024)
+
+        errors = []
+
+        def worker(n):
+            client = TCPClient(self.host, self.port)
+            try:
+                self.assertTrue(client.connect())
+                for i in range(5):
+                    message = f"{n}-{i}-" + "B" * 200 * 1024
+                    self.assertEqual(client.send_message(message), f"TCP эхо: {message}")
+            except Exception as e:
+                errors.append(e)
+            finally:
+                client.disconnect()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        time.sleep(0.5)
+        self.assertEqual(self.server.budget.in_use, 0)
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.buffer_pool import BufferPool
+from src.protocols import FrameDecoder, TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestBufferPool(unittest.TestCase):
+    """Test 11: Общий пул буферов приема"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10400 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_size_classes_and_stats(self):
+        """Буферы округляются до класса и выдаются повторно"""
+        pool = BufferPool(min_size=4096, max_size=65536, max_bytes=100000)
+        buffer = pool.acquire(5000)
+        self.assertEqual(len(buffer), 8192)
+        pool.release(buffer)
+        self.assertIs(pool.acquire(7000), buffer)
+
+        big = pool.acquire(100000)
+        self.assertEqual(len(big), 100000)
+        pool.release(big)
+
+        buffers = [pool.acquire(65536) for _ in range(3)]
+        for buf in buffers:
+            pool.release(buf)
+
+        stats = pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["fallbacks"], stats["dropped"]), (1, 4, 1, 2))
+        self.assertEqual(stats["borrowed"], 1)
+        self.assertEqual(stats["pooled_buffers"], 1)
+        self.assertEqual(stats["pooled_bytes"], 65536)
+
+    def test_decoder_reuses_frame_buffers(self):
+        """Большие кадры принимаются в один и тот же буфер пула"""
+        pool = BufferPool()
+        decoder = FrameDecoder(buffer_size=4096, pool=pool)
+
+        messages = [os.urandom(30000 + i) for i in range(10)]
+        kept = None
+        for message in messages:
+            stream = TCPProtocol.prepare_message(message)
+            frames = decoder.feed(stream[:100]) + decoder.feed(stream[100:])
+            self.assertEqual(bytes(frames[0].payload), message)
+            if kept is None:
+                kept = FrameDecoder.retain(frames[0])
+
+        # Копия кадра не меняется, когда его буфер выдан следующему кадру
+        self.assertEqual(bytes(kept.payload), messages[0])
+        decoder.close()
+        stats = pool.stats()
+        self.assertEqual(stats["hits"], 9)
+        self.assertEqual(stats["borrowed"], 0)
+
+    def test_server_pool_stats(self):
+        """Соединения сервера делят буферы, после отключения все возвращены"""
+        self.start_server()
+
+        for n in range(5):
+            client = TCPClient(self.host, self.port)
+            self.assertTrue(client.connect())
+            for i in range(10):
+                message = f"{n}-{i}-" + "L" * 50000
+                self.assertEqual(client.send_message(message), f"TCP эхо: {message}")
+            client.disconnect()
+
+        time.sleep(0.5)
+        stats = self.server.buffer_pool.stats()
+        self.assertEqual(stats["borrowed"], 0)
+        self.assertGreater(stats["hit_rate"], 0.9)
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
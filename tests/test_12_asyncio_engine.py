@@ -0,0 +1,120 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.compression import FrameCompressor
+from src.protocols import TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestAsyncioEngine(unittest.TestCase):
+    """Test 12: Сервер на asyncio"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10500 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер с движком asyncio в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, engine="asyncio", **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_echo_and_large_message(self):
+        """Эхо обычных и больших сообщений"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        self.assertEqual(client.send_message("Hello"), "TCP эхо: Hello")
+        large_message = "Y" * 512000
+        self.assertEqual(client.send_message(large_message), f"TCP эхо: {large_message}")
+        client.disconnect()
+
+    def test_coalesced_frames(self):
+        """Ответы на все кадры, отправленные одним пакетом"""
+        self.start_server()
+
+        sock = socket.create_connection((self.host, self.port), timeout=3.0)
+        try:
+            messages = [f"Burst {i}" for i in range(200)]
+            sock.sendall(b"".join(TCPProtocol.prepare_message(msg.encode('utf-8')) for msg in messages))
+            for msg in messages:
+                success, data = TCPProtocol.receive_message(sock)
+                self.assertTrue(success)
+                self.assertEqual(data.decode('utf-8'), f"TCP эхо: {msg}")
+        finally:
+            sock.close()
+
+    def test_compression_stream_and_multiplexing(self):
+        """Сжатие, потоковые сообщения и мультиплексирование по одному соединению"""
+        self.start_server(compression=FrameCompressor(threshold=256))
+
+        client = TCPClient(self.host, self.port, compression=FrameCompressor(threshold=256))
+        self.assertTrue(client.connect())
+        self.assertEqual(client.compressor.codec, 'zlib')
+
+        chunks = [f"chunk {i}\n".encode('utf-8') * 20000 for i in range(10)]
+        self.assertEqual(b"".join(client.stream_message(chunks)), "TCP эхо: ".encode('utf-8') + b"".join(chunks))
+        self.assertEqual(client.send_many([f"p{i}" for i in range(500)]), [f"TCP эхо: p{i}" for i in range(500)])
+
+        futures = [client.submit(f"m{i}") for i in range(500)]
+        self.assertEqual([future.result(timeout=10.0) for future in futures], [f"TCP эхо: m{i}" for i in range(500)])
+        client.disconnect()
+
+    def test_many_connections(self):
+        """Тысячи одновременных соединений обслуживаются одним потоком"""
+        self.start_server()
+        threads_before = threading.active_count()
+
+        sockets = []
+        try:
+            for _ in range(2000):
+                sockets.append(socket.create_connection((self.host, self.port), timeout=5.0))
+            for i, sock in enumerate(sockets):
+                sock.sendall(TCPProtocol.prepare_message(f"conn {i}".encode('utf-8')))
+            for i, sock in enumerate(sockets):
+                success, data = TCPProtocol.receive_message(sock)
+                self.assertTrue(success)
+                self.assertEqual(data.decode('utf-8'), f"TCP эхо: conn {i}")
+            self.assertLess(threading.active_count() - threads_before, 10)
+        finally:
+            for sock in sockets:
+                sock.close()
+
+    def test_oversized_frame_rejected(self):
+        """Кадр длиннее предела отклоняется, сервер продолжает работать"""
+        self.start_server(max_frame_size=1024 * 1024)
+
+        sock = socket.create_connection((self.host, self.port), timeout=3.0)
+        try:
+            sock.sendall(b"Simple message\n")
+            time.sleep(0.3)
+            sock.sendall(b"Another test\n")
+            self.assertEqual(sock.recv(1024), b"")
+        finally:
+            sock.close()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        self.assertEqual(client.send_message("still alive"), "TCP эхо: still alive")
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
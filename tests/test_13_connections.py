@@ -0,0 +1,154 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.protocols import TCPProtocol
+from src.registry import ConnectionRegistry
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestConnections(unittest.TestCase):
+    """Test 13: Пул потоков соединений и реестр соединений"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10600 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def exchange(self, sock, message: str) -> str:
+        """Отправляет сообщение через сырой сокет и возвращает ответ"""
+        sock.sendall(TCPProtocol.prepare_message(message.encode('utf-8')))
+        success, data = TCPProtocol.receive_message(sock)
+        self.assertTrue(success)
+        return data.decode('utf-8')
+
+    def test_registry_eviction(self):
+        """Реестр вытесняет только простаивающие соединения"""
+        class Connection:
+            def __init__(self, last_activity):
+                self.last_activity = last_activity
+                self.evicted = False
+
+            def evict(self):
+                self.evicted = True
+
+        registry = ConnectionRegistry(idle_timeout=10.0)
+        idle = Connection(time.monotonic() - 60)
+        active = Connection(time.monotonic())
+        registry.add(idle, ('idle', 1))
+        registry.add(active, ('active', 2))
+
+        self.assertEqual(registry.evict_idle(), 1)
+        self.assertTrue(idle.evicted)
+        self.assertFalse(active.evicted)
+        self.assertEqual(registry.stats(), {"active": 1, "total": 2, "evicted": 1, "stalled": 0})
+
+        registry.remove(active)
+        self.assertEqual(len(registry), 0)
+
+    def test_connection_limit_and_accept_queue(self):
+        """Лишние соединения ждут в очереди, а сверх очереди отклоняются"""
+        self.start_server(max_connections=2, accept_queue=1)
+
+        first = socket.create_connection((self.host, self.port), timeout=3.0)
+        second = socket.create_connection((self.host, self.port), timeout=3.0)
+        queued = socket.create_connection((self.host, self.port), timeout=3.0)
+        try:
+            self.assertEqual(self.exchange(first, "one"), "TCP эхо: one")
+            self.assertEqual(self.exchange(second, "two"), "TCP эхо: two")
+
+            queued.sendall(TCPProtocol.prepare_message(b"queued"))
+            time.sleep(0.3)
+            rejected = socket.create_connection((self.host, self.port), timeout=3.0)
+            self.assertEqual(rejected.recv(1024), b"")
+            rejected.close()
+
+            # Как только первое соединение закрыто, поток достается ждущему
+            first.close()
+            success, data = TCPProtocol.receive_message(queued)
+            self.assertTrue(success)
+            self.assertEqual(data.decode('utf-8'), "TCP эхо: queued")
+            self.assertLessEqual(len(self.server._connection_threads), 2)
+        finally:
+            for sock in (first, second, queued):
+                sock.close()
+
+    def test_unlimited_connections(self):
+        """max_connections=0 - без ограничения в обоих движках"""
+        for engine in TCPServer.ENGINES:
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(max_connections=0, accept_queue=1, engine=engine)
+                self.assertIsNone(self.server.max_connections)
+                clients = [TCPClient(self.host, self.port) for _ in range(5)]
+                try:
+                    for i, client in enumerate(clients):
+                        self.assertTrue(client.connect())
+                        self.assertEqual(client.send_message(f"open {i}"), f"TCP эхо: open {i}")
+                    self.assertTrue(self.server.running)
+                    self.assertEqual(self.server.accept_stats.rejected, 0)
+                finally:
+                    for client in clients:
+                        client.disconnect()
+                self.tearDown()
+
+    def test_threads_reused(self):
+        """Потоки пула используются повторно, реестр не растет"""
+        self.start_server()
+
+        for i in range(30):
+            client = TCPClient(self.host, self.port)
+            self.assertTrue(client.connect())
+            self.assertEqual(client.send_message(f"reuse {i}"), f"TCP эхо: reuse {i}")
+            client.disconnect()
+            time.sleep(0.05)
+
+        time.sleep(0.3)
+        self.assertLessEqual(len(self.server._connection_threads), 3)
+        self.assertEqual(self.server.connections.stats()["active"], 0)
+        self.assertEqual(self.server.connections.stats()["total"], 30)
+
+    def test_idle_eviction(self):
+        """Соединение без данных дольше idle_timeout закрывается сервером"""
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(engine=engine, idle_timeout=0.5)
+
+                idle = socket.create_connection((self.host, self.port), timeout=5.0)
+                busy = socket.create_connection((self.host, self.port), timeout=5.0)
+                try:
+                    for i in range(6):
+                        self.assertEqual(self.exchange(busy, f"ping {i}"), f"TCP эхо: ping {i}")
+                        time.sleep(0.2)
+                    self.assertEqual(idle.recv(1024), b"")
+                    self.assertEqual(self.exchange(busy, "still here"), "TCP эхо: still here")
+                    self.assertEqual(self.server.connections.stats()["evicted"], 1)
+                finally:
+                    idle.close()
+                    busy.close()
+                self.tearDown()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
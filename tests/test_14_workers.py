@@ -0,0 +1,107 @@
+import unittest
+import time
+import threading
+import os
+import signal
+import sys
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.supervisor import Supervisor, merge_stats
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+class TestWorkers(unittest.TestCase):
+    """Test 14: Несколько процессов сервера на одном порту"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10700 + random.randint(1, 100)
+        self.supervisor = None
+        self.supervisor_thread = None
+
+    def start_supervisor(self, factory, workers: int = 2, **kwargs):
+        """Запускает супервизор в отдельном потоке"""
+        self.supervisor = Supervisor(factory, workers, stats_interval=0.2, restart_delay=0.2, **kwargs)
+        self.supervisor_thread = threading.Thread(target=self.supervisor.run)
+        self.supervisor_thread.daemon = True
+        self.supervisor_thread.start()
+        time.sleep(1.5)
+
+    def wait_for(self, condition, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.1)
+        return False
+
+    def test_merge_stats(self):
+        """Счетчики копий складываются, доли усредняются"""
+        merged = merge_stats([
+            {"connections": {"active": 1, "total": 5}, "buffer_pool": {"hit_rate": 0.5}},
+            {"connections": {"active": 2, "total": 7}, "buffer_pool": {"hit_rate": 1.0}},
+        ])
+        self.assertEqual(merged, {"connections": {"active": 3, "total": 12}, "buffer_pool": {"hit_rate": 0.75}})
+
+    def test_tcp_workers_share_port(self):
+        """Копии TCP сервера слушают один порт и вместе считают соединения"""
+        self.start_supervisor(
+            lambda: TCPServer(self.host, self.port, reuse_port=True, max_retries=1), workers=3, cpu_affinity=True
+        )
+        self.assertEqual(self.supervisor.stats()["workers"], 3)
+
+        for i in range(30):
+            client = TCPClient(self.host, self.port)
+            self.assertTrue(client.connect())
+            self.assertEqual(client.send_message(f"worker {i}"), f"TCP эхо: worker {i}")
+            client.disconnect()
+
+        self.assertTrue(self.wait_for(lambda: self.supervisor.stats().get("connections", {}).get("total") == 30))
+        # Ядро распределило соединения больше чем по одной копии
+        with self.supervisor._lock:
+            self.assertGreater(sum(1 for stats in self.supervisor._stats.values()
+                                   if stats["connections"]["total"]), 1)
+
+    def test_crashed_worker_restarted(self):
+        """Убитая копия перезапускается, сервер продолжает отвечать"""
+        self.start_supervisor(lambda: TCPServer(self.host, self.port, reuse_port=True, max_retries=1))
+        victim = self.supervisor.pids()[0]
+        os.kill(victim, signal.SIGKILL)
+
+        self.assertTrue(self.wait_for(lambda: self.supervisor.restarts == 1))
+        self.assertNotIn(victim, self.supervisor.pids())
+        self.assertTrue(self.wait_for(lambda: self.supervisor.stats()["workers"] == 2))
+        time.sleep(0.5)
+
+        for i in range(10):
+            client = TCPClient(self.host, self.port)
+            self.assertTrue(client.connect())
+            self.assertEqual(client.send_message(f"after {i}"), f"TCP эхо: after {i}")
+            client.disconnect()
+
+    def test_udp_workers(self):
+        """Копии UDP сервера отвечают на датаграммы одного порта"""
+        self.start_supervisor(lambda: UDPServer(self.host, self.port, reuse_port=True))
+
+        for i in range(20):
+            client = UDPClient(self.host, self.port, timeout=2.0)
+            self.assertTrue(client.connect())
+            self.assertEqual(client.send_message(f"datagram {i}"), f"UDP эхо: datagram {i}")
+            client.disconnect()
+
+        self.assertTrue(self.wait_for(lambda: self.supervisor.stats().get("sent") == 20))
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.supervisor:
+            self.supervisor.stop()
+        if self.supervisor_thread and self.supervisor_thread.is_alive():
+            self.supervisor_thread.join(timeout=10.0)
+        if self.supervisor:
+            self.assertEqual(self.supervisor.stats()["workers"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
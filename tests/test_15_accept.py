@@ -0,0 +1,129 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.accept_stats import AcceptStats
+from src.protocols import TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestAccept(unittest.TestCase):
+    """Test 15: Прием соединений без опроса по таймауту"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10800 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_accept_rate(self):
+        """Скорость приема - соединения за последнюю полную секунду"""
+        stats = AcceptStats()
+        for _ in range(5):
+            stats.accept()
+        stats.batch(5)
+        stats.batch(2)
+        self.assertEqual(stats.accepted, 5)
+        self.assertEqual(stats.peak_batch, 5)
+        # Секунда, в которую приняты соединения, еще не закончилась или только что закончилась
+        self.assertIn(stats.rate(), (0, 5))
+        time.sleep(2.1)
+        self.assertEqual(stats.rate(), 0)
+
+    def test_stop_is_immediate(self):
+        """Остановка не ждет таймаута accept"""
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(engine=engine)
+                started = time.monotonic()
+                self.server.stop()
+                self.server_thread.join(timeout=2.0)
+                self.assertFalse(self.server_thread.is_alive())
+                self.assertLess(time.monotonic() - started, 0.5)
+                with self.assertRaises(OSError):
+                    socket.create_connection((self.host, self.port), timeout=1.0).close()
+
+    def test_connection_storm(self):
+        """Сотни одновременных подключений принимаются без повторов SYN"""
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(engine=engine, max_connections=1000)
+                count = 300
+                sockets = []
+                latencies = []
+                lock = threading.Lock()
+
+                def connect():
+                    started = time.monotonic()
+                    sock = socket.create_connection((self.host, self.port), timeout=5.0)
+                    with lock:
+                        latencies.append(time.monotonic() - started)
+                        sockets.append(sock)
+
+                threads = [threading.Thread(target=connect) for _ in range(count)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                try:
+                    self.assertEqual(len(sockets), count)
+                    # Повтор SYN после переполнения очереди стоил бы не меньше секунды
+                    self.assertLess(max(latencies), 1.0)
+                    sockets[0].sendall(TCPProtocol.prepare_message(b"storm"))
+                    success, data = TCPProtocol.receive_message(sockets[0])
+                    self.assertTrue(success)
+                    self.assertEqual(data.decode('utf-8'), "TCP эхо: storm")
+
+                    # Ядро устанавливает соединения раньше, чем сервер их принимает
+                    deadline = time.monotonic() + 5.0
+                    while self.server.stats()["accept"]["accepted"] < count and time.monotonic() < deadline:
+                        time.sleep(0.05)
+                    stats = self.server.stats()["accept"]
+                    self.assertEqual(stats["accepted"], count)
+                    self.assertEqual(stats["rejected"], 0)
+                    if engine == "threads":
+                        self.assertGreater(stats["peak_batch"], 0)
+                finally:
+                    for sock in sockets:
+                        sock.close()
+                self.tearDown()
+
+    def test_rejected_counter(self):
+        """Соединения сверх предела учитываются как отклоненные"""
+        self.start_server(max_connections=1, accept_queue=0)
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        try:
+            extra = socket.create_connection((self.host, self.port), timeout=3.0)
+            self.assertEqual(extra.recv(1024), b"")
+            extra.close()
+            self.assertEqual(client.send_message("kept"), "TCP эхо: kept")
+            self.assertEqual(self.server.stats()["accept"]["rejected"], 1)
+            self.assertEqual(self.server.stats()["accept"]["accepted"], 2)
+        finally:
+            client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
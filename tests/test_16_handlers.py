@@ -0,0 +1,105 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.handlers import EchoHandler
+from src.protocols import TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+def upper_handler(data, addr):
+    """Обработчик без декодирования: латиница в верхнем регистре"""
+    assert isinstance(data, (bytes, bytearray, memoryview))
+    return bytes(data).upper()
+
+def split_handler(data, addr):
+    """Ответ из нескольких буферов"""
+    return [b"<", data, b">"]
+
+class TestHandlers(unittest.TestCase):
+    """Test 16: Подключаемые обработчики сообщений"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10900 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_echo_handler(self):
+        """Эхо по умолчанию не копирует данные и принимает не UTF-8"""
+        handler = EchoHandler("TCP", verbose=False)
+        data = memoryview(b"\xff\xfe binary")
+        prefix, payload = handler(data, ('localhost', 1))
+        self.assertEqual(prefix, "TCP эхо: ".encode('utf-8'))
+        self.assertIs(payload, data)
+        self.assertEqual(list(handler.stream(iter([b"a", b"b"]), ('localhost', 1))), [(prefix, b"a"), b"b"])
+
+    def test_tcp_handler(self):
+        """Обработчик отвечает вместо эха в обоих движках и во всех режимах"""
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(TCPServer(self.host, self.port, engine=engine, handler=upper_handler))
+
+                client = TCPClient(self.host, self.port)
+                self.assertTrue(client.connect())
+                self.assertEqual(client.send_message("hello"), "HELLO")
+                self.assertEqual(client.send_many([f"p{i}" for i in range(100)]), [f"P{i}" for i in range(100)])
+                # Обработчик без stream получает потоковое сообщение целиком
+                chunks = [b"abc" * 1000, b"def" * 1000]
+                self.assertEqual(b"".join(client.stream_message(chunks)), b"ABC" * 1000 + b"DEF" * 1000)
+                futures = [client.submit(f"m{i}") for i in range(100)]
+                self.assertEqual([future.result(timeout=10.0) for future in futures], [f"M{i}" for i in range(100)])
+                client.disconnect()
+                self.tearDown()
+
+    def test_buffer_list_response(self):
+        """Ответ из списка буферов уходит одним кадром"""
+        self.start_server(TCPServer(self.host, self.port, handler=split_handler))
+
+        sock = socket.create_connection((self.host, self.port), timeout=3.0)
+        try:
+            sock.sendall(TCPProtocol.prepare_message(b"\x00\xff"))
+            success, data = TCPProtocol.receive_message(sock)
+            self.assertTrue(success)
+            self.assertEqual(data, b"<\x00\xff>")
+        finally:
+            sock.close()
+
+    def test_udp_handler(self):
+        """UDP сервер отвечает обработчиком, в том числе списком буферов"""
+        for handler, expected in ((upper_handler, "HELLO UDP"), (split_handler, "<hello udp>")):
+            with self.subTest(handler=handler.__name__):
+                self.port += 1
+                self.start_server(UDPServer(self.host, self.port, handler=handler))
+
+                client = UDPClient(self.host, self.port, timeout=2.0)
+                self.assertTrue(client.connect())
+                self.assertEqual(client.send_message("hello udp"), expected)
+                client.disconnect()
+                self.tearDown()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
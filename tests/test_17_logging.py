@@ -0,0 +1,111 @@
+import unittest
+import io
+import logging
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.logs import RateLimitFilter, connection_logger, logger, message_logger, setup_logging, shutdown_logging
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class SlowStream(io.StringIO):
+    """Вывод, который долго принимает каждую строку (забитый терминал или канал)"""
+
+    def write(self, text):
+        time.sleep(0.2)
+        return super().write(text)
+
+class TestLogging(unittest.TestCase):
+    """Test 17: Логи сервера в фоновом потоке"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11000 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def exchange(self, count: int, prefix: str = "msg"):
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        for i in range(count):
+            self.assertEqual(client.send_message(f"{prefix} {i}"), f"TCP эхо: {prefix} {i}")
+        client.disconnect()
+
+    def test_rate_limit_filter(self):
+        """Фильтр пропускает rate записей в секунду и сообщает о пропущенных"""
+        limit = RateLimitFilter(rate=5)
+        records = [logging.LogRecord("server.messages", logging.INFO, __file__, 1, f"m{i}", None, None)
+                   for i in range(20)]
+        passed = [record for record in records if limit.filter(record)]
+        self.assertEqual(len(passed), 5)
+        self.assertEqual(limit.suppressed, 15)
+
+        time.sleep(0.3)
+        late = logging.LogRecord("server.messages", logging.INFO, __file__, 1, "late", None, None)
+        self.assertTrue(limit.filter(late))
+        self.assertEqual(late.getMessage(), "late (пропущено записей: 15)")
+
+    def test_messages_logged_and_rate_limited(self):
+        """Сообщения попадают в лог не чаще заданной частоты"""
+        output = io.StringIO()
+        setup_logging(message_rate=5, stream=output)
+        self.start_server()
+        self.exchange(50)
+        time.sleep(0.3)
+        shutdown_logging()
+
+        log = output.getvalue()
+        self.assertIn(f"TCP сервер запущен на {self.host}:{self.port}", log)
+        self.assertIn("TCP от", log)
+        self.assertLessEqual(log.count("TCP от"), 6)
+
+    def test_message_log_disabled(self):
+        """Записи о сообщениях отключаются полностью, остальные остаются"""
+        output = io.StringIO()
+        setup_logging(messages=False, stream=output)
+        self.start_server()
+        self.exchange(10)
+        time.sleep(0.3)
+        shutdown_logging()
+
+        log = output.getvalue()
+        self.assertIn("Подключен клиент", log)
+        self.assertNotIn("TCP от", log)
+
+    def test_slow_output_does_not_block(self):
+        """Медленный вывод не задерживает ответы клиентам"""
+        setup_logging(message_rate=None, stream=SlowStream())
+        self.start_server()
+        started = time.monotonic()
+        self.exchange(20)
+        # 20 записей в такой вывод заняли бы 4 секунды
+        self.assertLess(time.monotonic() - started, 2.0)
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+        # Возвращаем логирование по умолчанию, не дожидаясь медленного вывода
+        logger.handlers.clear()
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+        for child in (connection_logger, message_logger):
+            child.filters.clear()
+        message_logger.disabled = False
+
+if __name__ == '__main__':
+    unittest.main()
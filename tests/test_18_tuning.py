@@ -0,0 +1,119 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+from src.tuning import PROFILES, SocketTuning
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+class TestTuning(unittest.TestCase):
+    """Test 18: Профили параметров сокетов"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11100 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_profiles(self):
+        """Профиль по имени, параметры поверх профиля и неизвестный профиль"""
+        self.assertEqual(SocketTuning.resolve(None), SocketTuning())
+        self.assertIs(SocketTuning.resolve("latency"), PROFILES["latency"])
+        tuning = SocketTuning.resolve("throughput").override(nodelay=True, rcvbuf=None)
+        self.assertTrue(tuning.nodelay)
+        self.assertEqual(tuning.rcvbuf, PROFILES["throughput"].rcvbuf)
+        with self.assertRaises(ValueError):
+            SocketTuning.resolve("fastest")
+
+    def test_effective_values(self):
+        """Действующие значения читаются из сокета после установки"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            effective = SocketTuning(nodelay=True, rcvbuf=256 * 1024, keepalive=True).apply(sock)
+            self.assertEqual(effective["TCP_NODELAY"], 1)
+            self.assertEqual(effective["SO_KEEPALIVE"], 1)
+            # Linux удваивает размер буфера под служебные данные
+            self.assertGreaterEqual(effective["SO_RCVBUF"], 256 * 1024)
+        finally:
+            sock.close()
+
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            # Для UDP TCP параметры пропускаются
+            self.assertEqual(set(PROFILES["latency"].apply(udp)), set())
+            self.assertEqual(set(PROFILES["throughput"].apply(udp)), {"SO_RCVBUF", "SO_SNDBUF"})
+        finally:
+            udp.close()
+
+    def test_tcp_profiles(self):
+        """Серверы и клиенты с профилями отвечают в обоих движках"""
+        for engine in ("threads", "asyncio"):
+            for profile in ("latency", "throughput"):
+                with self.subTest(engine=engine, profile=profile):
+                    self.port += 1
+                    self.start_server(TCPServer(self.host, self.port, engine=engine, tuning=profile))
+                    with socket.socket() as probe:
+                        expected = PROFILES[profile].apply(probe)
+                    self.assertEqual(set(self.server.socket_options) - {"TCP_FASTOPEN"},
+                                     set(expected) - {"TCP_FASTOPEN_CONNECT"})
+
+                    client = TCPClient(self.host, self.port, tuning=profile)
+                    self.assertTrue(client.connect())
+                    self.assertEqual(client.send_message("tuned"), "TCP эхо: tuned")
+                    large = "L" * 300000
+                    self.assertEqual(client.send_message(large), f"TCP эхо: {large}")
+                    client.disconnect()
+                    self.tearDown()
+
+    def test_accepted_socket_options(self):
+        """Принятые сокеты получают TCP_NODELAY профиля, даже если asyncio включает его сам"""
+        for engine, nodelay in (("threads", True), ("asyncio", False)):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(TCPServer(self.host, self.port, engine=engine,
+                                            tuning=SocketTuning(nodelay=nodelay)))
+                client = TCPClient(self.host, self.port)
+                self.assertTrue(client.connect())
+                self.assertEqual(client.send_message("check"), "TCP эхо: check")
+
+                connection = next(iter(self.server.connections._connections))
+                sock = connection.transport.get_extra_info('socket') if engine == "asyncio" else connection.sock
+                self.assertEqual(bool(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)), nodelay)
+                client.disconnect()
+                self.tearDown()
+
+    def test_udp_profile(self):
+        """UDP сервер и клиент применяют размеры буферов профиля"""
+        self.start_server(UDPServer(self.host, self.port, tuning="throughput"))
+        self.assertEqual(set(self.server.socket_options), {"SO_RCVBUF", "SO_SNDBUF"})
+
+        client = UDPClient(self.host, self.port, timeout=2.0, tuning="throughput")
+        self.assertTrue(client.connect())
+        self.assertIn("SO_RCVBUF", client.socket_options)
+        self.assertEqual(client.send_message("buffers"), "UDP эхо: buffers")
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.protocols import TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestBackpressure(unittest.TestCase):
+    """Test 19: Буфер ответов с порогами и отключение клиентов, которые не читают"""
+
+    MESSAGE = b"B" * 64 * 1024
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11200 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+        self.sockets = []
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def flood(self, count: int, multiplexed: bool = False) -> socket.socket:
+        """Клиент, который шлет запросы и не читает ответы"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16 * 1024)
+        sock.connect((self.host, self.port))
+        self.sockets.append(sock)
+
+        def send():
+            try:
+                for i in range(count):
+                    frame = TCPProtocol.frame_buffers(self.MESSAGE, stream_id=i + 1 if multiplexed else 0)
+                    sock.sendall(b"".join(frame))
+            except OSError:
+                pass  # Сервер отключил клиента
+        threading.Thread(target=send, daemon=True).start()
+        return sock
+
+    def write_buffered(self, engine: str) -> int:
+        """Сколько байт ответов ждет отправки у единственного соединения сервера"""
+        connections = list(self.server.connections._connections)
+        if not connections:
+            return 0
+        if engine == "asyncio":
+            return connections[0].transport.get_write_buffer_size()
+        return connections[0].buffered
+
+    def test_stalled_client_disconnected(self):
+        """Буфер ответов не растет выше порога, а не читающий клиент отключается"""
+        high_water = 256 * 1024
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(engine=engine, write_high_water=high_water,
+                                  write_low_water=64 * 1024, write_stall_timeout=1.5)
+                self.flood(200)
+
+                peak = 0
+                deadline = time.monotonic() + 1.0
+                while time.monotonic() < deadline:
+                    peak = max(peak, self.write_buffered(engine))
+                    time.sleep(0.01)
+                # Без порога сервер копил бы ответы на все 12 МБ запросов
+                self.assertGreater(peak, 0)
+                self.assertLess(peak, high_water + 512 * 1024)
+
+                # Пока один клиент стоит, другие обслуживаются
+                client = TCPClient(self.host, self.port)
+                self.assertTrue(client.connect())
+                self.assertEqual(client.send_message("still here"), "TCP эхо: still here")
+                client.disconnect()
+
+                deadline = time.monotonic() + 5.0
+                while self.server.stats()["connections"]["stalled"] < 1 and time.monotonic() < deadline:
+                    time.sleep(0.1)
+                self.assertEqual(self.server.stats()["connections"]["stalled"], 1)
+                self.tearDown()
+
+    def test_slow_reader_receives_everything(self):
+        """Клиент, который читает с опозданием, получает все ответы по порядку"""
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(engine=engine, write_high_water=64 * 1024, write_low_water=16 * 1024)
+                sock = self.flood(50)
+                time.sleep(1.0)
+
+                sock.settimeout(5.0)
+                for _ in range(50):
+                    success, data = TCPProtocol.receive_message(sock)
+                    self.assertTrue(success)
+                    self.assertEqual(bytes(data), "TCP эхо: ".encode('utf-8') + self.MESSAGE)
+                self.assertEqual(self.server.stats()["connections"]["stalled"], 0)
+                self.tearDown()
+
+    def test_multiplexed_replies_do_not_hold_workers(self):
+        """Ответы клиенту, который не читает, не занимают потоки пула"""
+        self.start_server(workers=2)
+        self.flood(100, multiplexed=True)
+        time.sleep(0.5)
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        futures = [client.submit(f"m{i}") for i in range(10)]
+        self.assertEqual([future.result(timeout=2.0) for future in futures],
+                         [f"TCP эхо: m{i}" for i in range(10)])
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import time
+import threading
+import socket
+import shutil
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+class TestUnixSockets(unittest.TestCase):
+    """Test 20: Сокеты AF_UNIX для клиентов на той же машине"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, "server.sock")
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_tcp_engines(self):
+        """Кадры TCPProtocol через AF_UNIX в обоих движках; файл сокета удаляется при остановке"""
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.start_server(TCPServer(unix_socket=self.path, engine=engine, tuning="latency"))
+                self.assertTrue(os.path.exists(self.path))
+
+                client = TCPClient(unix_socket=self.path)
+                self.assertTrue(client.connect())
+                self.assertEqual(client.send_message("local"), "TCP эхо: local")
+                large = "U" * 500000
+                self.assertEqual(client.send_message(large), f"TCP эхо: {large}")
+                client.disconnect()
+
+                self.tearDown()
+                self.assertFalse(os.path.exists(self.path))
+
+    def test_pipeline_large_messages(self):
+        """Конвейер больших сообщений не упирается в маленькие буферы AF_UNIX"""
+        self.start_server(TCPServer(unix_socket=self.path, write_stall_timeout=3.0))
+        client = TCPClient(unix_socket=self.path)
+        self.assertTrue(client.connect())
+        message = "P" * 65536
+        replies = client.send_many([message] * 200)
+        self.assertEqual(replies, [f"TCP эхо: {message}"] * 200)
+        client.disconnect()
+        self.assertEqual(self.server.stats()["connections"]["stalled"], 0)
+
+    def test_stale_and_busy_path(self):
+        """Файл от остановленного сервера заменяется, а занятый путь не отбирается"""
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()  # Файл остался, но никто не слушает
+
+        self.start_server(TCPServer(unix_socket=self.path))
+        self.assertTrue(self.server.running)
+
+        second = TCPServer(unix_socket=self.path, max_retries=1)
+        second.start()
+        self.assertFalse(second.running)
+        # Неудачный запуск не удалил файл работающего сервера
+        client = TCPClient(unix_socket=self.path)
+        self.assertTrue(client.connect())
+        self.assertEqual(client.send_message("still mine"), "TCP эхо: still mine")
+        client.disconnect()
+
+    def test_udp(self):
+        """Датаграммы через AF_UNIX: клиент получает свой адрес для ответов"""
+        self.start_server(UDPServer(unix_socket=self.path))
+        client = UDPClient(unix_socket=self.path, timeout=2.0)
+        self.assertTrue(client.connect())
+        for i in range(10):
+            self.assertEqual(client.send_message(f"dgram {i}"), f"UDP эхо: dgram {i}")
+        client.disconnect()
+        self.assertEqual(self.server.stats(), {"received": 10, "sent": 10})
+
+    def test_reuse_port_rejected(self):
+        """Несколько процессов не могут делить один путь через SO_REUSEPORT"""
+        with self.assertRaises(ValueError):
+            TCPServer(unix_socket=self.path, reuse_port=True)
+        with self.assertRaises(ValueError):
+            UDPServer(unix_socket=self.path, reuse_port=True)
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+        self.server = None
+        self.server_thread = None
+
+if __name__ == '__main__':
+    unittest.main()
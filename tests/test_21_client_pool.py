@@ -0,0 +1,156 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.client_pool import ClientPool, PoolTimeout
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestClientPool(unittest.TestCase):
+    """Test 21: Пул клиентов для нескольких потоков"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11300 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+        self.pool = None
+
+    def start_server(self, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, max_retries=1, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def stop_server(self):
+        self.server.stop()
+        self.server_thread.join(timeout=2.0)
+
+    def start_pool(self, **kwargs) -> ClientPool:
+        self.pool = ClientPool(lambda: TCPClient(self.host, self.port), **kwargs)
+        self.assertTrue(self.pool.start())
+        return self.pool
+
+    def test_threads_share_pool(self):
+        """Потоки делят несколько соединений, каждый получает свои ответы"""
+        self.start_server()
+        pool = self.start_pool(min_size=2, max_size=4)
+        errors = []
+
+        def worker(index):
+            for i in range(20):
+                message = f"worker {index} message {i}"
+                reply = pool.send_message(message)
+                if reply != f"TCP эхо: {message}":
+                    errors.append(reply)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stats = pool.stats()
+        self.assertEqual(stats["checkouts"], 400)
+        self.assertLessEqual(stats["created"], 4)
+        self.assertLessEqual(stats["peak_in_use"], 4)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(self.server.stats()["connections"]["total"], stats["created"])
+
+    def test_checkout_timeout(self):
+        """Когда все клиенты выданы, ожидание ограничено, а загрузка видна в stats"""
+        self.start_server()
+        pool = self.start_pool(min_size=0, max_size=1)
+        client = pool.checkout()
+        self.assertEqual(pool.stats()["utilization"], 1.0)
+
+        started = time.monotonic()
+        with self.assertRaises(PoolTimeout):
+            pool.checkout(timeout=0.3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+        # Ожидающий получает клиента, как только его вернут
+        threading.Timer(0.2, pool.release, args=(client,)).start()
+        with pool.client(timeout=2.0) as again:
+            self.assertIs(again, client)
+        stats = pool.stats()
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertGreaterEqual(stats["wait_max"], 0.15)
+        self.assertEqual(stats["utilization"], 0.0)
+
+    def test_failed_connect_releases_slot(self):
+        """Неудачное подключение или исключение factory не занимают место в пуле"""
+        self.start_server()
+        attempts = []
+
+        def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("factory failed")
+            if len(attempts) == 2:
+                return TCPClient(self.host, self.port + 500)  # Здесь никто не слушает
+            return TCPClient(self.host, self.port)
+
+        self.pool = pool = ClientPool(factory, min_size=0, max_size=1)
+        self.assertTrue(pool.start())
+        with self.assertRaises(OSError):
+            pool.checkout(timeout=0.5)
+        with self.assertRaises(ConnectionError):
+            pool.checkout(timeout=0.5)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["in_use"]), (0, 0))
+        # Единственное место свободно: следующий клиент подключается без таймаута
+        self.assertEqual(pool.send_message("after failures"), "TCP эхо: after failures")
+        self.assertEqual(pool.stats()["timeouts"], 0)
+
+    def test_reconnect_after_server_restart(self):
+        """Соединения, закрытые сервером, незаметно заменяются новыми"""
+        self.start_server()
+        pool = self.start_pool(min_size=2, max_size=2)
+        self.assertEqual(pool.send_message("before"), "TCP эхо: before")
+
+        self.stop_server()
+        self.start_server()
+        for i in range(5):
+            self.assertEqual(pool.send_message(f"after {i}"), f"TCP эхо: after {i}")
+        self.assertGreaterEqual(pool.stats()["unhealthy"] + pool.stats()["reconnects"], 1)
+
+        # Обслуживание пула восполняет min_size
+        deadline = time.monotonic() + 5.0
+        while pool.stats()["size"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(pool.stats()["size"], 2)
+
+    def test_idle_eviction(self):
+        """Лишние свободные соединения закрываются, min_size остается"""
+        self.start_server()
+        pool = self.start_pool(min_size=1, max_size=4, idle_timeout=0.5)
+        clients = [pool.checkout() for _ in range(4)]
+        for client in clients:
+            pool.release(client)
+        self.assertEqual(pool.stats()["size"], 4)
+
+        deadline = time.monotonic() + 5.0
+        while pool.stats()["size"] > 1 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(pool.stats()["size"], 1)
+        self.assertEqual(pool.send_message("kept"), "TCP эхо: kept")
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.pool:
+            self.pool.close()
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
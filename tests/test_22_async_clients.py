@@ -0,0 +1,217 @@
+import unittest
+import asyncio
+import time
+import threading
+import socket
+import shutil
+import sys
+import os
+import random
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.async_client import AsyncTCPClient, AsyncUDPClient
+from src.compression import FrameCompressor
+from src.protocols import UDPProtocol
+from src.tcp_server import TCPServer
+from src.udp_server import UDPServer
+
+def slow_handler(data, addr):
+    """Сообщения, начинающиеся со slow, обрабатываются полсекунды"""
+    data = bytes(data)
+    if data.startswith(b"slow"):
+        time.sleep(0.5)
+    return b"reply: " + data
+
+class TestAsyncClients(unittest.TestCase):
+    """Test 22: Асинхронные клиенты TCP и UDP"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11400 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_tcp_concurrency(self):
+        """Тысяча одновременных запросов по одному соединению в обоих движках"""
+        async def scenario():
+            async with AsyncTCPClient(self.host, self.port) as client:
+                messages = [f"async {i}" for i in range(1000)]
+                replies = await asyncio.gather(*(client.send_message(m) for m in messages))
+                self.assertEqual(replies, [f"TCP эхо: {m}" for m in messages])
+                large = "L" * 300000
+                self.assertEqual(await client.request(large), f"TCP эхо: {large}")
+                self.assertEqual(client.in_flight, 0)
+
+        for engine in ("threads", "asyncio"):
+            with self.subTest(engine=engine):
+                self.port += 1
+                self.start_server(TCPServer(self.host, self.port, engine=engine))
+                asyncio.run(scenario())
+                self.tearDown()
+
+    def test_timeout_and_cancel(self):
+        """Просроченный и отмененный запросы не мешают следующим на том же соединении"""
+        self.start_server(TCPServer(self.host, self.port, handler=slow_handler))
+
+        async def scenario():
+            async with AsyncTCPClient(self.host, self.port, timeout=5.0) as client:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await client.request("slow 1", timeout=0.1)
+                self.assertEqual(await client.send_message("slow 2", timeout=0.1), "Таймаут ожидания ответа")
+
+                task = asyncio.ensure_future(client.request("slow 3"))
+                await asyncio.sleep(0.1)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                self.assertEqual(client.in_flight, 0)
+
+                # Быстрые запросы отвечаются, пока медленный еще ждет
+                slow = asyncio.ensure_future(client.request("slow 4"))
+                self.assertEqual(await client.request("fast"), "reply: fast")
+                self.assertFalse(slow.done())
+                self.assertEqual(await slow, "reply: slow 4")
+                # Опоздавшие ответы отброшены и не достались чужим запросам
+                await asyncio.sleep(0.6)
+                self.assertEqual(await client.request("after"), "reply: after")
+
+        asyncio.run(scenario())
+
+    def test_compression_and_disconnect(self):
+        """Согласование сжатия; ждущие запросы завершаются ошибкой при остановке сервера"""
+        self.start_server(TCPServer(self.host, self.port, compression=FrameCompressor(threshold=256)))
+
+        async def scenario():
+            client = AsyncTCPClient(self.host, self.port, compression=FrameCompressor(threshold=256))
+            self.assertTrue(await client.connect())
+            self.assertEqual(client.compressor.codec, 'zlib')
+            message = "compressible " * 10000
+            self.assertEqual(await client.request(message), f"TCP эхо: {message}")
+
+            self.server.stop()
+            with self.assertRaises((ConnectionError, OSError)):
+                await client.request("after stop", timeout=3.0)
+            self.assertFalse(client.connected)
+            self.assertEqual(await client.send_message("again"), "Не подключен к серверу")
+            await client.disconnect()
+
+        asyncio.run(scenario())
+
+    def test_connect_failure(self):
+        """Нет сервера - connect возвращает False"""
+        async def scenario():
+            client = AsyncTCPClient(self.host, self.port, timeout=2.0)
+            self.assertFalse(await client.connect())
+            self.assertFalse(client.connected)
+
+        asyncio.run(scenario())
+
+    def test_unix_socket(self):
+        """Асинхронные клиенты TCP и UDP через AF_UNIX"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+
+        async def tcp():
+            async with AsyncTCPClient(unix_socket=os.path.join(directory, "tcp.sock")) as client:
+                replies = await asyncio.gather(*(client.request(f"u{i}") for i in range(100)))
+                self.assertEqual(replies, [f"TCP эхо: u{i}" for i in range(100)])
+
+        async def udp():
+            async with AsyncUDPClient(unix_socket=os.path.join(directory, "udp.sock"), timeout=2.0) as client:
+                replies = await asyncio.gather(*(client.request(f"d{i}") for i in range(50)))
+                self.assertEqual(replies, [f"UDP эхо: d{i}" for i in range(50)])
+
+        self.start_server(TCPServer(unix_socket=os.path.join(directory, "tcp.sock")))
+        asyncio.run(tcp())
+        self.tearDown()
+        self.start_server(UDPServer(unix_socket=os.path.join(directory, "udp.sock")))
+        asyncio.run(udp())
+
+    def test_udp_concurrency(self):
+        """Одновременные запросы UDP через один сокет ограничены max_in_flight и получают свои ответы"""
+        self.start_server(UDPServer(self.host, self.port))
+
+        async def scenario():
+            async with AsyncUDPClient(self.host, self.port, timeout=3.0, max_in_flight=16) as client:
+                messages = [f"dgram {i}" for i in range(300)]
+                tasks = [asyncio.ensure_future(client.send_message(m)) for m in messages]
+                await asyncio.sleep(0)
+                self.assertLessEqual(client.in_flight, 16)
+                replies = await asyncio.gather(*tasks)
+                self.assertEqual(replies, [f"UDP эхо: {m}" for m in messages])
+                self.assertEqual(client.stats(), {"requests": 300, "replies": 300, "lost": 0, "stale": 0, "in_flight": 0})
+
+        asyncio.run(scenario())
+        stats = self.server.stats()
+        self.assertEqual((stats["received"], stats["sent"]), (300, 300))
+
+    def test_udp_large_messages(self):
+        """Сообщения длиннее буфера сервера и одной датаграммы идут фрагментами"""
+        self.start_server(UDPServer(self.host, self.port))
+
+        async def scenario():
+            async with AsyncUDPClient(self.host, self.port, timeout=3.0) as client:
+                for size in (5000, 70000):
+                    message = "a" * size
+                    self.assertEqual(await client.request(message), f"UDP эхо: {message}")
+                messages = [f"{i}:" + "b" * 3000 for i in range(20)]
+                replies = await asyncio.gather(*(client.request(m) for m in messages))
+                self.assertEqual(replies, [f"UDP эхо: {m}" for m in messages])
+
+        asyncio.run(scenario())
+        self.assertEqual(self.server.stats()["fragments"]["completed"], 22)
+
+    def test_udp_timeout(self):
+        """Таймаут запроса UDP: опоздавший ответ учитывается как stale и не достается следующему запросу"""
+        silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        silent.bind((self.host, 0))
+        self.addCleanup(silent.close)
+        port = silent.getsockname()[1]
+
+        async def scenario():
+            async with AsyncUDPClient(self.host, port, timeout=0.2) as client:
+                started = time.monotonic()
+                self.assertEqual(await client.send_message("lost"), "Таймаут ожидания ответа")
+                self.assertLess(time.monotonic() - started, 2.0)
+                self.assertEqual(client.in_flight, 0)
+                data, addr = silent.recvfrom(1024)
+                lost_id, payload = UDPProtocol.split_request(data)
+                self.assertEqual(payload, b"lost")
+
+                task = asyncio.ensure_future(client.request("echo", timeout=2.0))
+                await asyncio.sleep(0.05)
+                data, reply_addr = silent.recvfrom(1024)
+                self.assertEqual(reply_addr, addr)
+                echo_id, _ = UDPProtocol.split_request(data)
+                self.assertNotEqual(echo_id, lost_id)
+                # Ответ на просроченный запрос и ответ без идентификатора отбрасываются
+                silent.sendto(UDPProtocol.tag_request(lost_id, b"late"), addr)
+                silent.sendto(b"untagged", addr)
+                silent.sendto(UDPProtocol.tag_request(echo_id, b"fresh"), addr)
+                self.assertEqual(await task, "fresh")
+                self.assertEqual(client.stats(), {"requests": 2, "replies": 1, "lost": 1, "stale": 2, "in_flight": 0})
+
+        silent.setblocking(True)
+        silent.settimeout(2.0)
+        asyncio.run(scenario())
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+        self.server = None
+        self.server_thread = None
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.balancer import BalancingClient
+from src.tcp_server import TCPServer
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+def slow_handler(data, addr):
+    """Сервер, который отвечает на каждое сообщение за 0.2 секунды"""
+    time.sleep(0.2)
+    return b"slow: " + bytes(data)
+
+class TestBalancer(unittest.TestCase):
+    """Test 23: Балансировка запросов между несколькими серверами"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11500 + random.randint(1, 30) * 3
+        self.servers = []
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        thread = threading.Thread(target=server.start)
+        thread.daemon = True
+        thread.start()
+        self.servers.append((server, thread))
+        time.sleep(0.5)
+        return server
+
+    def endpoints(self, count):
+        return [f"{self.host}:{self.port + i}" for i in range(count)]
+
+    def test_spread_load(self):
+        """Запросы из многих потоков распределяются по всем серверам обеими стратегиями"""
+        for i in range(3):
+            self.start_server(TCPServer(self.host, self.port + i))
+
+        for strategy in BalancingClient.STRATEGIES:
+            with self.subTest(strategy=strategy):
+                with BalancingClient(self.endpoints(3), strategy=strategy, pool_size=4) as client:
+                    with ThreadPoolExecutor(12) as executor:
+                        replies = list(executor.map(client.send_message, [f"m{i}" for i in range(600)]))
+                    self.assertEqual(replies, [f"TCP эхо: m{i}" for i in range(600)])
+                    stats = client.stats()["endpoints"]
+                    for name, endpoint in stats.items():
+                        self.assertGreater(endpoint["requests"], 60, name)
+                        self.assertEqual(endpoint["outstanding"], 0)
+                        self.assertEqual(endpoint["errors"], 0)
+
+    def test_eject_failing_endpoint(self):
+        """Остановленный сервер исключается, запросы уходят другим без ошибок"""
+        servers = [self.start_server(TCPServer(self.host, self.port + i)) for i in range(3)]
+
+        with BalancingClient(self.endpoints(3), min_samples=3, ejection_time=1.0) as client:
+            servers[0].stop()
+            time.sleep(0.5)
+            for i in range(100):
+                self.assertEqual(client.send_message(f"f{i}"), f"TCP эхо: f{i}")
+            stats = client.stats()
+            failing = stats["endpoints"][self.endpoints(3)[0]]
+            self.assertTrue(failing["ejected"])
+            self.assertEqual(failing["ejections"], 1)
+            # Ошибки видны только до исключения, дальше сервер не выбирается
+            self.assertLessEqual(failing["errors"], 10)
+            self.assertGreater(stats["retried"], 0)
+
+            # После перезапуска и истечения времени исключения сервер снова получает запросы
+            self.start_server(TCPServer(self.host, self.port))
+            time.sleep(1.5)
+            for i in range(60):
+                client.send_message(f"r{i}")
+            restored = client.stats()["endpoints"][self.endpoints(3)[0]]
+            self.assertFalse(restored["ejected"])
+            self.assertGreater(restored["requests"], failing["requests"])
+
+    def test_eject_slow_endpoint(self):
+        """Сервер с задержкой в разы выше остальных исключается"""
+        self.start_server(TCPServer(self.host, self.port, handler=slow_handler))
+        for i in range(1, 3):
+            self.start_server(TCPServer(self.host, self.port + i))
+
+        with BalancingClient(self.endpoints(3), min_samples=2, ejection_time=30.0) as client:
+            for i in range(60):
+                client.send_message(f"s{i}")
+            slow = client.stats()["endpoints"][self.endpoints(3)[0]]
+            self.assertTrue(slow["ejected"])
+            self.assertLessEqual(slow["requests"], 10)
+
+    def test_max_ejected(self):
+        """Единственный сервер не исключается, даже если все запросы к нему падают"""
+        with BalancingClient(self.endpoints(1), min_samples=1, retries=0) as client:
+            for _ in range(5):
+                with self.assertRaises((ConnectionError, OSError)):
+                    client.send_message("nobody")
+            self.assertFalse(client.stats()["endpoints"][self.endpoints(1)[0]]["ejected"])
+
+    def test_hedging(self):
+        """Медленный запрос дублируется другому серверу и хвост задержки срезается"""
+        self.start_server(TCPServer(self.host, self.port, handler=slow_handler))
+        self.start_server(TCPServer(self.host, self.port + 1))
+
+        with BalancingClient(self.endpoints(2), latency_factor=None, hedge_delay=0.05) as client:
+            for i in range(20):
+                started = time.monotonic()
+                self.assertIn(client.send_message(f"h{i}"), (f"TCP эхо: h{i}", f"slow: h{i}"))
+                self.assertLess(time.monotonic() - started, 0.18)
+            stats = client.stats()
+            self.assertGreater(stats["hedges"], 0)
+            self.assertEqual(stats["hedges"], stats["hedge_wins"])
+
+    def test_hedge_after_shutdown(self):
+        """Дубль, который не удалось поставить в остановленный пул потоков, не занимает outstanding"""
+        for i in range(2):
+            self.start_server(TCPServer(self.host, self.port + i, handler=slow_handler))
+
+        with BalancingClient(self.endpoints(2), latency_factor=None, hedge_delay=0.1) as client:
+            executor = client._executor
+            threading.Timer(0.03, executor.shutdown, kwargs={"wait": False}).start()
+            self.assertEqual(client.send_message("first"), "slow: first")
+            with self.assertRaises(ConnectionError):
+                client.send_message("after shutdown")
+            stats = client.stats()
+            self.assertEqual(stats["hedges"], 0)
+            self.assertEqual([e["outstanding"] for e in stats["endpoints"].values()], [0, 0])
+
+    def test_udp_endpoints(self):
+        """Балансировка датаграмм между серверами UDP"""
+        for i in range(2):
+            self.start_server(UDPServer(self.host, self.port + i))
+
+        factory = lambda host, port: UDPClient(host, port, timeout=2.0)
+        with BalancingClient(self.endpoints(2), client_factory=factory, pool_size=2) as client:
+            with ThreadPoolExecutor(4) as executor:
+                replies = list(executor.map(client.send_message, [f"d{i}" for i in range(200)]))
+            self.assertEqual(replies, [f"UDP эхо: d{i}" for i in range(200)])
+        received = [server.stats()["received"] for server, _ in self.servers]
+        self.assertEqual(sum(received), 200)
+        self.assertTrue(all(count > 20 for count in received))
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        for server, thread in self.servers:
+            server.stop()
+            if thread.is_alive():
+                thread.join(timeout=2.0)
+        self.servers = []
+
+if __name__ == '__main__':
+    unittest.main()
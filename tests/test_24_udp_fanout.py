@@ -0,0 +1,119 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.supervisor import Supervisor
+from src.tuning import SocketTuning
+from src.udp_server import UDPServer, socket_drops
+
+class TestUDPFanout(unittest.TestCase):
+    """Test 24: Прием UDP несколькими процессами и потери в буфере ядра"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 11600 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+        self.supervisor = None
+        self.supervisor_thread = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def wait_for(self, condition, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.1)
+        return False
+
+    def test_drops_counted(self):
+        """Датаграммы, не поместившиеся в маленький SO_RCVBUF, видны в счетчике drops"""
+        blocked = threading.Event()
+
+        def stalling_handler(data, addr):
+            # Первая датаграмма задерживает сервер, остальные копятся в буфере ядра
+            if not blocked.is_set():
+                blocked.set()
+                time.sleep(1.0)
+            return bytes(data)
+
+        self.start_server(UDPServer(self.host, self.port, handler=stalling_handler, tuning=SocketTuning(rcvbuf=4096)))
+        self.assertEqual(self.server.stats()["drops"], 0)
+
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(sender.close)
+        for _ in range(500):
+            sender.sendto(b"x" * 1000, (self.host, self.port))
+
+        stats = {}
+        def settled():
+            stats.update(self.server.stats())
+            return stats["received"] + stats["drops"] == 500
+        self.assertTrue(self.wait_for(settled), stats)
+        self.assertGreater(stats["drops"], 0)
+
+        # После остановки остается последнее значение счетчика
+        self.server.stop()
+        self.assertIsNone(socket_drops(self.server.socket))
+        self.assertEqual(self.server.stats()["drops"], stats["drops"])
+
+    def test_worker_rates(self):
+        """Супервизор показывает скорость приема и потери каждого процесса"""
+        self.supervisor = Supervisor(
+            lambda: UDPServer(self.host, self.port, reuse_port=True, tuning=SocketTuning(rcvbuf=1024 * 1024)),
+            2, stats_interval=0.2, log_interval=0.5
+        )
+        self.supervisor_thread = threading.Thread(target=self.supervisor.run)
+        self.supervisor_thread.daemon = True
+        self.supervisor_thread.start()
+        time.sleep(1.5)
+
+        # Разные порты отправителей - разные потоки, ядро раскладывает их по сокетам
+        senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(32)]
+        for sender in senders:
+            self.addCleanup(sender.close)
+        deadline = time.monotonic() + 1.5
+        sent = 0
+        while time.monotonic() < deadline:
+            for sender in senders:
+                sender.sendto(b"rate", (self.host, self.port))
+                sent += 1
+            time.sleep(0.001)
+
+        workers = []
+        def reported():
+            workers[:] = self.supervisor.worker_stats()
+            stats = self.supervisor.stats()
+            return len(workers) == 2 and stats.get("received", 0) + stats.get("drops", 0) == sent
+        self.assertTrue(self.wait_for(reported), (sent, workers))
+        for worker in workers:
+            self.assertIn("drops", worker["stats"])
+            self.assertGreater(worker["stats"]["received"], 0)
+            self.assertEqual(set(worker["rates"]), {"received", "sent", "drops"})
+        self.assertEqual(self.supervisor.stats()["workers"], 2)
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+        if self.supervisor:
+            self.supervisor.stop()
+        if self.supervisor_thread and self.supervisor_thread.is_alive():
+            self.supervisor_thread.join(timeout=10.0)
+
+if __name__ == '__main__':
+    unittest.main()
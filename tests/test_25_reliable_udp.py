@@ -0,0 +1,242 @@
+import unittest
+import heapq
+import time
+import threading
+import select
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.reliable import ReliableChannel
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+class LossyRelay:
+    """Пересылает датаграммы между клиентом и сервером с потерями и задержкой"""
+
+    def __init__(self, host: str, port: int, target: tuple, loss: float = 0.0, delay: float = 0.0, seed: int = 1):
+        self.target = target
+        self.loss = loss
+        self.delay = delay  # В одну сторону
+        self.random = random.Random(seed)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.client = None
+        self.dropped = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        queue = []  # (когда отправить, номер, данные, адрес)
+        counter = 0
+        while self.running:
+            now = time.monotonic()
+            while queue and queue[0][0] <= now:
+                _, _, data, addr = heapq.heappop(queue)
+                self.socket.sendto(data, addr)
+            timeout = min(0.05, queue[0][0] - now) if queue else 0.05
+            readable, _, _ = select.select([self.socket], [], [], max(timeout, 0))
+            if not readable:
+                continue
+            data, addr = self.socket.recvfrom(65536)
+            if addr != self.target:
+                self.client = addr
+                destination = self.target
+            elif self.client:
+                destination = self.client
+            else:
+                continue
+            if self.random.random() < self.loss:
+                self.dropped += 1
+                continue
+            counter += 1
+            heapq.heappush(queue, (time.monotonic() + self.delay, counter, data, destination))
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=2.0)
+        self.socket.close()
+
+class TestReliableUDP(unittest.TestCase):
+    """Test 25: Надежный режим UDP с окном и выборочными подтверждениями"""
+
+    def setUp(self):
+        self.host = '127.0.0.1'
+        self.port = 11700 + random.randint(1, 50) * 2
+        self.server = None
+        self.server_thread = None
+        self.relay = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def start_relay(self, **kwargs) -> int:
+        """Запускает пересылку к серверу и возвращает ее порт"""
+        self.relay = LossyRelay(self.host, self.port + 1, (self.host, self.port), **kwargs)
+        return self.port + 1
+
+    def test_selective_ack(self):
+        """Потерянная датаграмма повторяется по выборочным подтверждениям, без таймаута"""
+        sender = ReliableChannel(7, window=16)
+        receiver = ReliableChannel(7, window=16)
+        for i in range(10):
+            sender.send(f"m{i}".encode())
+        now = 0.0
+        packets = sender.datagrams(now)
+        self.assertEqual(len(packets), ReliableChannel.INITIAL_CWND)
+
+        delivered = []
+        for _ in range(20):
+            acks = []
+            for packet in packets:
+                if ReliableChannel.parse_header(packet)[2] == 2 and sender.retransmits == 0:
+                    continue  # Первая отправка датаграммы 2 теряется
+                delivered += receiver.receive(packet, now)
+                acks += receiver.datagrams(now)
+            now += 0.001
+            for ack in acks:
+                sender.receive(ack, now)
+            packets = sender.datagrams(now)
+            if not packets:
+                break
+        self.assertEqual(delivered, [f"m{i}".encode() for i in range(10)])
+        self.assertEqual(sender.retransmits, 1)
+        self.assertEqual(sender.timeouts, 0)
+        self.assertEqual(sender.lost, 1)
+        self.assertLess(sender.ssthresh, 16)
+        self.assertTrue(sender.idle())
+
+    def test_sequence_wraparound(self):
+        """Номера датаграмм переходят через 2**32 без ошибок, потеря на переходе повторяется"""
+        sender = ReliableChannel(3, window=16)
+        receiver = ReliableChannel(3, window=16)
+        start = 2 ** 32 - 5
+        sender._next_seq = receiver._expected = start
+        self.assertEqual(ReliableChannel.seq_offset(2, start), 7)
+        self.assertEqual(ReliableChannel.seq_offset(start, 2), -7)
+        messages = [f"w{i}".encode() for i in range(40)]
+        for message in messages:
+            sender.send(message)
+
+        delivered = []
+        now = 0.0
+        packets = sender.datagrams(now)
+        for _ in range(100):
+            acks = []
+            for packet in packets:
+                if ReliableChannel.parse_header(packet)[2] == 0 and sender.retransmits == 0:
+                    continue  # Первая датаграмма после перехода теряется
+                delivered += receiver.receive(packet, now)
+                acks += receiver.datagrams(now)
+            now += 0.001
+            for ack in acks:
+                sender.receive(ack, now)
+            packets = sender.datagrams(now)
+            if not packets:
+                break
+        self.assertEqual(delivered, messages)
+        self.assertEqual(sender.retransmits, 1)
+        self.assertEqual(sender.timeouts, 0)
+        self.assertTrue(sender.idle())
+        self.assertEqual((sender.stats()["sent"], receiver.stats()["delivered"]), (40, 40))
+        self.assertEqual(sender._next_seq, 35)
+
+    def test_timeout_backoff(self):
+        """Без подтверждений окно падает до одной датаграммы, а RTO удваивается"""
+        sender = ReliableChannel(1)
+        sender.send(b"x")
+        sender.send(b"y")
+        self.assertEqual(len(sender.datagrams(0.0)), 2)
+        self.assertEqual(sender.datagrams(0.1), [])
+        retransmitted = sender.datagrams(ReliableChannel.INITIAL_RTO + 0.01)
+        self.assertEqual(len(retransmitted), 1)
+        self.assertEqual(sender.cwnd, 1.0)
+        self.assertEqual(sender.rto, ReliableChannel.INITIAL_RTO * 2)
+        now = 1.0
+        while not sender.failed:
+            now += ReliableChannel.MAX_RTO
+            sender.datagrams(now)
+        self.assertTrue(sender.failed)
+
+    def test_lossy_link(self):
+        """Все ответы доходят по порядку при потере 20% датаграмм в обе стороны"""
+        self.start_server(UDPServer(self.host, self.port))
+        port = self.start_relay(loss=0.2)
+
+        client = UDPClient(self.host, port, timeout=5.0, reliable=True)
+        self.assertTrue(client.connect())
+        for i in range(30):
+            self.assertEqual(client.send_message(f"one {i}"), f"UDP эхо: one {i}")
+        messages = [f"batch {i}" for i in range(500)]
+        self.assertEqual(client.send_many(messages), [f"UDP эхо: {m}" for m in messages])
+        stats = client.channel.stats()
+        self.assertGreater(stats["retransmits"], 0)
+        self.assertGreater(self.relay.dropped, 0)
+        client.disconnect()
+        # Каждый запрос обработан ровно один раз, несмотря на повторы
+        self.assertEqual(self.server.stats()["sent"], 530)
+
+    def test_window_beats_stop_and_wait(self):
+        """Окно запросов быстрее, чем запрос-ответ, при задержке в сети"""
+        self.start_server(UDPServer(self.host, self.port))
+        port = self.start_relay(delay=0.005)
+
+        client = UDPClient(self.host, port, timeout=5.0, reliable=True)
+        self.assertTrue(client.connect())
+        started = time.monotonic()
+        for i in range(100):
+            client.send_message(f"wait {i}")
+        stop_and_wait = time.monotonic() - started
+
+        started = time.monotonic()
+        self.assertEqual(len(client.send_many([f"window {i}" for i in range(100)])), 100)
+        windowed = time.monotonic() - started
+        client.disconnect()
+        self.assertGreater(stop_and_wait, 1.0)
+        self.assertLess(windowed, stop_and_wait / 4)
+
+    def test_plain_and_reliable_together(self):
+        """Сервер отвечает обычным и надежным клиентам одновременно"""
+        self.start_server(UDPServer(self.host, self.port))
+        plain = UDPClient(self.host, self.port, timeout=2.0)
+        reliable = UDPClient(self.host, self.port, timeout=2.0, reliable=True)
+        self.assertTrue(plain.connect())
+        self.assertTrue(reliable.connect())
+        for i in range(10):
+            self.assertEqual(plain.send_message(f"plain {i}"), f"UDP эхо: plain {i}")
+            self.assertEqual(reliable.send_message(f"safe {i}"), f"UDP эхо: safe {i}")
+        plain.disconnect()
+        reliable.disconnect()
+        self.assertEqual(self.server.stats()["reliable"]["sessions"], 1)
+
+    def test_no_server(self):
+        """Без сервера запрос завершается таймаутом, а следующий идет в новой сессии"""
+        client = UDPClient(self.host, self.port, timeout=0.5, reliable=True)
+        self.assertTrue(client.connect())
+        session = client.channel.session_id
+        started = time.monotonic()
+        self.assertEqual(client.send_message("anybody"), "Таймаут ожидания ответа")
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertNotEqual(client.channel.session_id, session)
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.relay:
+            self.relay.close()
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
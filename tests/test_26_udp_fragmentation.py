@@ -0,0 +1,158 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.protocols import UDPProtocol, UDPReassembler
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+class TestUDPFragmentation(unittest.TestCase):
+    """Test 26: Фрагментация и сборка длинных сообщений UDP"""
+
+    def setUp(self):
+        self.host = '127.0.0.1'
+        self.port = 11800 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_reassembly(self):
+        """Фрагменты в любом порядке и с повторами собираются в исходное сообщение"""
+        message = os.urandom(10000)
+        fragments = UDPProtocol.fragment(message, 42)
+        self.assertEqual(len(fragments), 8)
+        self.assertTrue(all(len(f) <= UDPProtocol.DATAGRAM_SIZE for f in fragments))
+        random.shuffle(fragments)
+
+        reassembler = UDPReassembler()
+        results = [reassembler.add(f, "a", 0.0) for f in fragments[:5] + fragments[:2] + fragments[5:]]
+        self.assertEqual([r for r in results if r is not None], [message])
+        self.assertIsNone(results[-2])
+        self.assertEqual(reassembler.stats()["duplicates"], 2)
+        self.assertEqual(reassembler.stats()["pending"], 0)
+
+        # Короткое сообщение уходит как есть, а похожее на служебное - одним фрагментом
+        self.assertEqual(UDPProtocol.fragment(b"short", 1), [b"short"])
+        marked = UDPProtocol.fragment(b"\xfe\x00", 1)
+        self.assertEqual(len(marked), 1)
+        self.assertEqual(reassembler.add(marked[0], "a", 0.0), b"\xfe\x00")
+
+    def test_reassembly_limits(self):
+        """Таблица сборки ограничена: вытеснение, таймаут и слишком длинные сообщения"""
+        reassembler = UDPReassembler(max_messages=2, max_message_size=20000, timeout=1.0)
+        first, second, third = (UDPProtocol.fragment(os.urandom(3000), i) for i in range(3))
+        reassembler.add(first[0], "a", 0.0)
+        reassembler.add(second[0], "a", 0.1)
+        reassembler.add(third[0], "a", 0.2)  # Вытесняет первое
+        self.assertEqual(reassembler.stats()["evicted"], 1)
+        self.assertIsNone(reassembler.add(second[1], "a", 0.3))
+        self.assertIsNone(reassembler.add(first[1], "a", 0.3))  # Первое начинается заново и вытесняет второе
+
+        # Через timeout недособранные сообщения отбрасываются
+        reassembler.expire(1.25)
+        self.assertEqual(reassembler.stats()["expired"], 1)
+        self.assertEqual(reassembler.stats()["pending"], 1)
+
+        # Одинаковый номер сообщения от разных адресов - разные сообщения
+        message = os.urandom(3000)
+        for source in ("x", "y"):
+            parts = UDPProtocol.fragment(message, 7)
+            self.assertIsNone(reassembler.add(parts[0], source, 2.0))
+        self.assertEqual(reassembler.add(parts[1], "x", 2.0), None)
+        self.assertEqual(reassembler.add(parts[2], "x", 2.0), message)
+
+        huge = UDPProtocol.fragment(os.urandom(30000), 9)
+        self.assertIsNone(reassembler.add(huge[0], "a", 2.0))
+        self.assertEqual(reassembler.stats()["invalid"], 1)
+
+    def test_large_messages(self):
+        """Сообщения длиннее буфера и предела одной датаграммы доходят целиком"""
+        self.start_server(UDPServer(self.host, self.port))
+        client = UDPClient(self.host, self.port, timeout=3.0)
+        self.assertTrue(client.connect())
+        for size in (10, 1390, 1400, 5000, 30000, 70000):
+            with self.subTest(size=size):
+                message = "ф" * (size // 2)
+                self.assertEqual(client.send_message(message), f"UDP эхо: {message}")
+        client.disconnect()
+        stats = self.server.stats()
+        self.assertEqual(stats["sent"], 6)
+        # С идентификатором запроса сообщение из 1400 байт уже не помещается в одну датаграмму
+        self.assertEqual(stats["fragments"]["completed"], 4)
+        self.assertGreater(client.reassembly.stats()["completed"], 0)
+
+    def test_fragments_fit_datagram(self):
+        """Клиент не отправляет датаграмм длиннее datagram_size"""
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind((self.host, 0))
+        receiver.settimeout(2.0)
+        self.addCleanup(receiver.close)
+        client = UDPClient(self.host, receiver.getsockname()[1], timeout=0.2, datagram_size=512)
+        self.assertTrue(client.connect())
+        message = "x" * 5000
+        self.assertEqual(client.send_message(message), "Таймаут ожидания ответа")
+        client.disconnect()
+
+        reassembler = UDPReassembler()
+        result = None
+        while result is None:
+            data, addr = receiver.recvfrom(65536)
+            self.assertLessEqual(len(data), 512)
+            result = reassembler.add(data, addr, time.monotonic())
+        self.assertEqual(UDPProtocol.split_request(result)[1], message.encode())
+
+    def test_plain_clients(self):
+        """Клиент без фрагментации получает ответ одной датаграммой, как раньше"""
+        self.start_server(UDPServer(self.host, self.port))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(2.0)
+        self.addCleanup(sock.close)
+        sock.sendto(b"n" * 3000, (self.host, self.port))
+        data, _ = sock.recvfrom(65536)
+        self.assertEqual(data, "UDP эхо: ".encode() + b"n" * 3000)
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "Длина обрезанной датаграммы известна только в Linux")
+    def test_truncated_datagram(self):
+        """Датаграмма длиннее buffer_size отбрасывается и учитывается, а не обрезается"""
+        self.start_server(UDPServer(self.host, self.port))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(0.5)
+        self.addCleanup(sock.close)
+        sock.sendto(b"t" * 5000, (self.host, self.port))
+        with self.assertRaises(socket.timeout):
+            sock.recvfrom(65536)
+        self.assertEqual(self.server.stats()["truncated"], 1)
+
+    def test_reliable_large_messages(self):
+        """В надежном режиме длинные сообщения идут по каналу фрагментами"""
+        self.start_server(UDPServer(self.host, self.port))
+        client = UDPClient(self.host, self.port, timeout=5.0, reliable=True)
+        self.assertTrue(client.connect())
+        large = "R" * 1000000
+        self.assertEqual(client.send_message(large), f"UDP эхо: {large}")
+        messages = [f"{i}:" + "m" * random.randint(0, 10000) for i in range(50)]
+        self.assertEqual(client.send_many(messages), [f"UDP эхо: {m}" for m in messages])
+        client.disconnect()
+        self.assertEqual(self.server.stats()["sent"], 51)
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
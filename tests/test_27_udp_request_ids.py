@@ -0,0 +1,207 @@
+import unittest
+import heapq
+import time
+import threading
+import select
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.protocols import UDPProtocol
+from src.udp_server import UDPServer
+from src.udp_client import UDPClient
+
+class DelayRelay:
+    """Пересылает датаграммы между клиентом и сервером с задержкой и потерями"""
+
+    def __init__(self, host: str, port: int, target: tuple, delay: float = 0.0, loss: float = 0.0):
+        self.target = target
+        self.delay = delay  # В одну сторону
+        self.loss = loss
+        self.random = random.Random(1)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.client = None
+        self.running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        queue = []  # (когда отправить, номер, данные, адрес)
+        counter = 0
+        while self.running:
+            now = time.monotonic()
+            while queue and queue[0][0] <= now:
+                _, _, data, addr = heapq.heappop(queue)
+                self.socket.sendto(data, addr)
+            timeout = min(0.05, queue[0][0] - now) if queue else 0.05
+            readable, _, _ = select.select([self.socket], [], [], max(timeout, 0))
+            if not readable:
+                continue
+            data, addr = self.socket.recvfrom(65536)
+            if addr != self.target:
+                self.client = addr
+            destination = self.target if addr != self.target else self.client
+            if destination is None or self.random.random() < self.loss:
+                continue
+            counter += 1
+            heapq.heappush(queue, (time.monotonic() + self.delay, counter, data, destination))
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=2.0)
+        self.socket.close()
+
+class TestUDPRequestIds(unittest.TestCase):
+    """Test 27: Идентификаторы запросов UDP и окно запросов без ответа"""
+
+    def setUp(self):
+        self.host = '127.0.0.1'
+        self.port = 11900 + random.randint(1, 50) * 2
+        self.server = None
+        self.server_thread = None
+        self.relay = None
+
+    def start_server(self, server):
+        """Запускает сервер в отдельном потоке"""
+        self.server = server
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def fake_server(self) -> socket.socket:
+        """Сокет, который отвечает клиенту вручную"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((self.host, 0))
+        sock.settimeout(2.0)
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_late_reply_not_mismatched(self):
+        """Опоздавший ответ на просроченный запрос не становится ответом на следующий"""
+        server = self.fake_server()
+        client = UDPClient(self.host, server.getsockname()[1], timeout=0.3)
+        self.assertTrue(client.connect())
+        self.assertEqual(client.send_message("first"), "Таймаут ожидания ответа")
+        first, addr = server.recvfrom(1024)
+        first_id, payload = UDPProtocol.split_request(first)
+        self.assertEqual(payload, b"first")
+
+        replies = []
+        task = threading.Thread(target=lambda: replies.append(client.send_message("second")))
+        task.start()
+        second, _ = server.recvfrom(1024)
+        second_id, _ = UDPProtocol.split_request(second)
+        self.assertNotEqual(first_id, second_id)
+        server.sendto(UDPProtocol.tag_request(first_id, b"late first"), addr)
+        server.sendto(UDPProtocol.tag_request(second_id, b"second reply"), addr)
+        task.join()
+        self.assertEqual(replies, ["second reply"])
+        stats = client.stats()
+        self.assertEqual((stats["requests"], stats["replies"], stats["lost"], stats["stale"]), (2, 1, 1, 1))
+        client.disconnect()
+
+    def test_out_of_order_replies(self):
+        """Ответы в обратном порядке сопоставляются с запросами по идентификатору"""
+        server = self.fake_server()
+        client = UDPClient(self.host, server.getsockname()[1], timeout=2.0)
+        self.assertTrue(client.connect())
+        messages = [f"m{i}" for i in range(5)]
+
+        def reply_reversed():
+            requests = [server.recvfrom(1024) for _ in messages]
+            for data, addr in reversed(requests):
+                request_id, payload = UDPProtocol.split_request(data)
+                server.sendto(UDPProtocol.tag_request(request_id, b"re: " + payload), addr)
+
+        thread = threading.Thread(target=reply_reversed)
+        thread.start()
+        results = client.send_window(messages, window=5)
+        thread.join()
+        self.assertEqual([r.reply for r in results], [f"re: {m}" for m in messages])
+        self.assertEqual([r.message for r in results], messages)
+        # Первый запрос ждал ответа дольше всех
+        self.assertGreater(results[0].latency, results[-1].latency)
+        client.disconnect()
+
+    def test_window_throughput(self):
+        """Окно запросов быстрее, чем запрос-ответ, при задержке в сети"""
+        self.start_server(UDPServer(self.host, self.port))
+        self.relay = DelayRelay(self.host, self.port + 1, (self.host, self.port), delay=0.005)
+        client = UDPClient(self.host, self.port + 1, timeout=2.0)
+        self.assertTrue(client.connect())
+
+        started = time.monotonic()
+        for i in range(50):
+            self.assertEqual(client.request(f"serial {i}"), f"UDP эхо: serial {i}")
+        serial = (time.monotonic() - started) / 50
+
+        messages = [f"window {i}" for i in range(500)]
+        started = time.monotonic()
+        results = client.send_window(messages, window=32)
+        windowed = (time.monotonic() - started) / 500
+        self.assertEqual([r.reply for r in results], [f"UDP эхо: {m}" for m in messages])
+        self.assertLess(windowed, serial / 5)
+        self.assertTrue(all(r.latency >= 0.01 for r in results))
+        client.disconnect()
+
+    def test_loss_reported(self):
+        """Потерянные запросы видны в результатах и счетчиках, остальные ответы верны"""
+        self.start_server(UDPServer(self.host, self.port))
+        self.relay = DelayRelay(self.host, self.port + 1, (self.host, self.port), loss=0.2)
+        client = UDPClient(self.host, self.port + 1, timeout=2.0)
+        self.assertTrue(client.connect())
+        messages = [f"lossy {i}" for i in range(300)]
+        results = client.send_window(messages, window=16, timeout=0.3)
+        lost = [r for r in results if r.reply is None]
+        self.assertGreater(len(lost), 0)
+        self.assertTrue(all(r.latency is None for r in lost))
+        self.assertTrue(all(r.reply == f"UDP эхо: {r.message}" for r in results if r.reply is not None))
+        stats = client.stats()
+        self.assertEqual(stats["lost"], len(lost))
+        self.assertEqual(stats["replies"], len(messages) - len(lost))
+        self.assertIsNotNone(stats["latency_mean"])
+        with self.assertRaises(socket.timeout):
+            client.send_many(messages)
+        client.disconnect()
+
+    def test_handler_and_plain_clients(self):
+        """Обработчик не видит идентификатор; клиенты без идентификаторов работают как раньше"""
+        seen = []
+
+        def handler(data, addr):
+            seen.append(bytes(data))
+            return [b"got ", bytes(data)]
+
+        self.start_server(UDPServer(self.host, self.port, handler=handler))
+        tagged = UDPClient(self.host, self.port, timeout=2.0)
+        plain = UDPClient(self.host, self.port, timeout=2.0, request_ids=False)
+        self.assertTrue(tagged.connect())
+        self.assertTrue(plain.connect())
+        self.assertEqual(tagged.send_message("a"), "got a")
+        self.assertEqual(plain.send_message("b"), "got b")
+        self.assertEqual(tagged.send_many(["c", "d"]), ["got c", "got d"])
+        self.assertEqual(plain.send_many(["e"]), ["got e"])
+        large = "L" * 20000
+        self.assertEqual(tagged.send_message(large), f"got {large}")
+        self.assertEqual(seen[:6], [b"a", b"b", b"c", b"d", b"e", large.encode()])
+        with self.assertRaises(ValueError):
+            plain.send_window(["x"])
+        tagged.disconnect()
+        plain.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.relay:
+            self.relay.close()
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
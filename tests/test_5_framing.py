@@ -0,0 +1,112 @@
+import unittest
+import time
+import threading
+import socket
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.protocols import FrameDecoder, TCPProtocol
+from src.tcp_server import TCPServer
+
+class TestFraming(unittest.TestCase):
+    """Test 5: Разбор и запись кадров TCP протокола"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 9700 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self):
+        """Запускает сервер"""
+        self.server = TCPServer(self.host, self.port)
+        self.server.start()
+
+    def test_decoder_many_frames_in_one_chunk(self):
+        """Несколько кадров в одном куске данных"""
+        messages = [f"msg {i}".encode('utf-8') for i in range(50)]
+        stream = b"".join(TCPProtocol.prepare_message(msg) for msg in messages)
+
+        decoder = FrameDecoder()
+        frames = decoder.feed(stream)
+        self.assertEqual([bytes(frame.payload) for frame in frames], messages)
+
+    def test_decoder_split_headers(self):
+        """Заголовки и тела, разрезанные на куски по одному байту"""
+        messages = [b"first", b"", b"third message"]
+        stream = b"".join(TCPProtocol.prepare_message(msg) for msg in messages)
+
+        decoder = FrameDecoder()
+        frames = []
+        for i in range(len(stream)):
+            frames.extend(decoder.feed(stream[i:i + 1]))
+        self.assertEqual([bytes(frame.payload) for frame in frames], messages)
+
+    def test_decoder_large_frame(self):
+        """Большой кадр, приходящий частями"""
+        message = os.urandom(200000)
+        stream = TCPProtocol.prepare_message(message) + TCPProtocol.prepare_message(b"tail")
+
+        decoder = FrameDecoder(buffer_size=4096)
+        frames = []
+        for i in range(0, len(stream), 7000):
+            frames.extend(decoder.feed(stream[i:i + 7000]))
+        self.assertEqual([bytes(frame.payload) for frame in frames], [message, b"tail"])
+
+    def test_send_messages_vectored(self):
+        """Пачка кадров и кадр из нескольких буферов через sendmsg"""
+        sender, receiver = socket.socketpair()
+        try:
+            messages = [f"Batch {i}".encode('utf-8') for i in range(2000)]
+            writer = threading.Thread(target=TCPProtocol.send_messages, args=(sender, messages))
+            writer.start()
+
+            decoder = FrameDecoder()
+            frames = []
+            while len(frames) < len(messages):
+                success, received = decoder.receive_frames(receiver)
+                self.assertTrue(success)
+                frames.extend(received)
+            writer.join()
+            self.assertEqual([bytes(frame.payload) for frame in frames], messages)
+
+            TCPProtocol.send_message(sender, [b"Hello, ", memoryview(b"world")])
+            success, data = TCPProtocol.receive_message(receiver)
+            self.assertTrue(success)
+            self.assertEqual(bytes(data), b"Hello, world")
+        finally:
+            sender.close()
+            receiver.close()
+
+    def test_server_coalesced_frames(self):
+        """Сервер отвечает на все кадры, отправленные одним пакетом"""
+        self.server_thread = threading.Thread(target=self.start_server)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.5)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(3.0)
+        sock.connect((self.host, self.port))
+        try:
+            messages = [f"Burst {i}" for i in range(20)]
+            sock.sendall(b"".join(TCPProtocol.prepare_message(msg.encode('utf-8')) for msg in messages))
+
+            for msg in messages:
+                success, data = TCPProtocol.receive_message(sock)
+                self.assertTrue(success)
+                self.assertEqual(data.decode('utf-8'), f"TCP эхо: {msg}")
+        finally:
+            sock.close()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
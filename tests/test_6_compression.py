@@ -0,0 +1,97 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.compression import FrameCompressor
+from src.protocols import FrameDecoder, TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestCompression(unittest.TestCase):
+    """Test 6: Согласованное сжатие кадров"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 9800 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, compression=None):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, compression=compression)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_compressor_roundtrip(self):
+        """Сжатие и распаковка кадров всеми кодеками"""
+        data = ("compressible text " * 2000).encode('utf-8')
+        dictionary = b"compressible text "
+        for codec in FrameCompressor.CODECS:
+            client = FrameCompressor([codec], threshold=100, dictionary=dictionary)
+            server = FrameCompressor(dictionary=dictionary)
+            client.apply(server.accept(client.offer()))
+            self.assertEqual(server.codec, codec)
+
+            frame = client.compress(data)
+            self.assertNotEqual(frame.flags, 0)
+            self.assertLess(len(frame.payload), len(data))
+
+            decoder = FrameDecoder()
+            decoded = decoder.feed(b"".join(TCPProtocol.frame_buffers(frame.payload, frame.flags)))
+            self.assertEqual(bytes(server.decompress(decoded[0])), data)
+
+    def test_short_frames_not_compressed(self):
+        """Кадры короче порога уходят без сжатия"""
+        compressor = FrameCompressor(threshold=1024)
+        compressor.apply({"compression": "zlib"})
+        self.assertEqual(compressor.compress(b"short").flags, 0)
+
+    def test_negotiated_echo(self):
+        """Эхо с согласованным сжатием zlib"""
+        self.start_server(FrameCompressor(threshold=256))
+
+        client = TCPClient(self.host, self.port, compression=FrameCompressor(['zlib'], threshold=256))
+        self.assertTrue(client.connect())
+        self.assertEqual(client.compressor.codec, 'zlib')
+
+        large_message = "Z" * 51200
+        response = client.send_message(large_message)
+        self.assertEqual(response, f"TCP эхо: {large_message}")
+        self.assertEqual(client.send_message("short"), "TCP эхо: short")
+        client.disconnect()
+
+    def test_plain_client_with_compressing_server(self):
+        """Клиент без согласования работает с сервером, поддерживающим сжатие"""
+        self.start_server(FrameCompressor(threshold=16))
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        large_message = "P" * 20480
+        self.assertEqual(client.send_message(large_message), f"TCP эхо: {large_message}")
+        client.disconnect()
+
+    def test_client_with_plain_server(self):
+        """Клиент со сжатием и сервер без настроек сжатия"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port, compression=FrameCompressor())
+        self.assertTrue(client.connect())
+        self.assertIsNone(client.compressor.codec)
+        self.assertEqual(client.send_message("A" * 5000), "TCP эхо: " + "A" * 5000)
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.compression import FrameCompressor
+from src.protocols import FrameDecoder, TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestStreaming(unittest.TestCase):
+    """Test 7: Потоковая передача сообщений"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10000 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, compression=None):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, compression=compression)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_stream_frames_flags(self):
+        """Все части, кроме последней, помечены FLAG_MORE"""
+        frames = list(TCPProtocol.stream_frames([b"a", b"b", b"c"]))
+        self.assertEqual([frame.flags for frame in frames], [TCPProtocol.FLAG_MORE, TCPProtocol.FLAG_MORE, 0])
+
+        decoder = FrameDecoder()
+        stream = b"".join(b"".join(TCPProtocol.frame_buffers(frame.payload, frame.flags)) for frame in frames)
+        decoded = decoder.feed(stream)
+        self.assertEqual([bytes(frame.payload) for frame in decoded], [b"a", b"b", b"c"])
+
+    def test_stream_echo(self):
+        """Потоковое эхо сообщения, которое больше одной части"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+
+        chunk = b"S" * (TCPProtocol.STREAM_CHUNK_SIZE + 12345)
+        reply_size = 0
+        parts = 0
+        for part in client.stream_message(chunk for _ in range(20)):
+            reply_size += len(part)
+            parts += 1
+        self.assertEqual(reply_size, len("TCP эхо: ".encode('utf-8')) + 20 * len(chunk))
+        self.assertGreater(parts, 20)
+
+        # После потока соединение продолжает работать в обычном режиме
+        self.assertEqual(client.send_message("after stream"), "TCP эхо: after stream")
+        client.disconnect()
+
+    def test_stream_with_compression(self):
+        """Потоковое эхо с согласованным сжатием"""
+        self.start_server(FrameCompressor())
+
+        client = TCPClient(self.host, self.port, compression=FrameCompressor())
+        self.assertTrue(client.connect())
+
+        chunks = [f"line {i}\n".encode('utf-8') * 500 for i in range(10)]
+        reply = b"".join(client.stream_message(chunks))
+        self.assertEqual(reply, "TCP эхо: ".encode('utf-8') + b"".join(chunks))
+        client.disconnect()
+
+    def test_empty_stream(self):
+        """Поток без частей возвращает только префикс"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        self.assertEqual(b"".join(client.stream_message([])), "TCP эхо: ".encode('utf-8'))
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.compression import FrameCompressor
+from src.protocols import Frame, FrameDecoder, TCPProtocol
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestMultiplexing(unittest.TestCase):
+    """Test 8: Мультиплексирование запросов по идентификаторам"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10100 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, compression=None, **kwargs):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, compression=compression, **kwargs)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_stream_id_header(self):
+        """Идентификатор запроса переживает запись и разбор кадра"""
+        frames = [Frame(b"first", stream_id=1), Frame(b"plain"), Frame(b"last", TCPProtocol.FLAG_ZLIB, 0xFFFFFFFF)]
+        stream = b"".join(
+            b"".join(TCPProtocol.frame_buffers(frame.payload, frame.flags, frame.stream_id)) for frame in frames
+        )
+
+        decoder = FrameDecoder()
+        decoded = []
+        for i in range(len(stream)):
+            decoded.extend(decoder.feed(stream[i:i + 1]))
+        self.assertEqual([(bytes(f.payload), f.flags, f.stream_id) for f in decoded],
+                         [(f.payload, f.flags, f.stream_id) for f in frames])
+
+    def test_many_outstanding_requests(self):
+        """Тысячи запросов в полете по одному соединению"""
+        self.start_server(max_inflight=64)
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+
+        futures = [client.submit(f"Request {i}") for i in range(3000)]
+        for i, future in enumerate(futures):
+            self.assertEqual(future.result(timeout=10.0), f"TCP эхо: Request {i}")
+
+        # Обычные вызовы продолжают работать поверх мультиплексного режима
+        self.assertEqual(client.send_message("sync"), "TCP эхо: sync")
+        client.disconnect()
+
+    def test_concurrent_submitters(self):
+        """Несколько потоков делят одно соединение"""
+        self.start_server(FrameCompressor(threshold=256))
+
+        client = TCPClient(self.host, self.port, compression=FrameCompressor(threshold=256))
+        self.assertTrue(client.connect())
+
+        errors = []
+
+        def worker(worker_id):
+            try:
+                for i in range(100):
+                    message = f"{worker_id}-{i}-" + "x" * (i * 50)
+                    self.assertEqual(client.submit(message).result(timeout=10.0), f"TCP эхо: {message}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        client.disconnect()
+
+    def test_pending_requests_fail_on_disconnect(self):
+        """Запросы без ответа завершаются ошибкой при отключении"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        self.assertEqual(client.submit("ping").result(timeout=5.0), "TCP эхо: ping")
+
+        self.server.stop()
+        self.server_thread.join(timeout=3.0)
+        client.disconnect()
+        with self.assertRaises(ConnectionError):
+            client.submit("after disconnect")
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()
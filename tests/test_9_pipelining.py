@@ -0,0 +1,90 @@
+import unittest
+import time
+import threading
+import sys
+import os
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.compression import FrameCompressor
+from src.tcp_server import TCPServer
+from src.tcp_client import TCPClient
+
+class TestPipelining(unittest.TestCase):
+    """Test 9: Конвейерная отправка сообщений"""
+
+    def setUp(self):
+        self.host = 'localhost'
+        self.port = 10200 + random.randint(1, 100)
+        self.server = None
+        self.server_thread = None
+
+    def start_server(self, compression=None):
+        """Запускает сервер в отдельном потоке"""
+        self.server = TCPServer(self.host, self.port, compression=compression)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1.0)
+
+    def test_send_many_in_order(self):
+        """Ответы на тысячи сообщений приходят в порядке отправки"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+
+        messages = [f"Pipelined {i}" for i in range(5000)]
+        responses = client.send_many(messages, window=128)
+        self.assertEqual(responses, [f"TCP эхо: {msg}" for msg in messages])
+        client.disconnect()
+
+    def test_large_messages_small_window(self):
+        """Большие сообщения не переполняют буферы сокетов"""
+        self.start_server(FrameCompressor(threshold=256))
+
+        client = TCPClient(self.host, self.port, compression=FrameCompressor(threshold=256))
+        self.assertTrue(client.connect())
+
+        messages = [f"{i}:" + os.urandom(100000).hex() for i in range(20)]
+        responses = client.send_many(messages, window=4)
+        self.assertEqual(responses, [f"TCP эхо: {msg}" for msg in messages])
+        client.disconnect()
+
+    def test_stop_reading_early(self):
+        """Соединение остается согласованным, если ответы перестали читать"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+
+        messages = (f"Lazy {i}" for i in range(100000))
+        for i, response in enumerate(client.send_stream(messages, window=16)):
+            self.assertEqual(response, f"TCP эхо: Lazy {i}")
+            if i == 50:
+                break
+
+        self.assertEqual(client.send_message("after pipeline"), "TCP эхо: after pipeline")
+        client.disconnect()
+
+    def test_pipeline_in_multiplexed_mode(self):
+        """Конвейер поверх мультиплексного режима сохраняет порядок"""
+        self.start_server()
+
+        client = TCPClient(self.host, self.port)
+        self.assertTrue(client.connect())
+        client.submit("switch").result(timeout=5.0)
+
+        messages = [f"Mux {i}" for i in range(1000)]
+        self.assertEqual(client.send_many(messages), [f"TCP эхо: {msg}" for msg in messages])
+        client.disconnect()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        if self.server:
+            self.server.stop()
+        if self.server_thread and self.server_thread.is_alive():
+            self.server_thread.join(timeout=2.0)
+
+if __name__ == '__main__':
+    unittest.main()